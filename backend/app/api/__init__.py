@@ -1,3 +1 @@
-from app.api import auth, users, admin, health, billing
-
-__all__ = ["auth", "users", "admin", "health", "billing"]
\ No newline at end of file
+# Routers are imported by app.main; billing only when STRIPE_ENABLED
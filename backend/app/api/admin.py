@@ -1,68 +1,108 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Query
-from typing import Optional, List
-from app.schemas.user import User, UserList
+from typing import AsyncIterator, Optional, List, Tuple
+from datetime import datetime
+from uuid import UUID
+from app.schemas.user import User, UserList, UserSearchResult, UserSuggestion
+from app.schemas.whitelist import WhitelistEmails
 from app.api.deps import get_current_admin_user
+from app.core.revocation import revocations
+from app.services.auth_gateway import auth_gateway
 from app.core.database import get_db
+from app.core.stats import get_dashboard_stats
+from app.core.whitelist import whitelist_index
+from app.repositories.base import CountMode
+import base64
 import csv
+import json
 from io import StringIO
 from fastapi.responses import StreamingResponse
 
 router = APIRouter()
 
 
+def _admin_user(row: dict) -> User:
+    return User(
+        id=row["id"],
+        email=row["email"],
+        name=row.get("name"),
+        is_admin=row.get("is_admin") or False,
+        created_at=row["created_at"],
+        language=row.get("language") or "en"
+    )
+
+
+def _encode_cursor(row: dict, total: Optional[int], search: Optional[str], role: Optional[str]) -> str:
+    """Opaque cursor: the last row's (created_at, id), the first page's total and the filters it was for"""
+    payload = json.dumps([str(row["created_at"]), str(row["id"]), total, search, role])
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def _decode_cursor(cursor: str, search: Optional[str], role: Optional[str]) -> Tuple[Tuple[str, str], Optional[int]]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, user_id, total, cursor_search, cursor_role = json.loads(base64.urlsafe_b64decode(padded))
+        datetime.fromisoformat(created_at)
+        UUID(user_id)
+    except Exception:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        )
+    # Other filters would continue a different listing, with the wrong total
+    if (cursor_search, cursor_role) != (search, role):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Cursor was issued for different filters"
+        )
+    return (created_at, user_id), total
+
+
 @router.get("/users", response_model=UserList)
 async def list_users(
     page: int = Query(1, ge=1),
     per_page: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
+    count: CountMode = "exact",
     search: Optional[str] = None,
     role: Optional[str] = None,
     current_user: User = Depends(get_current_admin_user),
     db = Depends(get_db)
 ):
-    """List all users with pagination and filters"""
+    """List all users with pagination and filters.
+
+    Pass ``next_cursor`` back as ``cursor`` to page by keyset, which costs the same at
+    any depth. Cursor pages ignore ``page`` and return it as null, and report the first
+    page's total, carried in the cursor, rather than recounting. A cursor only
+    continues the listing with the ``search`` and ``role`` it was issued for. ``count`` picks an
+    exact total, a planner estimate, or none.
+    """
+    after, total = _decode_cursor(cursor, search, role) if cursor else (None, None)
+    
     try:
-        # Build query
-        query = db.table("profiles").select("*")
-        
-        # Apply filters
-        if search:
-            query = query.or_(f"email.ilike.%{search}%,name.ilike.%{search}%")
-        
-        if role == "admin":
-            query = query.eq("is_admin", True)
-        elif role == "user":
-            query = query.eq("is_admin", False)
-        
-        # Get total count
-        count_result = await query.count()
-        total = count_result.count or 0
-        
-        # Apply pagination
-        offset = (page - 1) * per_page
-        query = query.range(offset, offset + per_page - 1)
-        
-        # Execute query
-        result = await query.execute()
+        is_admin = {"admin": True, "user": False}.get(role)
+        # Fetch one extra row to learn whether there's a next page
+        rows, page_total = await db.profiles.list_admin_users(
+            per_page + 1,
+            offset=0 if after else (page - 1) * per_page,
+            after=after,
+            search=search,
+            is_admin=is_admin,
+            count="none" if after else count,
+        )
+        if not after:
+            total = page_total
         
-        # Convert to User objects
-        users = []
-        for profile in result.data:
-            # Get auth user data
-            auth_user = await db.auth.admin.get_user_by_id(profile["id"])
-            users.append(User(
-                id=profile["id"],
-                email=auth_user.user.email,
-                name=profile.get("name"),
-                is_admin=profile.get("is_admin", False),
-                created_at=auth_user.user.created_at,
-                language=profile.get("language", "en")
-            ))
+        next_cursor = None
+        if len(rows) > per_page:
+            rows = rows[:per_page]
+            next_cursor = _encode_cursor(rows[-1], total, search, role)
         
         return UserList(
-            users=users,
+            users=[_admin_user(row) for row in rows],
             total=total,
-            page=page,
-            per_page=per_page
+            page=None if after else page,
+            per_page=per_page,
+            next_cursor=next_cursor
         )
     except Exception as e:
         raise HTTPException(
@@ -71,6 +111,41 @@ async def list_users(
         )
 
 
+@router.get("/users/search", response_model=List[UserSearchResult])
+async def search_users(
+    q: str = Query(..., min_length=2, max_length=100),
+    limit: int = Query(20, ge=1, le=100),
+    current_user: User = Depends(get_current_admin_user),
+    db = Depends(get_db)
+):
+    """Search users by email or name, best matches first (fuzzy and substring)"""
+    try:
+        rows = await db.profiles.search(q, limit)
+        return [UserSearchResult(**_admin_user(row).model_dump(), score=row["score"]) for row in rows]
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to search users"
+        )
+
+
+@router.get("/users/typeahead", response_model=List[UserSuggestion])
+async def typeahead_users(
+    q: str = Query(..., min_length=2, max_length=100),
+    limit: int = Query(8, ge=1, le=20),
+    current_user: User = Depends(get_current_admin_user),
+    db = Depends(get_db)
+):
+    """Users whose email or name starts with the query, for autocomplete"""
+    try:
+        return [UserSuggestion(**row) for row in await db.profiles.suggest(q, limit)]
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to search users"
+        )
+
+
 @router.put("/users/{user_id}/admin")
 async def toggle_admin_status(
     user_id: str,
@@ -86,7 +161,9 @@ async def toggle_admin_status(
         )
     
     try:
-        await db.table("profiles").update({"is_admin": is_admin}).eq("id", user_id).execute()
+        await db.profiles.update(user_id, {"is_admin": is_admin})
+        # Every worker drops its cached copy, not just this one
+        await revocations.invalidate_principal(user_id)
         return {"message": f"User admin status updated to {is_admin}"}
     except Exception as e:
         raise HTTPException(
@@ -109,8 +186,10 @@ async def delete_user(
         )
     
     try:
-        # Delete user (cascade will handle related data)
-        await db.auth.admin.delete_user(user_id)
+        # Delete user through the auth backend (cascade will handle related data)
+        await auth_gateway.delete_user(user_id)
+        # Rejects the user's tokens and drops their cached principal in every worker
+        await revocations.revoke_user(user_id)
         return {"message": "User deleted successfully"}
     except Exception as e:
         raise HTTPException(
@@ -119,48 +198,102 @@ async def delete_user(
         )
 
 
-@router.get("/users/export")
-async def export_users(
+def _whitelist_emails(data: WhitelistEmails) -> List[str]:
+    # Lowercase and deduplicated: one upsert can't touch a row twice
+    return list(dict.fromkeys(email.lower() for email in data.emails))
+
+
+@router.post("/whitelist")
+async def add_to_whitelist(
+    data: WhitelistEmails,
     current_user: User = Depends(get_current_admin_user),
     db = Depends(get_db)
 ):
-    """Export all users to CSV"""
+    """Invite emails to sign up (WHITELIST_MODE)"""
+    emails = _whitelist_emails(data)
     try:
-        # Get all profiles
-        result = await db.table("profiles").select("*").execute()
-        
-        # Create CSV
-        output = StringIO()
-        writer = csv.writer(output)
-        
-        # Write header
-        writer.writerow(["ID", "Email", "Name", "Admin", "Language", "Created At"])
-        
-        # Write data
-        for profile in result.data:
-            # Get auth user data
-            auth_user = await db.auth.admin.get_user_by_id(profile["id"])
+        await db.whitelist.add(emails)
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Failed to update whitelist"
+        )
+    whitelist_index.add(emails)
+    return {"message": f"Added {len(emails)} emails to the whitelist"}
+
+
+@router.post("/whitelist/remove")
+async def remove_from_whitelist(
+    data: WhitelistEmails,
+    current_user: User = Depends(get_current_admin_user),
+    db = Depends(get_db)
+):
+    """Withdraw invitations; existing accounts are not affected"""
+    emails = _whitelist_emails(data)
+    try:
+        await db.whitelist.remove(emails)
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Failed to update whitelist"
+        )
+    whitelist_index.remove(emails)
+    return {"message": f"Removed {len(emails)} emails from the whitelist"}
+
+
+EXPORT_PAGE_SIZE = 500
+EXPORT_HEADER = ["ID", "Email", "Name", "Admin", "Language", "Created At"]
+
+
+async def _export_csv(first_page: List[dict], pages: AsyncIterator[List[dict]]) -> AsyncIterator[bytes]:
+    """Encode pages of users as CSV, yielding one chunk per page"""
+    output = StringIO()
+    writer = csv.writer(output)
+    writer.writerow(EXPORT_HEADER)
+    
+    page = first_page
+    while page:
+        for row in page:
             writer.writerow([
-                profile["id"],
-                auth_user.user.email,
-                profile.get("name", ""),
-                "Yes" if profile.get("is_admin", False) else "No",
-                profile.get("language", "en"),
-                auth_user.user.created_at
+                row["id"],
+                row["email"],
+                row.get("name") or "",
+                "Yes" if row.get("is_admin") else "No",
+                row.get("language") or "en",
+                row["created_at"]
             ])
-        
-        # Return CSV file
+        yield output.getvalue().encode("utf-8")
         output.seek(0)
-        return StreamingResponse(
-            iter([output.getvalue()]),
-            media_type="text/csv",
-            headers={"Content-Disposition": "attachment; filename=users.csv"}
-        )
+        output.truncate()
+        page = await anext(pages, None)
+    
+    if output.tell():
+        # Header only: no users to export
+        yield output.getvalue().encode("utf-8")
+
+
+@router.get("/users/export")
+async def export_users(
+    current_user: User = Depends(get_current_admin_user),
+    db = Depends(get_db)
+):
+    """Export all users to CSV"""
+    try:
+        # Fetch the first page up front so a failing query still returns a 500
+        # instead of a truncated download
+        pages = db.profiles.iter_admin_users(EXPORT_PAGE_SIZE)
+        first_page = await anext(pages, [])
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Failed to export users"
         )
+    
+    return StreamingResponse(
+        _export_csv(first_page, pages),
+        media_type="text/csv",
+        headers={"Content-Disposition": "attachment; filename=users.csv"}
+    )
 
 
 @router.get("/stats")
@@ -170,28 +303,7 @@ async def get_admin_stats(
 ):
     """Get admin dashboard statistics"""
     try:
-        # Total users
-        total_users = await db.table("profiles").select("id", count="exact").execute()
-        
-        # New users this week
-        from datetime import datetime, timedelta
-        week_ago = (datetime.utcnow() - timedelta(days=7)).isoformat()
-        new_users_week = await db.table("profiles").select("id", count="exact").gte("created_at", week_ago).execute()
-        
-        # New users this month
-        month_ago = (datetime.utcnow() - timedelta(days=30)).isoformat()
-        new_users_month = await db.table("profiles").select("id", count="exact").gte("created_at", month_ago).execute()
-        
-        # Active users today
-        today = datetime.utcnow().date().isoformat()
-        active_today = await db.table("profiles").select("id", count="exact").gte("updated_at", today).execute()
-        
-        return {
-            "totalUsers": total_users.count or 0,
-            "newUsersThisWeek": new_users_week.count or 0,
-            "newUsersThisMonth": new_users_month.count or 0,
-            "activeUsersToday": active_today.count or 0
-        }
+        return await get_dashboard_stats(db)
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
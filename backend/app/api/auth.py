@@ -1,29 +1,41 @@
+from typing import Any, Dict, Optional
 from fastapi import APIRouter, Depends, HTTPException, status
-from app.schemas.auth import Login, PasswordReset, Token
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+from jose import jwt
+from app.schemas.auth import Login, PasswordReset, RefreshRequest, Token
 from app.core.database import get_db
 from app.core.config import settings
+from app.core.revocation import revocations
+from app.core.sessions import RefreshTokenReused, refresh_session
+from app.core.whitelist import whitelist_index
+from app.services.auth_gateway import AuthGatewayError, auth_gateway
 
 router = APIRouter()
 
+optional_bearer = HTTPBearer(auto_error=False)
+
+
+def _token(session: Dict[str, Any]) -> Token:
+    return Token(
+        access_token=session["access_token"],
+        refresh_token=session.get("refresh_token"),
+        expires_in=session.get("expires_in"),
+        expires_at=session.get("expires_at"),
+        user={
+            "id": session["user"]["id"],
+            "email": session["user"]["email"],
+            "created_at": session["user"]["created_at"]
+        }
+    )
+
 
 @router.post("/login", response_model=Token)
-def login(credentials: Login, db = Depends(get_db)):
+async def login(credentials: Login):
     """Login with email and password"""
     try:
         # Authenticate with Supabase
-        response = db.auth.sign_in_with_password({
-            "email": credentials.email,
-            "password": credentials.password
-        })
-        
-        return Token(
-            access_token=response.session.access_token,
-            user={
-                "id": response.user.id,
-                "email": response.user.email,
-                "created_at": response.user.created_at
-            }
-        )
+        session = await auth_gateway.sign_in_with_password(credentials.email, credentials.password)
+        return _token(session)
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -32,31 +44,29 @@ def login(credentials: Login, db = Depends(get_db)):
 
 
 @router.post("/signup", response_model=Token)
-def signup(credentials: Login, db = Depends(get_db)):
+async def signup(credentials: Login, db = Depends(get_db)):
     """Create new account"""
     try:
         # Check whitelist mode
         if settings.WHITELIST_MODE:
             try:
-                # Check if user is in whitelist
-                whitelist = db.table("whitelist").select("*").eq("email", credentials.email).execute()
-                if not whitelist.data:
-                    raise HTTPException(
-                        status_code=status.HTTP_403_FORBIDDEN,
-                        detail="Registration is by invitation only"
-                    )
+                # In-memory index: rejecting an uninvited email makes no query
+                invited = await whitelist_index.contains(credentials.email, db.whitelist)
             except Exception as e:
                 # If whitelist table doesn't exist, allow registration
                 print(f"Whitelist table not found, allowing registration: {e}")
-                pass
+                invited = True
+            if not invited:
+                raise HTTPException(
+                    status_code=status.HTTP_403_FORBIDDEN,
+                    detail="Registration is by invitation only"
+                )
         
         # Create user with Supabase
-        response = db.auth.sign_up({
-            "email": credentials.email,
-            "password": credentials.password
-        })
+        response = await auth_gateway.sign_up(credentials.email, credentials.password)
+        user = response["user"]
         
-        if not response.user:
+        if not user:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Failed to create account"
@@ -64,23 +74,22 @@ def signup(credentials: Login, db = Depends(get_db)):
         
         # Create profile (optional, ignore if table doesn't exist)
         try:
-            db.table("profiles").insert({
-                "id": response.user.id,
+            await db.profiles.create(user["id"], {
                 "email": credentials.email,
                 "is_admin": credentials.email == settings.ADMIN_EMAIL
-            }).execute()
+            })
         except Exception as profile_error:
             print(f"Profile creation failed (table may not exist): {profile_error}")
         
         # Handle case where session might be None (email confirmation required)
-        access_token = response.session.access_token if response.session else None
+        if response["session"]:
+            return _token(response["session"])
         
         return Token(
-            access_token=access_token,
             user={
-                "id": response.user.id,
-                "email": response.user.email,
-                "created_at": response.user.created_at
+                "id": user["id"],
+                "email": user["email"],
+                "created_at": user["created_at"]
             }
         )
     except HTTPException:
@@ -92,15 +101,35 @@ def signup(credentials: Login, db = Depends(get_db)):
         )
 
 
+@router.post("/refresh", response_model=Token)
+async def refresh(data: RefreshRequest):
+    """Exchange a refresh token for a new access and refresh token"""
+    try:
+        return _token(await refresh_session(data.refresh_token))
+    except RefreshTokenReused:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Refresh token already used; sign in again"
+        )
+    except AuthGatewayError as e:
+        if e.status_code is None or e.status_code >= 500:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Authentication service unavailable"
+            )
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid refresh token"
+        )
+
+
 @router.post("/reset-password")
-def reset_password(data: PasswordReset, db = Depends(get_db)):
+async def reset_password(data: PasswordReset):
     """Send password reset email"""
     try:
-        db.auth.reset_password_for_email(
+        await auth_gateway.reset_password_for_email(
             data.email,
-            {
-                "redirect_to": f"{settings.APP_URL}/reset-password"
-            }
+            redirect_to=f"{settings.APP_URL}/reset-password"
         )
         return {"message": "Password reset email sent"}
     except Exception as e:
@@ -109,10 +138,15 @@ def reset_password(data: PasswordReset, db = Depends(get_db)):
 
 
 @router.post("/logout")
-def logout(db = Depends(get_db)):
-    """Logout current user"""
+async def logout(credentials: Optional[HTTPAuthorizationCredentials] = Depends(optional_bearer)):
+    """Logout current user: revokes the session the bearer token belongs to"""
     try:
-        db.auth.sign_out()
+        if credentials:
+            await auth_gateway.sign_out(credentials.credentials)
+            # Supabase accepted the token; stop honouring it here too
+            session_id = jwt.get_unverified_claims(credentials.credentials).get("session_id")
+            if session_id:
+                await revocations.revoke_session(session_id)
         return {"message": "Logged out successfully"}
     except Exception:
         return {"message": "Logged out successfully"}
\ No newline at end of file
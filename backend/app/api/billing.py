@@ -1,18 +1,35 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Request
-from app.api.deps import get_current_user
+from fastapi.concurrency import run_in_threadpool
+from app.api.deps import get_current_user, get_profile, rate_limit_ip, rate_limit_user
 from app.schemas.user import User
 from app.core.config import settings
 from app.core.database import get_db
+from app.core.singleflight import SingleFlight
+from app.services.stripe import StripeAPIError, stripe_client
+from app.core.subscriptions import is_stale, reconcile_subscription, subscription_response
+from app.core.webhook_queue import HANDLED_EVENTS, webhook_queue
 import stripe
 from typing import Optional
 
 router = APIRouter()
 
-if settings.STRIPE_ENABLED and settings.STRIPE_SECRET_KEY:
-    stripe.api_key = settings.STRIPE_SECRET_KEY
+_customer_flight = SingleFlight("stripe_customer")
 
 
-@router.get("/subscription")
+async def _get_or_create_customer(db, user: User) -> str:
+    profile = await get_profile(db, user.id)
+    if profile and profile.get("stripe_customer_id"):
+        return profile["stripe_customer_id"]
+    
+    customer = await stripe_client.create_customer(
+        email=user.email,
+        metadata={"user_id": user.id}
+    )
+    await db.profiles.update(user.id, {"stripe_customer_id": customer["id"]})
+    return customer["id"]
+
+
+@router.get("/subscription", dependencies=[Depends(rate_limit_ip), Depends(rate_limit_user)])
 async def get_subscription(
     current_user: User = Depends(get_current_user),
     db = Depends(get_db)
@@ -22,33 +39,29 @@ async def get_subscription(
         return {"status": "disabled"}
     
     try:
-        # Get user's stripe customer id
-        profile = await db.table("profiles").select("stripe_customer_id").eq("id", current_user.id).single().execute()
+        # One local read: the webhook keeps the subscription mirrored on the profile
+        profile = await get_profile(db, current_user.id)
         
-        if not profile.data or not profile.data.get("stripe_customer_id"):
+        if not profile or not profile.get("stripe_customer_id"):
             return {"status": "free"}
         
-        # Get active subscriptions
-        subscriptions = stripe.Subscription.list(
-            customer=profile.data["stripe_customer_id"],
-            status="active",
-            limit=1
-        )
-        
-        if subscriptions.data:
-            sub = subscriptions.data[0]
-            return {
-                "status": "active",
-                "current_period_end": sub.current_period_end,
-                "cancel_at_period_end": sub.cancel_at_period_end
-            }
+        if is_stale(profile):
+            try:
+                profile = await reconcile_subscription(
+                    db, current_user.id, profile["stripe_customer_id"]
+                ) or profile
+            except Exception as e:
+                # A stale mirror beats an error; only fail if there's nothing to show
+                if profile.get("subscription_synced_at") is None:
+                    raise
+                print(f"Subscription reconcile failed for {current_user.id}: {e}")
         
-        return {"status": "free"}
+        return subscription_response(profile)
     except Exception as e:
         return {"status": "error", "message": str(e)}
 
 
-@router.post("/create-checkout-session")
+@router.post("/create-checkout-session", dependencies=[Depends(rate_limit_ip), Depends(rate_limit_user)])
 async def create_checkout_session(
     price_id: str,
     current_user: User = Depends(get_current_user),
@@ -62,21 +75,10 @@ async def create_checkout_session(
         )
     
     try:
-        # Get or create stripe customer
-        profile = await db.table("profiles").select("stripe_customer_id").eq("id", current_user.id).single().execute()
-        
-        if profile.data and profile.data.get("stripe_customer_id"):
-            customer_id = profile.data["stripe_customer_id"]
-        else:
-            # Create new customer
-            customer = stripe.Customer.create(
-                email=current_user.email,
-                metadata={"user_id": current_user.id}
-            )
-            customer_id = customer.id
-            
-            # Save customer id
-            await db.table("profiles").update({"stripe_customer_id": customer_id}).eq("id", current_user.id).execute()
+        # Get or create stripe customer; double-clicks share one creation
+        customer_id = await _customer_flight.do(
+            current_user.id, lambda: _get_or_create_customer(db, current_user)
+        )
         
         # Map price_id to actual Stripe price IDs
         price_map = {
@@ -92,7 +94,7 @@ async def create_checkout_session(
             )
         
         # Create checkout session
-        session = stripe.checkout.Session.create(
+        session = await stripe_client.create_checkout_session(
             customer=customer_id,
             payment_method_types=["card"],
             line_items=[{"price": actual_price_id, "quantity": 1}],
@@ -102,15 +104,15 @@ async def create_checkout_session(
             metadata={"user_id": current_user.id}
         )
         
-        return {"url": session.url}
-    except stripe.error.StripeError as e:
+        return {"url": session["url"]}
+    except StripeAPIError as e:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=str(e)
         )
 
 
-@router.post("/create-portal-session")
+@router.post("/create-portal-session", dependencies=[Depends(rate_limit_ip), Depends(rate_limit_user)])
 async def create_portal_session(
     current_user: User = Depends(get_current_user),
     db = Depends(get_db)
@@ -124,22 +126,22 @@ async def create_portal_session(
     
     try:
         # Get user's stripe customer id
-        profile = await db.table("profiles").select("stripe_customer_id").eq("id", current_user.id).single().execute()
+        profile = await get_profile(db, current_user.id)
         
-        if not profile.data or not profile.data.get("stripe_customer_id"):
+        if not profile or not profile.get("stripe_customer_id"):
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="No billing account found"
             )
         
         # Create portal session
-        session = stripe.billing_portal.Session.create(
-            customer=profile.data["stripe_customer_id"],
+        session = await stripe_client.create_portal_session(
+            customer=profile["stripe_customer_id"],
             return_url=f"{settings.APP_URL}/billing"
         )
         
-        return {"url": session.url}
-    except stripe.error.StripeError as e:
+        return {"url": session["url"]}
+    except StripeAPIError as e:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=str(e)
@@ -167,33 +169,10 @@ async def stripe_webhook(request: Request, db = Depends(get_db)):
     except stripe.error.SignatureVerificationError:
         raise HTTPException(status_code=400, detail="Invalid signature")
     
-    # Handle events
-    if event["type"] == "checkout.session.completed":
-        session = event["data"]["object"]
-        # Update user subscription status
-        user_id = session["metadata"]["user_id"]
-        await db.table("profiles").update({
-            "subscription_status": "active"
-        }).eq("id", user_id).execute()
-    
-    elif event["type"] == "customer.subscription.updated":
-        subscription = event["data"]["object"]
-        # Update subscription status
-        customer_id = subscription["customer"]
-        profile = await db.table("profiles").select("id").eq("stripe_customer_id", customer_id).single().execute()
-        if profile.data:
-            await db.table("profiles").update({
-                "subscription_status": subscription["status"]
-            }).eq("id", profile.data["id"]).execute()
-    
-    elif event["type"] == "customer.subscription.deleted":
-        subscription = event["data"]["object"]
-        # Cancel subscription
-        customer_id = subscription["customer"]
-        profile = await db.table("profiles").select("id").eq("stripe_customer_id", customer_id).single().execute()
-        if profile.data:
-            await db.table("profiles").update({
-                "subscription_status": "cancelled"
-            }).eq("id", profile.data["id"]).execute()
+    # Acknowledge once the event is durably queued; the webhook worker applies
+    # it. A failure here returns 500 so Stripe retries.
+    if event["type"] in HANDLED_EVENTS:
+        await run_in_threadpool(webhook_queue.enqueue, event)
+        webhook_queue.wakeup.set()
     
-    return {"status": "success"}
\ No newline at end of file
+    return {"status": "success"}
@@ -1,14 +1,91 @@
-from typing import Optional
-from fastapi import Depends, HTTPException, status
+import time
+from datetime import datetime, timezone
+from typing import Any, AsyncIterator, Dict, Optional
+from math import ceil
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from jose import JWTError
-from app.core.security import decode_token
+from jose import jwt
+from app.core.security import TokenVerificationUnavailable, verify_access_token
+from app.core.cache import principal_cache
 from app.core.database import get_db
 from app.schemas.user import User
 from app.core.config import settings
+from app.core.rate_limit import limiter, tier_for
+from app.core.revocation import revocations
+from app.core.singleflight import SingleFlight
 
 security = HTTPBearer()
 
+# Parallel requests from one page load carry the same token and user id
+_token_flight = SingleFlight("token_verification")
+_profile_flight = SingleFlight("profile")
+
+# Client IPs whose failed-authentication quota ran out, with when (monotonic)
+# it frees up again, so this worker turns them away before verifying
+_blocked_clients: Dict[str, float] = {}
+_BLOCKED_CLIENTS_MAX = 10_000
+
+
+def _credentials_exception(detail: str = "Invalid authentication credentials") -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail=detail,
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+
+
+async def verify_token(token: str, db) -> Dict[str, Any]:
+    """Resolve a bearer token to the identity it was issued for"""
+    return await _token_flight.do(token, lambda: _verify_token(token, db))
+
+
+async def _verify_token(token: str, db) -> Dict[str, Any]:
+    """Verify a token in-process or with Supabase Auth.
+
+    Tokens are verified in-process when AUTH_VERIFY_MODE is "local"; Supabase Auth is
+    only called in "remote" mode, or when no local key can verify the token and
+    AUTH_REMOTE_FALLBACK is enabled.
+    """
+    if settings.AUTH_VERIFY_MODE == "local":
+        try:
+            claims = await verify_access_token(token)
+        except TokenVerificationUnavailable as e:
+            if not settings.AUTH_REMOTE_FALLBACK:
+                raise _credentials_exception()
+            print(f"Falling back to remote token verification: {e}")
+        else:
+            if not claims or not claims.get("sub"):
+                raise _credentials_exception()
+            issued_at = claims.get("iat")
+            return {
+                "id": claims["sub"],
+                "email": claims.get("email"),
+                # Access tokens don't carry the account creation time
+                "created_at": None,
+                "issued_at": datetime.fromtimestamp(issued_at, tz=timezone.utc) if issued_at else None,
+                "session_id": claims.get("session_id"),
+            }
+
+    # Verify token with Supabase
+    user_response = await db.auth.get_user(token)
+    if not user_response.user:
+        raise _credentials_exception()
+    # Supabase vouched for the token, so its claims can be read as they are
+    claims = jwt.get_unverified_claims(token)
+    issued_at = claims.get("iat")
+    return {
+        "id": user_response.user.id,
+        "email": user_response.user.email,
+        "created_at": user_response.user.created_at,
+        "issued_at": datetime.fromtimestamp(issued_at, tz=timezone.utc) if issued_at else None,
+        "session_id": claims.get("session_id"),
+    }
+
+
+async def get_profile(db, user_id: str) -> Optional[Dict[str, Any]]:
+    """Profile row for a user; concurrent lookups for the same user share one query"""
+    return await _profile_flight.do(user_id, lambda: db.profiles.get(user_id))
+
 
 async def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
@@ -18,20 +95,20 @@ async def get_current_user(
     token = credentials.credentials
     
     try:
-        # Verify token with Supabase (not async)
-        user_response = db.auth.get_user(token)
-        if not user_response.user:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Invalid authentication credentials",
-                headers={"WWW-Authenticate": "Bearer"},
-            )
+        identity = await verify_token(token, db)
+        
+        issued_at = identity["issued_at"]
+        if revocations.is_revoked(identity["id"], identity["session_id"], issued_at.timestamp() if issued_at else None):
+            raise _credentials_exception("Session has been revoked")
+        
+        cached_user = principal_cache.get(identity["id"])
+        if cached_user is not None:
+            return cached_user
         
         # Try to get user profile, but don't fail if table doesn't exist
         profile_data = None
         try:
-            profile = await db.table("profiles").select("*").eq("id", user_response.user.id).single().execute()
-            profile_data = profile.data
+            profile_data = await get_profile(db, identity["id"])
         except Exception as profile_error:
             print(f"Profile query failed (table may not exist): {profile_error}")
             # Continue without profile data - we'll use email-based admin check
@@ -42,32 +119,51 @@ async def get_current_user(
             is_admin = profile_data.get("is_admin", False)
         else:
             # Fall back to email-based admin check if no profile data
-            is_admin = user_response.user.email == settings.ADMIN_EMAIL
+            is_admin = identity["email"] == settings.ADMIN_EMAIL
         
-        return User(
-            id=user_response.user.id,
-            email=user_response.user.email,
+        created_at = identity["created_at"]
+        if created_at is None:
+            created_at = (profile_data or {}).get("created_at") or identity["issued_at"]
+        
+        user = User(
+            id=identity["id"],
+            email=identity["email"],
             name=profile_data.get("name") if profile_data else None,
             is_admin=is_admin,
-            created_at=user_response.user.created_at,
-            language=profile_data.get("language", "en") if profile_data else "en"
+            created_at=created_at,
+            language=profile_data.get("language", "en") if profile_data else "en",
+            subscription_status=profile_data.get("subscription_status") if profile_data else None,
         )
+        # Only cache users backed by a profile so a missing row isn't remembered
+        if profile_data:
+            principal_cache.set(user.id, user)
+        return user
     except HTTPException:
         # Re-raise HTTP exceptions (like invalid token)
         raise
     except Exception as e:
         print(f"Authentication error: {e}")
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Could not validate credentials",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
+        raise _credentials_exception("Could not validate credentials")
 
 
 async def get_current_admin_user(
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_user),
+    db = Depends(get_db)
 ) -> User:
-    """Get current user and verify they are an admin"""
+    """Get current user and verify they are an admin.
+
+    The cached principal can be up to PRINCIPAL_CACHE_TTL_SECONDS old on a
+    worker that missed a demotion, so admin rights are re-read from the profile.
+    """
+    if current_user.is_admin:
+        try:
+            profile = await get_profile(db, current_user.id)
+        except Exception as profile_error:
+            print(f"Profile query failed (table may not exist): {profile_error}")
+            profile = None
+        if profile is not None and not profile.get("is_admin", False):
+            principal_cache.invalidate(current_user.id)
+            current_user = current_user.model_copy(update={"is_admin": False})
     if not current_user.is_admin:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
@@ -87,4 +183,68 @@ async def get_optional_current_user(
     try:
         return await get_current_user(credentials, db)
     except HTTPException:
-        return None
\ No newline at end of file
+        return None
+
+
+def _client_ip(request: Request) -> str:
+    return request.client.host if request.client else "unknown"
+
+
+def _rate_limit_exception(retry_after: float) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        detail="Rate limit exceeded",
+        headers={"Retry-After": str(max(1, ceil(retry_after)))},
+    )
+
+
+async def _enforce_rate_limit(key: str, tier: str) -> None:
+    decision = await limiter.hit(key, tier)
+    if not decision.allowed:
+        raise _rate_limit_exception(decision.retry_after)
+
+
+async def rate_limit_client(request: Request) -> None:
+    """Limit anonymous endpoints per client IP"""
+    await _enforce_rate_limit(_client_ip(request), "anonymous")
+
+
+async def rate_limit_ip(request: Request) -> AsyncIterator[None]:
+    """Limit failed authentication on signed-in endpoints per client IP.
+
+    Requests with an invalid token never reach rate_limit_user, and in remote
+    verify mode each one still costs a call to Supabase Auth. Only those
+    failures are charged to the IP, so users sharing an address don't share a
+    quota. Once an IP's failures exceed RATE_LIMIT_CLIENT, its requests are
+    turned away here, before the token is checked, until the quota frees up.
+    """
+    ip = _client_ip(request)
+    now = time.monotonic()
+    blocked_until = _blocked_clients.get(ip)
+    if blocked_until is not None:
+        if blocked_until > now:
+            raise _rate_limit_exception(blocked_until - now)
+        del _blocked_clients[ip]
+    try:
+        yield
+    except HTTPException as e:
+        if e.status_code != status.HTTP_401_UNAUTHORIZED:
+            raise
+        decision = await limiter.hit(ip, "client")
+        if decision.allowed:
+            raise
+        if len(_blocked_clients) >= _BLOCKED_CLIENTS_MAX:
+            for key in [key for key, until in _blocked_clients.items() if until <= now]:
+                del _blocked_clients[key]
+        if len(_blocked_clients) < _BLOCKED_CLIENTS_MAX:
+            _blocked_clients[ip] = now + decision.retry_after
+        raise _rate_limit_exception(decision.retry_after)
+
+
+async def rate_limit_user(current_user: User = Depends(get_current_user)) -> None:
+    """Limit signed-in endpoints per user, by subscription tier.
+
+    Shares the request's get_current_user result with the endpoint, so the
+    check adds no authentication work.
+    """
+    await _enforce_rate_limit(current_user.id, tier_for(current_user.subscription_status))
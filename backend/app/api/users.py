@@ -2,7 +2,10 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from typing import Optional
 from app.schemas.user import User, UserUpdate
 from app.api.deps import get_current_user
+from app.core.revocation import revocations
+from app.services.auth_gateway import auth_gateway
 from app.core.database import get_db
+from app.core.stats import get_dashboard_stats
 
 router = APIRouter()
 
@@ -23,21 +26,21 @@ async def update_current_user_profile(
 ):
     """Update current user profile"""
     try:
-        # Update profile
+        # Update profile; the write returns the updated row
         update_data = user_update.dict(exclude_unset=True)
         if update_data:
-            await db.table("profiles").update(update_data).eq("id", current_user.id).execute()
-        
-        # Return updated user
-        profile = await db.table("profiles").select("*").eq("id", current_user.id).single().execute()
+            profile = await db.profiles.update(current_user.id, update_data)
+            await revocations.invalidate_principal(current_user.id)
+        else:
+            profile = await db.profiles.get(current_user.id)
         
         return User(
             id=current_user.id,
             email=current_user.email,
-            name=profile.data.get("name"),
-            is_admin=profile.data.get("is_admin", False),
+            name=profile.get("name"),
+            is_admin=profile.get("is_admin", False),
             created_at=current_user.created_at,
-            language=profile.data.get("language", "en")
+            language=profile.get("language", "en")
         )
     except Exception as e:
         raise HTTPException(
@@ -53,8 +56,9 @@ async def delete_current_user(
 ):
     """Delete current user account"""
     try:
-        # Delete user (cascade will handle related data)
-        await db.auth.admin.delete_user(current_user.id)
+        # Delete user through the auth backend (cascade will handle related data)
+        await auth_gateway.delete_user(current_user.id)
+        await revocations.revoke_user(current_user.id)
         return {"message": "Account deleted successfully"}
     except Exception as e:
         raise HTTPException(
@@ -70,22 +74,11 @@ async def get_user_stats(
 ):
     """Get user statistics for dashboard"""
     try:
-        # Total users
-        total_users = await db.table("profiles").select("id", count="exact").execute()
-        
-        # New users this week
-        from datetime import datetime, timedelta
-        week_ago = (datetime.utcnow() - timedelta(days=7)).isoformat()
-        new_users_week = await db.table("profiles").select("id", count="exact").gte("created_at", week_ago).execute()
-        
-        # Active users today (simplified - you'd track this differently in production)
-        today = datetime.utcnow().date().isoformat()
-        active_users = await db.table("profiles").select("id", count="exact").gte("updated_at", today).execute()
-        
+        stats = await get_dashboard_stats(db)
         return {
-            "totalUsers": total_users.count or 0,
-            "newUsersThisWeek": new_users_week.count or 0,
-            "activeUsersToday": active_users.count or 0
+            "totalUsers": stats["totalUsers"],
+            "newUsersThisWeek": stats["newUsersThisWeek"],
+            "activeUsersToday": stats["activeUsersToday"]
         }
     except Exception as e:
         return {
@@ -15,6 +15,13 @@ class Settings(BaseSettings):
     SUPABASE_ANON_KEY: str
     SUPABASE_SERVICE_KEY: str
     
+    # Shared keep-alive pool for Supabase REST/Auth calls
+    SUPABASE_TIMEOUT: float = 10.0
+    SUPABASE_HTTP2: bool = True
+    SUPABASE_MAX_CONNECTIONS: int = 100
+    SUPABASE_MAX_KEEPALIVE_CONNECTIONS: int = 20
+    SUPABASE_KEEPALIVE_EXPIRY: float = 30.0
+    
     GOOGLE_CLIENT_ID: str
     GOOGLE_CLIENT_SECRET: str
     
@@ -22,8 +29,77 @@ class Settings(BaseSettings):
     JWT_ALGORITHM: str = "HS256"
     JWT_EXPIRATION_HOURS: int = 24
     
+    # Where profile/whitelist queries go: "postgrest" (Supabase REST API) or
+    # "postgres" (direct asyncpg connection to DATABASE_URL)
+    DATA_BACKEND: str = "postgrest"
+    DATABASE_URL: Optional[str] = None
+    DATABASE_POOL_MIN_SIZE: int = 1
+    DATABASE_POOL_MAX_SIZE: int = 10
+    DATABASE_STATEMENT_CACHE_SIZE: int = 100
+    
+    # Access token verification: "local" checks Supabase JWTs in-process,
+    # "remote" asks Supabase Auth on every request.
+    AUTH_VERIFY_MODE: str = "local"
+    AUTH_REMOTE_FALLBACK: bool = True
+    SUPABASE_JWT_SECRET: Optional[str] = None
+    SUPABASE_JWT_AUDIENCE: str = "authenticated"
+    SUPABASE_JWT_ISSUER: Optional[str] = None
+    SUPABASE_JWKS_REFRESH_SECONDS: int = 600
+    
+    # Who checks passwords: "supabase" (Supabase Auth) or "local" (bcrypt
+    # hashes in the credentials table, migrations/007; tokens are signed with
+    # SUPABASE_JWT_SECRET and need AUTH_VERIFY_MODE=local). bcrypt runs in
+    # PASSWORD_HASH_WORKERS processes with at most PASSWORD_HASH_MAX_PENDING
+    # calls queued; stored hashes are upgraded on login when the rounds change.
+    AUTH_BACKEND: str = "supabase"
+    PASSWORD_HASH_ROUNDS: int = 12
+    PASSWORD_HASH_WORKERS: int = 2
+    PASSWORD_HASH_MAX_PENDING: int = 64
+    LOCAL_AUTH_TOKEN_TTL_SECONDS: int = 3600
+    
+    @property
+    def supabase_jwt_issuer(self) -> str:
+        return self.SUPABASE_JWT_ISSUER or f"{self.SUPABASE_URL.rstrip('/')}/auth/v1"
+    
+    @property
+    def supabase_jwks_url(self) -> str:
+        return f"{self.supabase_jwt_issuer}/.well-known/jwks.json"
+    
+    # Resolved users cached per worker to skip the profile lookup on repeat requests
+    PRINCIPAL_CACHE_TTL_SECONDS: int = 60
+    PRINCIPAL_CACHE_MAX_SIZE: int = 10000
+    
+    # Refresh tokens this worker has rotated: presenting one again within the
+    # grace period returns the same new session (parallel tabs refreshing at
+    # once); after it, until the window ends, it's rejected as reuse
+    REFRESH_TOKEN_REUSE_GRACE_SECONDS: int = 10
+    REFRESH_TOKEN_REUSE_WINDOW_SECONDS: int = 86400
+    REFRESH_TOKEN_REUSE_MAX_TRACKED: int = 100000
+    
+    # Logged-out sessions and deleted users, checked on every request. Keep
+    # entries at least as long as an access token lives (Supabase's JWT expiry);
+    # a redis:// URL shares them between workers within the sync interval.
+    REVOCATION_STORAGE_URL: str = "memory://"
+    REVOCATION_TTL_SECONDS: int = 3600
+    REVOCATION_SYNC_INTERVAL_SECONDS: float = 1.0
+    
+    # Dashboard counters: per-worker cache of the rollup, and how often to
+    # reconcile it against profiles (0 disables the background job)
+    STATS_CACHE_TTL_SECONDS: int = 30
+    STATS_RECONCILE_INTERVAL_SECONDS: int = 3600
+    
     ADMIN_EMAIL: str
     WHITELIST_MODE: bool = False
+    # With WHITELIST_MODE, signups are checked against an in-memory copy of the
+    # whitelist table (migrations/008): loaded at startup, polled for changes
+    # every WHITELIST_REFRESH_INTERVAL_SECONDS and fully reloaded every
+    # WHITELIST_FULL_RELOAD_SECONDS. Past WHITELIST_EXACT_MAX_ENTRIES emails it
+    # becomes a Bloom filter with this false positive rate, and matches are
+    # confirmed with one query.
+    WHITELIST_REFRESH_INTERVAL_SECONDS: float = 5.0
+    WHITELIST_FULL_RELOAD_SECONDS: float = 3600
+    WHITELIST_EXACT_MAX_ENTRIES: int = 1_000_000
+    WHITELIST_BLOOM_ERROR_RATE: float = 0.001
     
     CORS_ORIGINS: str = ""
     
@@ -38,10 +114,51 @@ class Settings(BaseSettings):
     STRIPE_WEBHOOK_SECRET: Optional[str] = None
     STRIPE_PRICE_ID_MONTHLY: Optional[str] = None
     STRIPE_PRICE_ID_YEARLY: Optional[str] = None
+    # Webhooks keep the subscription mirror on profiles current; entries older
+    # than this are re-read from Stripe on the next GET /api/billing/subscription
+    SUBSCRIPTION_MIRROR_MAX_AGE_SECONDS: int = 86400
+    # Async Stripe client: API endpoint (point it at a stub in tests), pinned
+    # API version, per-call timeout and max concurrent calls per worker
+    STRIPE_API_BASE: str = "https://api.stripe.com"
+    STRIPE_API_VERSION: str = "2023-10-16"
+    STRIPE_TIMEOUT: float = 10.0
+    STRIPE_MAX_CONCURRENCY: int = 20
+    # Verified webhook events are queued in a local SQLite file and applied by
+    # a background worker in batches
+    STRIPE_WEBHOOK_QUEUE_PATH: str = "stripe_webhooks.sqlite3"
+    STRIPE_WEBHOOK_BATCH_SIZE: int = 100
+    STRIPE_WEBHOOK_POLL_SECONDS: float = 1.0
     
     SENTRY_DSN: Optional[str] = None
     
+    # Serve /api/docs, /api/redoc and /api/openapi.json
+    OPENAPI_ENABLED: bool = True
+    
+    # Quotas such as "100/minute". Anonymous requests are limited per client
+    # IP, signed-in ones per user, with a higher quota for active
+    # subscriptions. "memory://" counts per worker; a redis:// URL shares the
+    # counters between all workers.
+    #
+    # RATE_LIMIT_CLIENT counts only requests to signed-in endpoints whose token
+    # fails verification, per client IP. That is the one place clients behind a
+    # shared address (NAT, proxy) are coupled: once their failures use it up,
+    # every request from that IP, valid token or not, gets 429 until it frees
+    # up, since the check runs before the token is looked at.
+    RATE_LIMIT_ENABLED: bool = True
     RATE_LIMIT: str = "100/minute"
+    RATE_LIMIT_AUTHENTICATED: str = "300/minute"
+    RATE_LIMIT_SUBSCRIBED: str = "1200/minute"
+    RATE_LIMIT_CLIENT: str = "120/minute"
+    RATE_LIMIT_STORAGE_URL: str = "memory://"
+    
+    # Prometheus exposition at /metrics; keep it off the public ingress
+    METRICS_ENABLED: bool = True
+    
+    # Diagnostics: sample event-loop lag and threadpool use every interval, and
+    # log the stack of any coroutine step that holds the loop past the threshold
+    LOOP_MONITOR_ENABLED: bool = False
+    LOOP_MONITOR_INTERVAL_SECONDS: float = 0.05
+    LOOP_MONITOR_BLOCK_THRESHOLD_SECONDS: float = 0.1
     
     class Config:
         env_file = ".env"
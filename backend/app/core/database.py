@@ -1,40 +1,182 @@
-from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
-from sqlalchemy.orm import declarative_base
-from supabase import create_client, Client
+import time
+from typing import Optional
+import httpx
+from postgrest import AsyncPostgrestClient
+from supabase import AsyncClient, AsyncClientOptions, ASupabaseAuthClient
 from app.core.config import settings
+from app.core.metrics import InstrumentedTransport
+from app.repositories import CredentialRepository, ProfileRepository, WhitelistRepository, create_repositories
 
-Base = declarative_base()
+_transport: Optional[httpx.AsyncHTTPTransport] = None
+_http_client: Optional[httpx.AsyncClient] = None
+_db: Optional["Database"] = None
 
-supabase: Client = create_client(settings.SUPABASE_URL, settings.SUPABASE_SERVICE_KEY)
 
-def init_db():
-    """Initialize database tables and admin user"""
+def get_http_transport() -> httpx.AsyncHTTPTransport:
+    """Keep-alive connection pool shared by every upstream HTTP client in this worker.
+
+    Every request through it is timed under service="supabase" in /metrics.
+    """
+    global _transport
+    if _transport is None:
+        _transport = InstrumentedTransport(
+            "supabase",
+            http2=settings.SUPABASE_HTTP2,
+            limits=httpx.Limits(
+                max_connections=settings.SUPABASE_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.SUPABASE_MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=settings.SUPABASE_KEEPALIVE_EXPIRY,
+            ),
+        )
+    return _transport
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """Plain HTTP client on the shared pool, for calls outside the Supabase SDK"""
+    global _http_client
+    if _http_client is None:
+        _http_client = httpx.AsyncClient(
+            transport=get_http_transport(),
+            timeout=settings.SUPABASE_TIMEOUT,
+            follow_redirects=True,
+        )
+    return _http_client
+
+
+class PooledPostgrestClient(AsyncPostgrestClient):
+    def create_session(self, base_url, headers, timeout, verify=True, proxy=None) -> httpx.AsyncClient:
+        return httpx.AsyncClient(
+            base_url=base_url,
+            headers=headers,
+            timeout=timeout,
+            transport=get_http_transport(),
+            follow_redirects=True,
+        )
+
+
+class PooledAsyncClient(AsyncClient):
+    """Async Supabase client whose REST and Auth calls share the worker's connection pool"""
+
+    @staticmethod
+    def _init_postgrest_client(rest_url, headers, schema, timeout=settings.SUPABASE_TIMEOUT, verify=True, proxy=None):
+        return PooledPostgrestClient(rest_url, headers=headers, schema=schema, timeout=timeout)
+
+    @staticmethod
+    def _init_supabase_auth_client(auth_url, client_options, verify=True, proxy=None):
+        return ASupabaseAuthClient(
+            url=auth_url,
+            auto_refresh_token=client_options.auto_refresh_token,
+            persist_session=client_options.persist_session,
+            storage=client_options.storage,
+            headers=client_options.headers,
+            flow_type=client_options.flow_type,
+            http_client=httpx.AsyncClient(
+                transport=get_http_transport(),
+                timeout=settings.SUPABASE_TIMEOUT,
+                follow_redirects=True,
+            ),
+        )
+
+
+def create_db_client() -> AsyncClient:
+    # The backend authenticates with the service key and never holds a user
+    # session, so there's nothing to persist or refresh
+    options = AsyncClientOptions(
+        auto_refresh_token=False,
+        persist_session=False,
+        postgrest_client_timeout=settings.SUPABASE_TIMEOUT,
+    )
+    return PooledAsyncClient(settings.SUPABASE_URL, settings.SUPABASE_SERVICE_KEY, options)
+
+
+class Database:
+    """What get_db hands to endpoints.
+
+    Hot profile, whitelist and credential queries go through the repositories, which use
+    either PostgREST or a direct Postgres pool depending on DATA_BACKEND. Auth and
+    anything else still use the Supabase client (``auth``, ``table``, ``rpc``).
+    """
+
+    def __init__(
+        self,
+        client: AsyncClient,
+        profiles: ProfileRepository,
+        whitelist: WhitelistRepository,
+        credentials: CredentialRepository,
+    ):
+        self.client = client
+        self.profiles = profiles
+        self.whitelist = whitelist
+        self.credentials = credentials
+
+    @property
+    def auth(self):
+        return self.client.auth
+
+    def table(self, table_name: str):
+        return self.client.table(table_name)
+
+    def rpc(self, fn: str, params: Optional[dict] = None, **kwargs):
+        return self.client.rpc(fn, params, **kwargs)
+
+
+async def init_db():
+    """Create the admin user on first boot, through the configured auth backend.
+
+    Looks the admin up by email rather than listing every auth user, so this is
+    one indexed query however many users there are.
+    """
+    # Imported here: the gateway module builds on this one
+    from app.services.auth_gateway import AuthGatewayError, auth_gateway
+
+    if not settings.ADMIN_EMAIL:
+        return
+    started = time.perf_counter()
     try:
-        # Check if admin user exists
-        result = supabase.auth.admin.list_users()
+        supabase = await get_db()
         
-        # Handle different response formats
-        users_list = result.users if hasattr(result, 'users') else result
-        admin_exists = any(
-            getattr(user, 'email', None) == settings.ADMIN_EMAIL for user in users_list
-        )
+        if await supabase.profiles.get_by_email(settings.ADMIN_EMAIL):
+            return
         
-        if not admin_exists and settings.ADMIN_EMAIL:
-            # Create admin user with temporary password
-            temp_password = "ChangeMeNow123!"
-            supabase.auth.admin.create_user({
-                "email": settings.ADMIN_EMAIL,
-                "password": temp_password,
-                "email_confirm": True,
-                "user_metadata": {"is_admin": True}
-            })
-            print(f"Admin user created: {settings.ADMIN_EMAIL}")
-            print(f"Temporary password: {temp_password}")
-            print("Please change this password immediately!")
+        # No profile yet; the auth user may still exist (created by an earlier boot)
+        temp_password = "ChangeMeNow123!"
+        try:
+            user = await auth_gateway.create_user(settings.ADMIN_EMAIL, temp_password, {"is_admin": True})
+        except AuthGatewayError as e:
+            if e.code in ("email_exists", "user_already_exists") or "already been registered" in str(e):
+                return
+            raise
+        # As at signup; a trigger on auth.users may have created it already
+        try:
+            if not await supabase.profiles.get(user["id"]):
+                await supabase.profiles.create(user["id"], {"email": settings.ADMIN_EMAIL, "is_admin": True})
+        except Exception as profile_error:
+            print(f"Profile creation failed (table may not exist): {profile_error}")
+        print(f"Admin user created: {settings.ADMIN_EMAIL}")
+        print(f"Temporary password: {temp_password}")
+        print("Please change this password immediately!")
     except Exception as e:
         print(f"Error initializing database: {e}")
+    finally:
+        print(f"Admin bootstrap took {(time.perf_counter() - started) * 1000:.0f}ms")
+
+
+async def close_db():
+    """Close pooled upstream connections on shutdown"""
+    global _transport, _http_client, _db
+    if _transport is not None:
+        await _transport.aclose()
+    if settings.DATA_BACKEND == "postgres":
+        from app.repositories.postgres import close_pool
+
+        await close_pool()
+    _transport = _http_client = _db = None
 
 
-async def get_db():
-    """Dependency to get Supabase client"""
-    return supabase
\ No newline at end of file
+async def get_db() -> Database:
+    """Dependency to get the database: Supabase client plus repositories"""
+    global _db
+    if _db is None:
+        client = create_db_client()
+        _db = Database(client, *create_repositories(client))
+    return _db
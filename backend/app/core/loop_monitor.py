@@ -0,0 +1,98 @@
+"""Opt-in diagnostics for a blocked event loop (LOOP_MONITOR_ENABLED).
+
+A sampler task sleeps for ``interval`` and records how late it woke up as
+event-loop lag. Each wakeup is also a heartbeat for a watchdog thread. If the
+heartbeat stops for longer than ``interval + threshold``, some coroutine step
+is holding the loop. The watchdog then captures the loop thread's stack while
+it is still blocked, which shows the blocking call itself rather than whatever
+runs after it.
+
+The sampler also records how busy the threadpool that runs sync endpoints and
+``run_in_threadpool`` calls is. Findings are exported as metrics and printed as
+one JSON object per line.
+"""
+import asyncio
+import json
+import sys
+import threading
+import time
+import traceback
+from typing import Any, Dict, Optional
+import anyio.to_thread
+from app.core.metrics import LOOP_BLOCKED, LOOP_LAG, THREADPOOL_BUSY, THREADPOOL_LIMIT, THREADPOOL_WAITING
+
+# Innermost frames kept from a captured stack
+STACK_DEPTH = 30
+
+
+def log_event(event: str, **fields: Any) -> None:
+    print(json.dumps({"event": event, "ts": round(time.time(), 3), **fields}, default=str), flush=True)
+
+
+class LoopMonitor:
+    def __init__(self, interval: float, threshold: float):
+        self.interval = interval
+        self.threshold = threshold
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread_id: Optional[int] = None
+        self._heartbeat = time.monotonic()
+        self._task: Optional[asyncio.Task] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+        self._saturated = False
+
+    def start(self) -> None:
+        """Start monitoring the running loop; call from inside it"""
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+        self._heartbeat = time.monotonic()
+        self._stopped.clear()
+        self._task = asyncio.create_task(self._sample())
+        self._watchdog = threading.Thread(target=self._watch, name="loop-monitor", daemon=True)
+        self._watchdog.start()
+
+    def stop(self) -> None:
+        self._stopped.set()
+        if self._task:
+            self._task.cancel()
+        if self._watchdog:
+            self._watchdog.join(timeout=1)
+
+    async def _sample(self) -> None:
+        while True:
+            expected = time.monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            self._heartbeat = now
+            LOOP_LAG.observe(max(0.0, now - expected))
+            self._sample_threadpool()
+
+    def _sample_threadpool(self) -> None:
+        limiter = anyio.to_thread.current_default_thread_limiter()
+        waiting = limiter.statistics().tasks_waiting
+        THREADPOOL_BUSY.set(limiter.borrowed_tokens)
+        THREADPOOL_LIMIT.set(limiter.total_tokens)
+        THREADPOOL_WAITING.set(waiting)
+        if waiting and not self._saturated:
+            log_event("threadpool_saturated", busy=limiter.borrowed_tokens, limit=limiter.total_tokens, waiting=waiting)
+        self._saturated = waiting > 0
+
+    def _watch(self) -> None:
+        reported = None
+        while not self._stopped.wait(self.threshold / 4):
+            heartbeat = self._heartbeat
+            blocked_for = time.monotonic() - heartbeat - self.interval
+            if blocked_for > self.threshold and heartbeat != reported:
+                reported = heartbeat
+                LOOP_BLOCKED.inc()
+                log_event("event_loop_blocked", **self._snapshot(blocked_for))
+
+    def _snapshot(self, blocked_for: float) -> Dict[str, Any]:
+        frame = sys._current_frames().get(self._loop_thread_id)
+        task = asyncio.current_task(self._loop) if self._loop else None
+        return {
+            "blocked_for_seconds": round(blocked_for, 3),
+            "threshold_seconds": self.threshold,
+            "task": task.get_name() if task else None,
+            "stack": [line.rstrip() for line in traceback.format_stack(frame, limit=STACK_DEPTH)] if frame else [],
+        }
@@ -0,0 +1,183 @@
+import os
+import re
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, Optional
+import httpx
+from prometheus_client import CollectorRegistry, Counter, Gauge, Histogram, generate_latest
+from prometheus_client import multiprocess
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# With several workers, set PROMETHEUS_MULTIPROC_DIR to an empty directory
+# shared by them; prometheus_client then keeps values in per-process files and
+# /metrics aggregates them.
+
+REQUESTS = Counter(
+    "http_requests_total",
+    "HTTP requests handled",
+    ["method", "route", "status"],
+)
+REQUESTS_IN_PROGRESS = Gauge(
+    "http_requests_in_progress",
+    "HTTP requests currently being handled",
+    ["method"],
+    multiprocess_mode="livesum",
+)
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route template",
+    ["method", "route", "status"],
+)
+UPSTREAM_LATENCY = Histogram(
+    "upstream_request_duration_seconds",
+    "Latency of calls to Supabase, Stripe and other upstreams",
+    ["service", "operation"],
+)
+UPSTREAM_ERRORS = Counter(
+    "upstream_errors_total",
+    "Upstream calls that raised or returned a 5xx",
+    ["service", "operation"],
+)
+SINGLEFLIGHT_CALLS = Counter(
+    "singleflight_calls_total",
+    "Lookups that made the upstream call (leader) or joined one in flight (shared)",
+    ["name", "result"],
+)
+RATE_LIMITED = Counter(
+    "rate_limited_requests_total",
+    "Requests rejected with 429 by the rate limiter",
+    ["tier"],
+)
+LOOP_LAG = Histogram(
+    "event_loop_lag_seconds",
+    "How late the loop monitor's timer fired",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+LOOP_BLOCKED = Counter(
+    "event_loop_blocked",
+    "Times a single coroutine step held the event loop past the threshold",
+)
+THREADPOOL_BUSY = Gauge(
+    "threadpool_threads_busy",
+    "Worker threads currently running sync endpoints or run_in_threadpool calls",
+    multiprocess_mode="livesum",
+)
+THREADPOOL_LIMIT = Gauge(
+    "threadpool_threads_limit",
+    "Size of the threadpool",
+    multiprocess_mode="livesum",
+)
+THREADPOOL_WAITING = Gauge(
+    "threadpool_tasks_waiting",
+    "Calls queued for a free worker thread",
+    multiprocess_mode="livesum",
+)
+REFRESH_TOKEN_REUSE = Counter(
+    "refresh_token_reuse_total",
+    "Refresh tokens presented again after they were rotated",
+)
+
+UNMATCHED_ROUTE = "unmatched"
+
+
+@contextmanager
+def track_upstream(service: str, operation: str) -> Iterator[None]:
+    """Time an upstream call and count it as an error if it raises"""
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        UPSTREAM_ERRORS.labels(service, operation).inc()
+        raise
+    finally:
+        UPSTREAM_LATENCY.labels(service, operation).observe(time.perf_counter() - start)
+
+
+_UUID = re.compile(r"[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}")
+
+
+def supabase_operation(request: httpx.Request) -> str:
+    """Low-cardinality label for a Supabase API call, e.g. "GET rest/profiles"."""
+    path = _UUID.sub(":id", request.url.path)
+    parts = [part for part in path.split("/") if part]
+    if len(parts) >= 3 and parts[0] == "rest" and parts[2] == "rpc":
+        target = "rpc/" + "/".join(parts[3:4])
+    elif len(parts) >= 2 and parts[0] in ("rest", "auth", "storage", "functions"):
+        target = f"{parts[0]}/" + "/".join(parts[2:4])
+    else:
+        target = "/".join(parts[:2])
+    return f"{request.method} {target}"
+
+
+class InstrumentedTransport(httpx.AsyncHTTPTransport):
+    """Connection pool that records latency and errors for every request it sends"""
+
+    def __init__(self, service: str, operation: Callable[[httpx.Request], str] = supabase_operation, **kwargs):
+        super().__init__(**kwargs)
+        self.service = service
+        self.operation = operation
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        operation = self.operation(request)
+        with track_upstream(self.service, operation):
+            response = await super().handle_async_request(request)
+        if response.status_code >= 500:
+            UPSTREAM_ERRORS.labels(self.service, operation).inc()
+        return response
+
+
+class PrometheusMiddleware:
+    """Counts requests and records latency per route template and status code.
+
+    Plain ASGI rather than BaseHTTPMiddleware so it adds no extra task or body
+    buffering per request. The route template is looked up from the endpoint the
+    router resolved, so /api/admin/users/{user_id} is one series, not one per id.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+        self._routes: Optional[Dict[Callable, str]] = None
+
+    def _route_template(self, scope: Scope) -> str:
+        if self._routes is None:
+            self._routes = {
+                getattr(route, "endpoint", None): route.path
+                for route in scope["app"].routes
+                if hasattr(route, "path")
+            }
+        return self._routes.get(scope.get("endpoint"), UNMATCHED_ROUTE)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status_code = 500
+        start = time.perf_counter()
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        in_progress = REQUESTS_IN_PROGRESS.labels(method)
+        in_progress.inc()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            in_progress.dec()
+            route = self._route_template(scope)
+            status = str(status_code)
+            REQUESTS.labels(method, route, status).inc()
+            REQUEST_LATENCY.labels(method, route, status).observe(time.perf_counter() - start)
+
+
+def render_metrics() -> bytes:
+    """Exposition for /metrics, aggregated across workers in multiprocess mode"""
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry)
+    return generate_latest()
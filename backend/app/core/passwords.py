@@ -0,0 +1,40 @@
+"""bcrypt hashing, kept free of app imports so process-pool workers load it quickly.
+
+bcrypt only reads the first 72 bytes of a password; longer ones are cut there
+explicitly, which is what older bcrypt releases did silently.
+"""
+from typing import Optional, Tuple
+import bcrypt
+
+MAX_PASSWORD_BYTES = 72
+
+
+def _secret(password: str) -> bytes:
+    return password.encode("utf-8")[:MAX_PASSWORD_BYTES]
+
+
+def hash_rounds(hashed_password: str) -> Optional[int]:
+    """Cost factor of a "$2b$12$..." hash"""
+    parts = hashed_password.split("$")
+    return int(parts[2]) if len(parts) > 3 and parts[2].isdigit() else None
+
+
+def get_password_hash(password: str, rounds: int = 12) -> str:
+    return bcrypt.hashpw(_secret(password), bcrypt.gensalt(rounds)).decode("ascii")
+
+
+def verify_password(plain_password: str, hashed_password: str) -> bool:
+    try:
+        return bcrypt.checkpw(_secret(plain_password), hashed_password.encode("ascii"))
+    except ValueError:
+        # Not a bcrypt hash
+        return False
+
+
+def verify_and_update(plain_password: str, hashed_password: str, rounds: int) -> Tuple[bool, Optional[str]]:
+    """Whether the password matches, and a replacement hash if this one isn't at ``rounds``"""
+    if not verify_password(plain_password, hashed_password):
+        return False, None
+    if hash_rounds(hashed_password) != rounds:
+        return True, get_password_hash(plain_password, rounds)
+    return True, None
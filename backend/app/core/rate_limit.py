@@ -1,8 +1,179 @@
-from slowapi import Limiter
-from slowapi.util import get_remote_address
+"""Request rate limiting with GCRA (the generic cell rate algorithm).
+
+Each key stores a single timestamp, the theoretical arrival time (TAT) of its
+next request, so a check is one read and one write however large the quota.
+A quota of N per period allows a burst of N, then admits one request every
+period / N.
+
+Counters live in a ``RateLimitStore``. ``memory://`` keeps them in this worker
+(development and tests); a ``redis://`` URL shares them between workers and
+hosts, with the check done atomically by a server-side script.
+"""
+import re
+import time
+from abc import ABC, abstractmethod
+from typing import Dict, NamedTuple, Optional, Tuple
 from app.core.config import settings
+from app.core.metrics import RATE_LIMITED
+from app.core.subscriptions import PAID_STATUSES
+
+_PERIODS = {"second": 1, "minute": 60, "hour": 3600, "day": 86400}
+_QUOTA = re.compile(r"^\s*(\d+)\s*(?:/|per)\s*(second|minute|hour|day)s?\s*$")
+
+
+class Quota(NamedTuple):
+    limit: int
+    period: float
+
+    @property
+    def interval(self) -> float:
+        """Seconds between requests once the burst is used up"""
+        return self.period / self.limit
+
+
+class Decision(NamedTuple):
+    allowed: bool
+    remaining: int
+    retry_after: float
+
+
+def parse_quota(value: str) -> Quota:
+    """Parse "100/minute" or "100 per minute" """
+    match = _QUOTA.match(value)
+    if not match or int(match.group(1)) <= 0:
+        raise ValueError(f"Invalid rate limit: {value!r}")
+    return Quota(int(match.group(1)), _PERIODS[match.group(2)])
+
+
+def gcra(tat: Optional[float], now: float, quota: Quota) -> Tuple[Decision, Optional[float]]:
+    """The decision for a request at ``now``, and the key's new TAT if it was admitted"""
+    ahead = 0.0 if tat is None or tat < now else tat - now
+    # How far the TAT may run ahead of now; compared directly so a fresh key
+    # is never rejected by float rounding
+    tolerance = quota.period - quota.interval
+    if ahead > tolerance:
+        return Decision(False, 0, ahead - tolerance), None
+    return Decision(True, int((tolerance - ahead) / quota.interval), 0.0), now + ahead + quota.interval
+
+
+class RateLimitStore(ABC):
+    @abstractmethod
+    async def hit(self, key: str, quota: Quota) -> Decision:
+        """Count a request against ``key`` if the quota allows it"""
+
+    async def close(self) -> None:
+        return None
+
+
+class MemoryStore(RateLimitStore):
+    """Per-worker store; with N workers each enforces the quota on its own"""
+
+    def __init__(self, max_keys: int = 100_000):
+        self.max_keys = max_keys
+        self._tats: Dict[str, float] = {}
+
+    async def hit(self, key: str, quota: Quota) -> Decision:
+        now = time.monotonic()
+        decision, new_tat = gcra(self._tats.get(key), now, quota)
+        if new_tat is not None:
+            if key not in self._tats and len(self._tats) >= self.max_keys:
+                self._prune(now)
+            self._tats[key] = new_tat
+        return decision
+
+    def _prune(self, now: float) -> None:
+        # A TAT in the past is the same as no entry at all
+        self._tats = {key: tat for key, tat in self._tats.items() if tat > now}
+        # Everything still active: drop the oldest keys rather than grow unbounded
+        for key in list(self._tats)[: max(0, len(self._tats) - self.max_keys + 1)]:
+            del self._tats[key]
+
+
+# TAT in milliseconds of Redis server time, so every worker uses one clock.
+# ARGV: interval (ms), period (ms). Returns {allowed, remaining, retry_after_ms}.
+_GCRA_SCRIPT = """
+local time = redis.call('TIME')
+local now = tonumber(time[1]) * 1000 + math.floor(tonumber(time[2]) / 1000)
+local interval = tonumber(ARGV[1])
+local period = tonumber(ARGV[2])
+local tat = tonumber(redis.call('GET', KEYS[1]))
+local ahead = 0
+if tat and tat > now then
+    ahead = tat - now
+end
+local tolerance = period - interval
+if ahead > tolerance then
+    return {0, 0, math.ceil(ahead - tolerance)}
+end
+redis.call('SET', KEYS[1], now + ahead + interval, 'PX', math.ceil(ahead + interval))
+return {1, math.floor((tolerance - ahead) / interval), 0}
+"""
+
+
+class RedisStore(RateLimitStore):
+    """Store shared through Redis (or anything speaking its protocol and Lua)"""
+
+    def __init__(self, url: str, prefix: str = "ratelimit:"):
+        # Only deployments that share limits need the client library
+        import redis.asyncio as redis
+
+        self.prefix = prefix
+        self._client = redis.from_url(url)
+        self._script = self._client.register_script(_GCRA_SCRIPT)
+
+    async def hit(self, key: str, quota: Quota) -> Decision:
+        allowed, remaining, retry_after_ms = await self._script(
+            keys=[self.prefix + key],
+            args=[quota.interval * 1000, quota.period * 1000],
+        )
+        return Decision(bool(allowed), int(remaining), int(retry_after_ms) / 1000)
+
+    async def close(self) -> None:
+        await self._client.aclose()
+
+
+def create_store(url: str) -> RateLimitStore:
+    if url.startswith("memory://"):
+        return MemoryStore()
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        return RedisStore(url)
+    raise ValueError(f"Unsupported RATE_LIMIT_STORAGE_URL: {url}")
+
+
+class RateLimiter:
+    """Quotas by tier: "anonymous" and "client" (per client IP), "authenticated" and "subscribed" (per user)"""
+
+    def __init__(self, store: RateLimitStore, quotas: Dict[str, Quota], enabled: bool = True):
+        self.store = store
+        self.quotas = quotas
+        self.enabled = enabled
+
+    async def hit(self, key: str, tier: str) -> Decision:
+        quota = self.quotas[tier]
+        if not self.enabled:
+            return Decision(True, quota.limit, 0.0)
+        try:
+            decision = await self.store.hit(f"{tier}:{key}", quota)
+        except Exception as e:
+            # A shared store outage shouldn't take the API down with it
+            print(f"Rate limit store unavailable, allowing request: {e}")
+            return Decision(True, quota.limit, 0.0)
+        if not decision.allowed:
+            RATE_LIMITED.labels(tier).inc()
+        return decision
+
+
+def tier_for(subscription_status: Optional[str]) -> str:
+    return "subscribed" if subscription_status in PAID_STATUSES else "authenticated"
+
 
-limiter = Limiter(
-    key_func=get_remote_address,
-    default_limits=[settings.RATE_LIMIT]
-)
\ No newline at end of file
+limiter = RateLimiter(
+    create_store(settings.RATE_LIMIT_STORAGE_URL),
+    {
+        "anonymous": parse_quota(settings.RATE_LIMIT),
+        "authenticated": parse_quota(settings.RATE_LIMIT_AUTHENTICATED),
+        "subscribed": parse_quota(settings.RATE_LIMIT_SUBSCRIBED),
+        "client": parse_quota(settings.RATE_LIMIT_CLIENT),
+    },
+    enabled=settings.RATE_LIMIT_ENABLED,
+)
@@ -0,0 +1,204 @@
+"""Revoked sessions and users, checked on every authenticated request.
+
+Access tokens stay valid until they expire, so logout and account deletion
+add an entry here instead:
+
+- a session id (the ``session_id`` claim), for logging out one session;
+- a user id with a cut-off time, which rejects every token that user was issued
+  at or before then, for account deletion and "sign out everywhere".
+
+The same channel carries principal invalidations: a user whose role or plan
+changed has their cached ``User`` dropped in every worker, without being signed
+out. Revoking a user drops it too.
+
+Each worker checks its own dicts, two lookups per request with no I/O.
+Entries are needed only while a token issued before them could still be valid,
+so they expire after REVOCATION_TTL_SECONDS and are swept periodically.
+
+With a ``redis://`` REVOCATION_STORAGE_URL, revocations are also written to a
+sorted set that every worker polls. They then reach all workers within
+REVOCATION_SYNC_INTERVAL_SECONDS. ``memory://`` keeps them in this worker only.
+"""
+import asyncio
+import time
+from abc import ABC, abstractmethod
+from typing import Dict, List, Optional, Tuple
+from app.core.cache import principal_cache
+from app.core.config import settings
+
+# (kind, id, revoked_at); kind is "session", "user" or "principal"
+Revocation = Tuple[str, str, float]
+
+# Polls re-read this far back so a worker whose clock lags doesn't miss an entry
+_SYNC_OVERLAP_SECONDS = 5.0
+
+
+class RevocationList:
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        # session id -> when the entry can be dropped
+        self._sessions: Dict[str, float] = {}
+        # user id -> (revoked at, when the entry can be dropped)
+        self._users: Dict[str, Tuple[float, float]] = {}
+
+    def add(self, kind: str, key: str, revoked_at: float) -> None:
+        expires_at = revoked_at + self.ttl
+        if kind == "session":
+            self._sessions[key] = max(expires_at, self._sessions.get(key, 0))
+        elif revoked_at > self._users.get(key, (0, 0))[0]:
+            self._users[key] = (revoked_at, expires_at)
+
+    def is_revoked(self, user_id: str, session_id: Optional[str], issued_at: Optional[float]) -> bool:
+        if session_id is not None and session_id in self._sessions:
+            return True
+        entry = self._users.get(user_id)
+        # A token without an issue time can't be shown to postdate the cut-off
+        return entry is not None and (issued_at is None or issued_at <= entry[0])
+
+    def sweep(self, now: Optional[float] = None) -> None:
+        now = time.time() if now is None else now
+        self._sessions = {key: expires for key, expires in self._sessions.items() if expires > now}
+        self._users = {key: entry for key, entry in self._users.items() if entry[1] > now}
+
+    def __len__(self) -> int:
+        return len(self._sessions) + len(self._users)
+
+
+class RevocationBackend(ABC):
+    @abstractmethod
+    async def publish(self, revocation: Revocation) -> None:
+        """Make a revocation visible to the other workers"""
+
+    @abstractmethod
+    async def since(self, revoked_after: float) -> List[Revocation]:
+        """Revocations published after ``revoked_after``"""
+
+    async def prune(self, revoked_before: float) -> None:
+        """Drop revocations older than ``revoked_before``; nothing to do by default"""
+        return None
+
+    async def close(self) -> None:
+        return None
+
+
+class MemoryBackend(RevocationBackend):
+    """Nothing to share: the local list is the whole store"""
+
+    async def publish(self, revocation: Revocation) -> None:
+        pass
+
+    async def since(self, revoked_after: float) -> List[Revocation]:
+        return []
+
+
+class RedisBackend(RevocationBackend):
+    """One sorted set of "kind:id" members scored by revocation time"""
+
+    def __init__(self, url: str, key: str = "revocations"):
+        # Only deployments that share revocations need the client library
+        import redis.asyncio as redis
+
+        self.key = key
+        self._client = redis.from_url(url)
+
+    async def publish(self, revocation: Revocation) -> None:
+        kind, key, revoked_at = revocation
+        await self._client.zadd(self.key, {f"{kind}:{key}": revoked_at}, gt=True)
+
+    async def since(self, revoked_after: float) -> List[Revocation]:
+        rows = await self._client.zrangebyscore(self.key, f"({revoked_after}", "+inf", withscores=True)
+        revocations = []
+        for member, score in rows:
+            kind, _, key = member.decode().partition(":")
+            revocations.append((kind, key, score))
+        return revocations
+
+    async def prune(self, revoked_before: float) -> None:
+        await self._client.zremrangebyscore(self.key, "-inf", revoked_before)
+
+    async def close(self) -> None:
+        await self._client.aclose()
+
+
+def create_backend(url: str) -> RevocationBackend:
+    if url.startswith("memory://"):
+        return MemoryBackend()
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        return RedisBackend(url)
+    raise ValueError(f"Unsupported REVOCATION_STORAGE_URL: {url}")
+
+
+class Revocations:
+    def __init__(self, backend: RevocationBackend, ttl: float):
+        self.backend = backend
+        self.local = RevocationList(ttl)
+        self._synced_until = 0.0
+        self._swept_at = time.time()
+
+    @property
+    def shared(self) -> bool:
+        """Whether other workers publish revocations that need syncing"""
+        return not isinstance(self.backend, MemoryBackend)
+
+    def is_revoked(self, user_id: str, session_id: Optional[str], issued_at: Optional[float]) -> bool:
+        return self.local.is_revoked(user_id, session_id, issued_at)
+
+    async def revoke_session(self, session_id: str) -> None:
+        await self._revoke(("session", session_id, time.time()))
+
+    async def revoke_user(self, user_id: str) -> None:
+        """Reject every token the user holds now; new sign-ins aren't affected"""
+        await self._revoke(("user", user_id, time.time()))
+
+    async def invalidate_principal(self, user_id: str) -> None:
+        """Drop the user's cached principal in every worker, after a role or plan change"""
+        await self._revoke(("principal", user_id, time.time()))
+
+    def _apply(self, revocation: Revocation) -> None:
+        kind, key, revoked_at = revocation
+        if kind != "principal":
+            self.local.add(kind, key, revoked_at)
+        if kind != "session":
+            principal_cache.invalidate(key)
+
+    async def _revoke(self, revocation: Revocation) -> None:
+        # Effective in this worker right away, whether or not the backend is reachable
+        self._apply(revocation)
+        if not self.shared and revocation[2] - self._swept_at > self.local.ttl / 10:
+            # No sync task runs for memory://, so writes keep the list swept
+            self.local.sweep(revocation[2])
+            self._swept_at = revocation[2]
+        try:
+            await self.backend.publish(revocation)
+        except Exception as e:
+            print(f"Failed to share revocation of {revocation[0]} {revocation[1]}: {e}")
+
+    async def sync(self) -> None:
+        """Apply revocations published by other workers and drop expired entries"""
+        now = time.time()
+        start = max(self._synced_until - _SYNC_OVERLAP_SECONDS, now - self.local.ttl)
+        for revocation in await self.backend.since(start):
+            self._apply(revocation)
+        self._synced_until = now
+        self.local.sweep(now)
+        self._swept_at = now
+
+    async def close(self) -> None:
+        await self.backend.close()
+
+
+async def run_revocation_sync(revocations: Revocations, interval: float) -> None:
+    """Sync and sweep every ``interval`` seconds until cancelled"""
+    last_prune = 0.0
+    while True:
+        try:
+            await revocations.sync()
+            if time.time() - last_prune > revocations.local.ttl / 10:
+                last_prune = time.time()
+                await revocations.backend.prune(last_prune - revocations.local.ttl)
+        except Exception as e:
+            print(f"Revocation sync failed: {e}")
+        await asyncio.sleep(interval)
+
+
+revocations = Revocations(create_backend(settings.REVOCATION_STORAGE_URL), settings.REVOCATION_TTL_SECONDS)
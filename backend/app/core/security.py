@@ -1,10 +1,20 @@
+import asyncio
+import time
 from datetime import datetime, timedelta
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
 from jose import JWTError, jwt
-from passlib.context import CryptContext
 from app.core.config import settings
+from app.core.database import get_http_client
+from app.core.passwords import get_password_hash, verify_password  # noqa: F401
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+ASYMMETRIC_ALGORITHMS = ["RS256", "ES256"]
+
+# Minimum delay between forced JWKS refetches triggered by an unknown key id
+JWKS_MIN_REFETCH_SECONDS = 30
+
+
+class TokenVerificationUnavailable(Exception):
+    """Raised when no signing key is available to verify a token locally."""
 
 
 def create_access_token(data: Dict[str, Any], expires_delta: Optional[timedelta] = None) -> str:
@@ -18,17 +28,112 @@ def create_access_token(data: Dict[str, Any], expires_delta: Optional[timedelta]
     return encoded_jwt
 
 
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+def decode_token(
+    token: str,
+    key: Optional[Any] = None,
+    algorithms: Optional[List[str]] = None,
+    audience: Optional[str] = None,
+    issuer: Optional[str] = None,
+) -> Optional[Dict[str, Any]]:
+    try:
+        payload = jwt.decode(
+            token,
+            key if key is not None else settings.JWT_SECRET,
+            algorithms=algorithms or [settings.JWT_ALGORITHM],
+            audience=audience,
+            issuer=issuer,
+        )
+        return payload
+    except JWTError:
+        return None
+
+
+class SigningKeyCache:
+    """Keys used to verify Supabase access tokens.
+
+    Uses the project's HS256 secret when one is configured. Otherwise the JWKS
+    published by Supabase Auth is fetched on first use and refreshed in the
+    background once it is older than ``refresh_seconds``; requests keep using the
+    cached keys while the refresh runs.
+    """
+
+    def __init__(self, jwks_url: str, secret: Optional[str], refresh_seconds: int):
+        self.jwks_url = jwks_url
+        self.secret = secret
+        self.refresh_seconds = refresh_seconds
+        self._keys: Dict[Optional[str], Dict[str, Any]] = {}
+        self._fetched_at = 0.0
+        self._lock = asyncio.Lock()
+        self._refresh_task: Optional[asyncio.Task] = None
 
+    async def get_key(self, kid: Optional[str], alg: Optional[str]) -> Optional[Any]:
+        """Return the key for a token header, or None if it can't be verified locally"""
+        if self.secret:
+            return self.secret if alg == "HS256" else None
+        if alg not in ASYMMETRIC_ALGORITHMS:
+            return None
 
-def get_password_hash(password: str) -> str:
-    return pwd_context.hash(password)
+        if not self._fetched_at:
+            await self.refresh()
+        elif time.monotonic() - self._fetched_at > self.refresh_seconds:
+            self._schedule_refresh()
 
+        key = self._keys.get(kid)
+        if key is None and time.monotonic() - self._fetched_at > JWKS_MIN_REFETCH_SECONDS:
+            # Key rotation: the token may be signed by a key we haven't seen yet
+            await self.refresh()
+            key = self._keys.get(kid)
+        return key
 
-def decode_token(token: str) -> Optional[Dict[str, Any]]:
+    async def refresh(self) -> None:
+        async with self._lock:
+            try:
+                response = await get_http_client().get(self.jwks_url, timeout=5.0)
+                response.raise_for_status()
+                jwks = response.json()
+                self._keys = {
+                    jwk.get("kid"): jwk
+                    for jwk in jwks.get("keys", [])
+                    if jwk.get("alg") in ASYMMETRIC_ALGORITHMS
+                }
+            except Exception as e:
+                print(f"JWKS refresh failed, keeping cached keys: {e}")
+            # Record the attempt either way so failures don't refetch on every request
+            self._fetched_at = time.monotonic()
+
+    def _schedule_refresh(self) -> None:
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.create_task(self.refresh())
+
+
+signing_keys = SigningKeyCache(
+    jwks_url=settings.supabase_jwks_url,
+    secret=settings.SUPABASE_JWT_SECRET,
+    refresh_seconds=settings.SUPABASE_JWKS_REFRESH_SECONDS,
+)
+
+
+async def verify_access_token(token: str) -> Optional[Dict[str, Any]]:
+    """Verify a Supabase access token in-process.
+
+    Checks signature, expiry, audience and issuer and returns the claims, or None
+    if the token is invalid. Raises TokenVerificationUnavailable when there is no
+    local key for the token, so the caller can decide whether to ask Supabase.
+    """
     try:
-        payload = jwt.decode(token, settings.JWT_SECRET, algorithms=[settings.JWT_ALGORITHM])
-        return payload
+        header = jwt.get_unverified_header(token)
     except JWTError:
-        return None
\ No newline at end of file
+        return None
+
+    alg = header.get("alg")
+    key = await signing_keys.get_key(header.get("kid"), alg)
+    if key is None:
+        raise TokenVerificationUnavailable(f"No signing key for kid={header.get('kid')} alg={alg}")
+
+    return decode_token(
+        token,
+        key=key,
+        algorithms=[alg],
+        audience=settings.SUPABASE_JWT_AUDIENCE,
+        issuer=settings.supabase_jwt_issuer,
+    )
@@ -0,0 +1,84 @@
+import hashlib
+from typing import Any, Dict
+from jose import jwt
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.metrics import REFRESH_TOKEN_REUSE
+from app.core.revocation import revocations
+from app.core.singleflight import SingleFlight
+from app.services.auth_gateway import AuthGatewayError, auth_gateway
+
+# Supabase's error codes for a refresh token that was already rotated or revoked
+_UPSTREAM_REUSE_CODES = {"refresh_token_already_used", "session_not_found"}
+
+
+class RefreshTokenReused(Exception):
+    """A rotated refresh token was presented again; the caller must sign in"""
+
+
+# Both keyed by a hash of the old refresh token, so the keys can't be replayed.
+# Rotations still in their grace period, with the session they produced. That
+# session includes its live refresh token: for REFRESH_TOKEN_REUSE_GRACE_SECONDS
+# anyone presenting the old token, such as a second tab, is handed the new session.
+_recent_rotations = TTLCache(
+    maxsize=settings.REFRESH_TOKEN_REUSE_MAX_TRACKED,
+    ttl=settings.REFRESH_TOKEN_REUSE_GRACE_SECONDS,
+)
+# Every recent rotation, with who it belonged to
+_rotated = TTLCache(
+    maxsize=settings.REFRESH_TOKEN_REUSE_MAX_TRACKED,
+    ttl=settings.REFRESH_TOKEN_REUSE_WINDOW_SECONDS,
+)
+_refresh_flight = SingleFlight("token_refresh")
+
+
+def _fingerprint(refresh_token: str) -> str:
+    return hashlib.sha256(refresh_token.encode()).hexdigest()
+
+
+def _session_owner(session: Dict[str, Any]) -> Dict[str, Any]:
+    claims = jwt.get_unverified_claims(session["access_token"])
+    return {"user_id": claims.get("sub"), "session_id": claims.get("session_id")}
+
+
+async def _reused(owner: Dict[str, Any]) -> RefreshTokenReused:
+    REFRESH_TOKEN_REUSE.inc()
+    print(f"Refresh token reuse detected for user {owner.get('user_id')} (session {owner.get('session_id')})")
+    # Access tokens already issued to the session stop working too
+    if owner.get("session_id"):
+        await revocations.revoke_session(owner["session_id"])
+    return RefreshTokenReused()
+
+
+async def refresh_session(refresh_token: str) -> Dict[str, Any]:
+    """Rotate a refresh token into a new session.
+
+    Concurrent refreshes with one token share one upstream call, and repeats
+    within the grace period get the same session back. A token presented again
+    after that was stolen or replayed: it's rejected, and still sent on to
+    Supabase so its reuse detection revokes the session's newer tokens too.
+    """
+    fingerprint = _fingerprint(refresh_token)
+    session = _recent_rotations.get(fingerprint)
+    if session is not None:
+        return session
+    owner = _rotated.get(fingerprint)
+    if owner is not None:
+        try:
+            await auth_gateway.refresh_session(refresh_token)
+        except AuthGatewayError:
+            pass
+        raise await _reused(owner)
+    return await _refresh_flight.do(fingerprint, lambda: _rotate(fingerprint, refresh_token))
+
+
+async def _rotate(fingerprint: str, refresh_token: str) -> Dict[str, Any]:
+    try:
+        session = await auth_gateway.refresh_session(refresh_token)
+    except AuthGatewayError as e:
+        if e.code in _UPSTREAM_REUSE_CODES:
+            raise await _reused({}) from e
+        raise
+    _recent_rotations.set(fingerprint, session)
+    _rotated.set(fingerprint, _session_owner(session))
+    return session
@@ -0,0 +1,32 @@
+import time
+from contextlib import contextmanager
+from typing import Iterator, List, Tuple
+
+
+class StartupTimer:
+    """Records how long each boot phase takes, from the moment app.main is imported"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self._last = self.started
+        self.phases: List[Tuple[str, float]] = []
+
+    def mark(self, name: str) -> None:
+        """Close a phase that ran since the previous mark"""
+        now = time.perf_counter()
+        self.phases.append((name, now - self._last))
+        self._last = now
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        self.mark("other")
+        yield
+        self.mark(name)
+
+    def report(self) -> str:
+        total = time.perf_counter() - self.started
+        phases = ", ".join(f"{name} {seconds * 1000:.0f}ms" for name, seconds in self.phases if seconds >= 0.0005)
+        return f"Startup took {total * 1000:.0f}ms ({phases})"
+
+
+startup_timer = StartupTimer()
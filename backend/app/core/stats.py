@@ -0,0 +1,34 @@
+import asyncio
+from typing import Dict
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.singleflight import SingleFlight
+
+# The rollup is already one small read; this absorbs dashboard bursts on top
+_stats_cache = TTLCache(maxsize=1, ttl=settings.STATS_CACHE_TTL_SECONDS)
+# and this keeps every request that misses at expiry from querying at once
+_stats_flight = SingleFlight("dashboard_stats")
+
+
+async def get_dashboard_stats(db) -> Dict[str, int]:
+    """totalUsers, newUsersThisWeek, newUsersThisMonth and activeUsersToday.
+
+    Served from the counters that triggers on profiles maintain (see
+    migrations/004), so this never counts over the whole table.
+    """
+    stats = _stats_cache.get("dashboard")
+    if stats is None:
+        stats = await _stats_flight.do("dashboard", db.profiles.dashboard_stats)
+        _stats_cache.set("dashboard", stats)
+    return stats
+
+
+async def reconcile_stats_periodically(db, interval: float) -> None:
+    """Correct drift in the rollup every ``interval`` seconds until cancelled"""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await db.profiles.reconcile_stats()
+            _stats_cache.clear()
+        except Exception as e:
+            print(f"Stats reconciliation failed: {e}")
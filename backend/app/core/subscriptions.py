@@ -0,0 +1,108 @@
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Union
+from app.core.config import settings
+from app.core.singleflight import SingleFlight
+
+# Statuses that get paid features (and the subscriber rate limit)
+PAID_STATUSES = frozenset({"active", "trialing"})
+
+# When a customer has several subscriptions, the one that decides their access:
+# lowest rank wins, then the newest. canceled, incomplete_expired and anything
+# unknown rank last.
+_STATUS_RANK = {"active": 0, "trialing": 0, "past_due": 1, "unpaid": 2, "incomplete": 3, "paused": 3}
+_UNRANKED = 4
+
+# Stripe's largest page; customers have a handful of subscriptions at most
+_SUBSCRIPTIONS_PAGE = 100
+
+# Mirror columns for a customer with no subscription in Stripe
+NO_SUBSCRIPTION = {
+    "subscription_status": None,
+    "subscription_current_period_end": None,
+    "subscription_cancel_at_period_end": False,
+    "subscription_price_id": None,
+}
+
+_reconcile_flight = SingleFlight("subscription_reconcile")
+
+
+def _from_epoch(value: Optional[int]) -> Optional[datetime]:
+    return datetime.fromtimestamp(value, tz=timezone.utc) if value is not None else None
+
+
+def _as_datetime(value: Union[str, datetime, None]) -> Optional[datetime]:
+    """Timestamp column as a datetime (PostgREST returns ISO strings, asyncpg datetimes)"""
+    if value is None or isinstance(value, datetime):
+        return value
+    return datetime.fromisoformat(value)
+
+
+def mirror_values(subscription: Dict[str, Any]) -> Dict[str, Any]:
+    """Profile columns mirroring a Stripe subscription object"""
+    items = (subscription.get("items") or {}).get("data") or []
+    price = items[0].get("price") if items else None
+    return {
+        "subscription_status": subscription.get("status"),
+        "subscription_current_period_end": _from_epoch(subscription.get("current_period_end")),
+        "subscription_cancel_at_period_end": bool(subscription.get("cancel_at_period_end")),
+        "subscription_price_id": price.get("id") if price else None,
+        "subscription_synced_at": datetime.now(timezone.utc),
+    }
+
+
+def is_stale(profile: Dict[str, Any]) -> bool:
+    """Whether the mirror is missing, too old, or past a renewal we never heard about"""
+    synced_at = _as_datetime(profile.get("subscription_synced_at"))
+    if synced_at is None:
+        return True
+
+    now = datetime.now(timezone.utc)
+    if (now - synced_at).total_seconds() > settings.SUBSCRIPTION_MIRROR_MAX_AGE_SECONDS:
+        return True
+
+    period_end = _as_datetime(profile.get("subscription_current_period_end"))
+    return profile.get("subscription_status") in PAID_STATUSES and period_end is not None and period_end < now
+
+
+async def reconcile_subscription(db, user_id: str, customer_id: str) -> Optional[Dict[str, Any]]:
+    """Re-read the customer's subscriptions from Stripe and store the one that counts on the profile.
+
+    Concurrent reconciles for the same customer share one Stripe call.
+    """
+    return await _reconcile_flight.do(customer_id, lambda: _reconcile(db, user_id, customer_id))
+
+
+async def _reconcile(db, user_id: str, customer_id: str) -> Optional[Dict[str, Any]]:
+    # Imported here so webhook processing and rate limiting don't load the client
+    from app.services.stripe import stripe_client
+
+    subscriptions = await stripe_client.list_subscriptions(customer_id, status="all", limit=_SUBSCRIPTIONS_PAGE)
+
+    if subscriptions["data"]:
+        values = mirror_values(best_subscription(subscriptions["data"]))
+    else:
+        values = {**NO_SUBSCRIPTION, "subscription_synced_at": datetime.now(timezone.utc)}
+    return await db.profiles.update(user_id, values)
+
+
+def best_subscription(subscriptions: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """The subscription that decides access, so a newer canceled or incomplete
+    one doesn't hide an older active one"""
+    return min(
+        subscriptions,
+        key=lambda sub: (_STATUS_RANK.get(sub.get("status"), _UNRANKED), -(sub.get("created") or 0)),
+    )
+
+
+def subscription_response(profile: Dict[str, Any]) -> Dict[str, Any]:
+    """GET /api/billing/subscription body for a mirrored profile"""
+    if profile.get("subscription_status") not in PAID_STATUSES:
+        return {"status": "free"}
+
+    period_end = _as_datetime(profile.get("subscription_current_period_end"))
+    return {
+        "status": "active",
+        "current_period_end": int(period_end.timestamp()) if period_end else None,
+        "cancel_at_period_end": bool(profile.get("subscription_cancel_at_period_end")),
+        "price_id": profile.get("subscription_price_id"),
+    }
@@ -0,0 +1,304 @@
+import asyncio
+import json
+import sqlite3
+import threading
+import time
+from itertools import groupby
+from typing import Any, Dict, List, Optional
+from fastapi.concurrency import run_in_threadpool
+from app.core.config import settings
+from app.core.revocation import revocations
+from app.core.subscriptions import mirror_values
+
+# Stripe events that change what we mirror on profiles; anything else is
+# acknowledged without being stored
+HANDLED_EVENTS = frozenset({
+    "checkout.session.completed",
+    "customer.subscription.created",
+    "customer.subscription.updated",
+    "customer.subscription.deleted",
+})
+
+# Give up on an event after this many failed attempts. It's parked: kept in
+# the table with parked_at and last_error set for inspection, never purged
+MAX_ATTEMPTS = 10
+
+# A worker's claim on a batch expires after this long, so a crashed worker's
+# events are picked up by another one
+LEASE_SECONDS = 60
+
+# Processed events are kept this long to drop Stripe's redeliveries (it retries
+# for up to three days)
+RETENTION_SECONDS = 7 * 24 * 3600
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS stripe_events (
+    id TEXT PRIMARY KEY,
+    type TEXT NOT NULL,
+    group_key TEXT NOT NULL,
+    created INTEGER NOT NULL,
+    payload TEXT NOT NULL,
+    received_at REAL NOT NULL,
+    lease_until REAL,
+    processed_at REAL,
+    parked_at REAL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    last_error TEXT
+);
+-- Newest event already applied per customer, so late or redelivered older
+-- events can't roll a profile back
+CREATE TABLE IF NOT EXISTS stripe_event_versions (
+    group_key TEXT PRIMARY KEY,
+    created INTEGER NOT NULL
+);
+"""
+
+# Run after SCHEMA, once parked_at exists on queues created before it
+INDEXES = """
+CREATE INDEX IF NOT EXISTS stripe_events_pending ON stripe_events (processed_at, created);
+CREATE INDEX IF NOT EXISTS stripe_events_parked ON stripe_events (parked_at) WHERE parked_at IS NOT NULL;
+"""
+
+
+def _group_key(event: Dict[str, Any]) -> str:
+    """Events for the same customer are applied in order; checkouts without one fall back to the user.
+
+    An event with neither is still stored, in a group of its own, so the
+    endpoint acknowledges it instead of failing and making Stripe retry.
+    """
+    obj = event.get("data", {}).get("object") or {}
+    if obj.get("customer"):
+        return f"customer:{obj['customer']}"
+    user_id = (obj.get("metadata") or {}).get("user_id")
+    if user_id:
+        return f"user:{user_id}"
+    return f"event:{event['id']}"
+
+
+class WebhookQueue:
+    """Durable local queue of verified Stripe events, keyed by event id.
+
+    Backed by a SQLite file so the webhook endpoint can acknowledge as soon as
+    the event is on disk. Workers sharing the file (several uvicorn workers on one
+    host) claim events a customer at a time, so each customer's events are applied
+    by one worker in order.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self.wakeup = asyncio.Event()
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            # Every enqueue is fsynced before Stripe gets its 200
+            conn.execute("PRAGMA synchronous=FULL")
+            conn.executescript(SCHEMA)
+            columns = {row["name"] for row in conn.execute("PRAGMA table_info(stripe_events)")}
+            if "parked_at" not in columns:
+                # Queues from before parked_at marked given-up events processed
+                conn.executescript(f"""
+                    ALTER TABLE stripe_events ADD COLUMN parked_at REAL;
+                    UPDATE stripe_events SET parked_at = processed_at, processed_at = NULL
+                    WHERE attempts >= {MAX_ATTEMPTS} AND last_error IS NOT NULL;
+                """)
+            conn.executescript(INDEXES)
+            self._conn = conn
+        return self._conn
+
+    def enqueue(self, event: Dict[str, Any]) -> bool:
+        """Store an event; returns False if it was already queued (a redelivery)"""
+        with self._lock:
+            cursor = self._connect().execute(
+                "INSERT OR IGNORE INTO stripe_events (id, type, group_key, created, payload, received_at)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                (event["id"], event["type"], _group_key(event), event["created"], json.dumps(event), time.time()),
+            )
+            return cursor.rowcount == 1
+
+    def claim(self, limit: int) -> List[sqlite3.Row]:
+        """Lease up to ``limit`` pending events, skipping customers another worker holds"""
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                rows = conn.execute(
+                    """
+                    SELECT e.*, v.created AS applied_created
+                    FROM stripe_events e
+                    LEFT JOIN stripe_event_versions v ON v.group_key = e.group_key
+                    WHERE e.processed_at IS NULL AND e.parked_at IS NULL
+                      AND (e.lease_until IS NULL OR e.lease_until < :now)
+                      AND e.group_key NOT IN (
+                          SELECT group_key FROM stripe_events
+                          WHERE processed_at IS NULL AND parked_at IS NULL AND lease_until >= :now
+                      )
+                    ORDER BY e.created, e.received_at
+                    LIMIT :limit
+                    """,
+                    {"now": now, "limit": limit},
+                ).fetchall()
+                conn.executemany(
+                    "UPDATE stripe_events SET lease_until = ? WHERE id = ?",
+                    [(now + LEASE_SECONDS, row["id"]) for row in rows],
+                )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        return rows
+
+    def complete(self, ids: List[str], group_key: str, created: Optional[int]) -> None:
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.executemany(
+                    "UPDATE stripe_events SET processed_at = ?, lease_until = NULL, last_error = NULL WHERE id = ?",
+                    [(now, event_id) for event_id in ids],
+                )
+                if created is not None:
+                    conn.execute(
+                        "INSERT INTO stripe_event_versions (group_key, created) VALUES (?, ?)"
+                        " ON CONFLICT (group_key) DO UPDATE SET created = max(created, excluded.created)",
+                        (group_key, created),
+                    )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+    def fail(self, ids: List[str], error: str) -> None:
+        """Retry the events after a backoff, or park them once they've failed MAX_ATTEMPTS times.
+
+        The backoff is a lease nobody holds, so the customer's later events wait too.
+        """
+        now = time.time()
+        with self._lock:
+            self._connect().executemany(
+                """
+                UPDATE stripe_events
+                SET attempts = attempts + 1,
+                    last_error = ?,
+                    lease_until = ? + min(300, 1 << attempts),
+                    parked_at = CASE WHEN attempts + 1 >= ? THEN ? END
+                WHERE id = ?
+                """,
+                [(error, now, MAX_ATTEMPTS, now, event_id) for event_id in ids],
+            )
+
+    def purge(self, older_than: float) -> int:
+        """Drop events processed before ``older_than``; parked events are kept"""
+        with self._lock:
+            cursor = self._connect().execute(
+                "DELETE FROM stripe_events WHERE processed_at < ?", (older_than,)
+            )
+            return cursor.rowcount
+
+    def pending(self) -> int:
+        with self._lock:
+            return self._connect().execute(
+                "SELECT count(*) FROM stripe_events WHERE processed_at IS NULL AND parked_at IS NULL"
+            ).fetchone()[0]
+
+    def parked(self) -> List[sqlite3.Row]:
+        """Events given up on after MAX_ATTEMPTS, oldest first"""
+        with self._lock:
+            return self._connect().execute(
+                "SELECT id, type, group_key, attempts, last_error, parked_at FROM stripe_events"
+                " WHERE parked_at IS NOT NULL ORDER BY parked_at"
+            ).fetchall()
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+webhook_queue = WebhookQueue(settings.STRIPE_WEBHOOK_QUEUE_PATH)
+
+
+def _profile_values(event: Dict[str, Any]) -> Dict[str, Any]:
+    obj = event["data"]["object"]
+    if event["type"] == "checkout.session.completed":
+        # Period and price arrive with the subscription events; until then,
+        # leave the mirror unsynced so the next read reconciles it
+        return {"subscription_status": "active", "subscription_synced_at": None}
+    return mirror_values(obj)
+
+
+async def _apply_group(db, group_key: str, rows: List[sqlite3.Row]) -> Optional[int]:
+    """Fold one customer's events into a single profile update; returns the newest applied event time"""
+    applied_created = rows[0]["applied_created"]
+    values: Dict[str, Any] = {}
+    newest = None
+    for row in rows:
+        if applied_created is not None and row["created"] < applied_created:
+            continue  # older than what the profile already reflects
+        if row["type"] == "checkout.session.completed" and values.get("subscription_synced_at"):
+            continue  # a subscription snapshot already says more
+        values.update(_profile_values(json.loads(row["payload"])))
+        newest = row["created"]
+
+    if values:
+        kind, key = group_key.split(":", 1)
+        if kind == "customer":
+            profile = await db.profiles.update_by_stripe_customer(key, values)
+        elif kind == "user":
+            profile = await db.profiles.update(key, values)
+        else:
+            print(f"Stripe event {key} names no customer or user; nothing to update")
+            profile = None
+        if profile:
+            # The cached principal carries the plan used for the rate limit tier
+            await revocations.invalidate_principal(profile["id"])
+    return newest
+
+
+async def process_batch(queue: WebhookQueue, db, limit: int) -> int:
+    """Apply one batch of queued events; returns how many events it handled"""
+    rows = await run_in_threadpool(queue.claim, limit)
+    # Stable sort: each customer's events stay in the order they were created
+    by_customer = sorted(rows, key=lambda row: row["group_key"])
+    groups = [(key, list(group)) for key, group in groupby(by_customer, key=lambda row: row["group_key"])]
+
+    async def handle(group_key: str, group: List[sqlite3.Row]) -> None:
+        ids = [row["id"] for row in group]
+        try:
+            newest = await _apply_group(db, group_key, group)
+        except Exception as e:
+            print(f"Stripe webhook processing failed for {group_key}: {e}")
+            await run_in_threadpool(queue.fail, ids, str(e))
+        else:
+            await run_in_threadpool(queue.complete, ids, group_key, newest)
+
+    await asyncio.gather(*(handle(key, group) for key, group in groups))
+    return len(rows)
+
+
+async def run_webhook_worker(queue: WebhookQueue, db) -> None:
+    """Drain the queue until cancelled, waking on new events or every poll interval"""
+    last_purge = 0.0
+    while True:
+        try:
+            handled = await process_batch(queue, db, settings.STRIPE_WEBHOOK_BATCH_SIZE)
+            if time.time() - last_purge > 3600:
+                await run_in_threadpool(queue.purge, time.time() - RETENTION_SECONDS)
+                last_purge = time.time()
+        except Exception as e:
+            print(f"Stripe webhook worker error: {e}")
+            handled = 0
+
+        if handled < settings.STRIPE_WEBHOOK_BATCH_SIZE:
+            queue.wakeup.clear()
+            try:
+                await asyncio.wait_for(queue.wakeup.wait(), settings.STRIPE_WEBHOOK_POLL_SECONDS)
+            except asyncio.TimeoutError:
+                pass
@@ -0,0 +1,153 @@
+"""The signup whitelist, held in memory so WHITELIST_MODE costs no query per signup.
+
+Each worker reads the whole whitelist table once, then every
+WHITELIST_REFRESH_INTERVAL_SECONDS reads only the rows whose ``updated_at``
+moved since. Removals are rows with ``removed_at`` set (migrations/008), so
+polls see them too. The admin bulk endpoints update this worker's index as
+soon as the table is written; other workers pick the change up on their next poll.
+
+Up to WHITELIST_EXACT_MAX_ENTRIES emails are kept in a set. A larger whitelist
+is kept as a Bloom filter instead, a few bytes per email rather than ~100
+for a set entry. Emails it rules out are rejected without a query, and the few it
+can't rule out are confirmed with one lookup. Removals can't be taken out of a
+Bloom filter, which the confirming lookup covers until the next full reload
+(WHITELIST_FULL_RELOAD_SECONDS) rebuilds it.
+"""
+import asyncio
+import hashlib
+import math
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Set
+from app.core.config import settings
+from app.repositories.base import WhitelistRepository
+
+# Polls re-read this far back, for rows whose transaction committed after a
+# later-stamped one had already been read
+_REFRESH_OVERLAP = timedelta(seconds=5)
+
+
+class BloomFilter:
+    def __init__(self, capacity: int, error_rate: float):
+        self.size = max(64, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, key: str) -> Iterable[int]:
+        # Double hashing: k positions from one 128-bit digest
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], "little")
+        step = int.from_bytes(digest[8:], "little") | 1
+        return ((first + i * step) % self.size for i in range(self.hashes))
+
+    def add(self, key: str) -> None:
+        for position in self._positions(key):
+            self._bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, key: str) -> bool:
+        return all(self._bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+
+def _timestamp(value: Any) -> datetime:
+    # PostgREST returns ISO strings, asyncpg datetimes
+    return value if isinstance(value, datetime) else datetime.fromisoformat(value)
+
+
+class WhitelistIndex:
+    def __init__(self, max_exact: int, error_rate: float, page_size: int = 1000):
+        self.max_exact = max_exact
+        self.error_rate = error_rate
+        self.page_size = page_size
+        self.loaded = False
+        self._emails: Set[str] = set()
+        # Replaces _emails once the whitelist outgrows max_exact, sized with
+        # room to keep growing until the next full reload resizes it
+        self._bloom: Optional[BloomFilter] = None
+        self._bloom_capacity = 4 * max_exact
+        # Emails added to the Bloom filter, to size the next one
+        self._bloom_count = 0
+        self._since: Optional[datetime] = None
+        self._lock = asyncio.Lock()
+
+    def __len__(self) -> int:
+        return self._bloom_count if self._bloom is not None else len(self._emails)
+
+    def _insert(self, email: str) -> None:
+        if self._bloom is not None:
+            self._bloom.add(email)
+            self._bloom_count += 1
+            return
+        self._emails.add(email)
+        if len(self._emails) > self.max_exact:
+            self._bloom = BloomFilter(self._bloom_capacity, self.error_rate)
+            for existing in self._emails:
+                self._bloom.add(existing)
+            self._bloom_count = len(self._emails)
+            self._emails = set()
+
+    def _apply(self, rows: List[Dict[str, Any]]) -> None:
+        for row in rows:
+            email = row["email"].lower()
+            if row.get("removed_at"):
+                self._emails.discard(email)
+            else:
+                self._insert(email)
+            updated_at = _timestamp(row["updated_at"])
+            if self._since is None or updated_at > self._since:
+                self._since = updated_at
+
+    async def load(self, repository: WhitelistRepository) -> None:
+        """Replace the index with the table's current contents"""
+        async with self._lock:
+            # Built aside and swapped in, so lookups meanwhile use the old index
+            fresh = WhitelistIndex(self.max_exact, self.error_rate, self.page_size)
+            fresh._bloom_capacity = max(self._bloom_capacity, 2 * len(self))
+            async for page in repository.iter_changes(None, self.page_size):
+                fresh._apply(page)
+            self._emails, self._bloom, self._bloom_count = fresh._emails, fresh._bloom, fresh._bloom_count
+            self._bloom_capacity, self._since = fresh._bloom_capacity, fresh._since
+            self.loaded = True
+
+    async def refresh(self, repository: WhitelistRepository) -> None:
+        """Apply rows changed since the last load or refresh"""
+        async with self._lock:
+            since = self._since - _REFRESH_OVERLAP if self._since else None
+            async for page in repository.iter_changes(since, self.page_size):
+                self._apply(page)
+
+    def add(self, emails: Iterable[str]) -> None:
+        for email in emails:
+            self._insert(email.lower())
+
+    def remove(self, emails: Iterable[str]) -> None:
+        for email in emails:
+            self._emails.discard(email.lower())
+
+    async def contains(self, email: str, repository: WhitelistRepository) -> bool:
+        email = email.lower()
+        if not self.loaded:
+            return await repository.contains(email)
+        if self._bloom is None:
+            return email in self._emails
+        return email in self._bloom and await repository.contains(email)
+
+
+async def run_whitelist_refresh(
+    index: WhitelistIndex, repository: WhitelistRepository, interval: float, full_reload_interval: float
+) -> None:
+    """Load the whitelist, then poll for changes every ``interval`` seconds until cancelled"""
+    last_load = 0.0
+    while True:
+        try:
+            if not index.loaded or time.monotonic() - last_load > full_reload_interval:
+                await index.load(repository)
+                last_load = time.monotonic()
+                print(f"Whitelist index loaded: {len(index)} emails")
+            else:
+                await index.refresh(repository)
+        except Exception as e:
+            print(f"Whitelist refresh failed: {e}")
+        await asyncio.sleep(interval)
+
+
+whitelist_index = WhitelistIndex(settings.WHITELIST_EXACT_MAX_ENTRIES, settings.WHITELIST_BLOOM_ERROR_RATE)
@@ -1,25 +1,98 @@
+# Imported first so the startup report includes the time spent importing
+from app.core.startup import startup_timer  # noqa: I001
+
+import asyncio
 from contextlib import asynccontextmanager
-from fastapi import FastAPI
+from fastapi import Depends, FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from slowapi import _rate_limit_exceeded_handler
-from slowapi.errors import RateLimitExceeded
-import sentry_sdk
-from sentry_sdk.integrations.fastapi import FastApiIntegration
 
 from app.core.config import settings
 from app.core.rate_limit import limiter
-from app.api import auth, users, admin, health, billing
-from app.core.database import init_db
+from app.api import auth, users, admin, health, metrics
+from app.api.deps import rate_limit_client, rate_limit_ip, rate_limit_user
+from app.core.metrics import PrometheusMiddleware
+from app.core.database import close_db, get_db, init_db
+from app.core.revocation import revocations, run_revocation_sync
+from app.core.stats import reconcile_stats_periodically
+from app.core.whitelist import run_whitelist_refresh, whitelist_index
+from app.services.auth_gateway import auth_gateway
+
+startup_timer.mark("imports")
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    init_db()
+    startup_timer.mark("server start")
+    
+    loop_monitor = None
+    if settings.LOOP_MONITOR_ENABLED:
+        from app.core.loop_monitor import LoopMonitor
+
+        loop_monitor = LoopMonitor(
+            settings.LOOP_MONITOR_INTERVAL_SECONDS, settings.LOOP_MONITOR_BLOCK_THRESHOLD_SECONDS
+        )
+        loop_monitor.start()
+    
+    # The admin bootstrap talks to Supabase; don't hold up readiness for it
+    bootstrap_task = asyncio.create_task(init_db())
+    
+    reconcile_task = None
+    if settings.STATS_RECONCILE_INTERVAL_SECONDS > 0:
+        reconcile_task = asyncio.create_task(
+            reconcile_stats_periodically(await get_db(), settings.STATS_RECONCILE_INTERVAL_SECONDS)
+        )
+    
+    # With memory:// no other worker publishes revocations, so there's nothing to sync
+    revocation_task = None
+    if revocations.shared:
+        revocation_task = asyncio.create_task(
+            run_revocation_sync(revocations, settings.REVOCATION_SYNC_INTERVAL_SECONDS)
+        )
+    
+    # Signups are checked against the database until the first load completes
+    whitelist_task = None
+    if settings.WHITELIST_MODE:
+        whitelist_task = asyncio.create_task(run_whitelist_refresh(
+            whitelist_index,
+            (await get_db()).whitelist,
+            settings.WHITELIST_REFRESH_INTERVAL_SECONDS,
+            settings.WHITELIST_FULL_RELOAD_SECONDS,
+        ))
+    
+    webhook_task = None
+    if settings.STRIPE_ENABLED:
+        from app.core.webhook_queue import run_webhook_worker, webhook_queue
+
+        webhook_task = asyncio.create_task(run_webhook_worker(webhook_queue, await get_db()))
+    
+    startup_timer.mark("lifespan")
+    print(startup_timer.report())
+    
     yield
+    
+    for task in (bootstrap_task, reconcile_task, revocation_task, whitelist_task, webhook_task):
+        if task:
+            task.cancel()
+    if loop_monitor:
+        loop_monitor.stop()
+    if settings.STRIPE_ENABLED:
+        from app.services.stripe import stripe_client
+
+        webhook_queue.close()
+        await stripe_client.aclose()
+    await auth_gateway.aclose()
+    await limiter.store.close()
+    await revocations.close()
+    await close_db()
 
 
 def create_app() -> FastAPI:
+    # Optional integrations are imported only when enabled, so workers and
+    # tests that don't use them don't pay for loading them
     if settings.SENTRY_DSN:
+        import sentry_sdk
+        from sentry_sdk.integrations.fastapi import FastApiIntegration
+
         sentry_sdk.init(
             dsn=settings.SENTRY_DSN,
             integrations=[FastApiIntegration()],
@@ -30,15 +103,14 @@ def create_app() -> FastAPI:
     app = FastAPI(
         title=settings.APP_NAME,
         version="1.0.0",
-        docs_url="/api/docs",
-        redoc_url="/api/redoc",
-        openapi_url="/api/openapi.json",
+        # The schema is built once, on first request, and reused; production
+        # can switch the docs off entirely
+        docs_url="/api/docs" if settings.OPENAPI_ENABLED else None,
+        redoc_url="/api/redoc" if settings.OPENAPI_ENABLED else None,
+        openapi_url="/api/openapi.json" if settings.OPENAPI_ENABLED else None,
         lifespan=lifespan,
     )
 
-    app.state.limiter = limiter
-    app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
-
     app.add_middleware(
         CORSMiddleware,
         allow_origins=settings.cors_origins_list,
@@ -46,16 +118,25 @@ def create_app() -> FastAPI:
         allow_methods=["*"],
         allow_headers=["*"],
     )
+    
+    if settings.METRICS_ENABLED:
+        app.add_middleware(PrometheusMiddleware)
+        app.include_router(metrics.router, tags=["metrics"])
 
     app.include_router(health.router, prefix="/api", tags=["health"])
-    app.include_router(auth.router, prefix="/api/auth", tags=["auth"])
-    app.include_router(users.router, prefix="/api/users", tags=["users"])
-    app.include_router(admin.router, prefix="/api/admin", tags=["admin"])
+    app.include_router(auth.router, prefix="/api/auth", tags=["auth"], dependencies=[Depends(rate_limit_client)])
+    # Dependencies run in order: the IP quota applies before authentication
+    signed_in = [Depends(rate_limit_ip), Depends(rate_limit_user)]
+    app.include_router(users.router, prefix="/api/users", tags=["users"], dependencies=signed_in)
+    app.include_router(admin.router, prefix="/api/admin", tags=["admin"], dependencies=signed_in)
     
     if settings.STRIPE_ENABLED:
+        from app.api import billing
+
         app.include_router(billing.router, prefix="/api/billing", tags=["billing"])
 
     return app
 
 
-app = create_app()
\ No newline at end of file
+with startup_timer.phase("create_app"):
+    app = create_app()
@@ -0,0 +1,27 @@
+from typing import Tuple
+from supabase import AsyncClient
+from app.core.config import settings
+from app.repositories.base import CredentialRepository, ProfileRepository, WhitelistRepository
+
+
+def create_repositories(client: AsyncClient) -> Tuple[ProfileRepository, WhitelistRepository, CredentialRepository]:
+    """Build the profile, whitelist and credential repositories for the configured DATA_BACKEND"""
+    if settings.DATA_BACKEND == "postgres":
+        from app.repositories.postgres import (
+            PostgresCredentialRepository,
+            PostgresProfileRepository,
+            PostgresWhitelistRepository,
+        )
+
+        return PostgresProfileRepository(), PostgresWhitelistRepository(), PostgresCredentialRepository()
+
+    from app.repositories.postgrest import (
+        PostgrestCredentialRepository,
+        PostgrestProfileRepository,
+        PostgrestWhitelistRepository,
+    )
+
+    return PostgrestProfileRepository(client), PostgrestWhitelistRepository(client), PostgrestCredentialRepository(client)
+
+
+__all__ = ["CredentialRepository", "ProfileRepository", "WhitelistRepository", "create_repositories"]
@@ -0,0 +1,137 @@
+from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, List, Literal, Optional, Tuple
+
+# How list queries report the total: exact, a planner estimate, or not at all
+CountMode = Literal["exact", "estimated", "none"]
+
+# Position in a (created_at, id) ordered listing
+Keyset = Tuple[str, str]
+
+# Profile columns the API is allowed to write
+PROFILE_WRITABLE_COLUMNS = frozenset({
+    "name",
+    "language",
+    "is_admin",
+    "email",
+    "stripe_customer_id",
+    "subscription_status",
+    "subscription_current_period_end",
+    "subscription_cancel_at_period_end",
+    "subscription_price_id",
+    "subscription_synced_at",
+})
+
+
+def check_columns(values: Dict[str, Any]) -> None:
+    unknown = set(values) - PROFILE_WRITABLE_COLUMNS
+    if unknown:
+        raise ValueError(f"Unknown profile columns: {sorted(unknown)}")
+
+
+class ProfileRepository(ABC):
+    """Reads and writes for the profiles table (and the admin_users view over it)"""
+
+    @abstractmethod
+    async def get(self, user_id: str) -> Optional[Dict[str, Any]]:
+        """Return the profile row, or None if there isn't one"""
+
+    @abstractmethod
+    async def get_by_email(self, email: str) -> Optional[Dict[str, Any]]:
+        """Return the profile with this email, or None"""
+
+    @abstractmethod
+    async def create(self, user_id: str, values: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Insert a profile and return the stored row"""
+
+    @abstractmethod
+    async def update(self, user_id: str, values: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Update a profile and return the stored row, or None if it doesn't exist"""
+
+    @abstractmethod
+    async def update_by_stripe_customer(self, customer_id: str, values: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Update the profile linked to a Stripe customer and return it"""
+
+    @abstractmethod
+    async def delete(self, user_id: str) -> None:
+        """Delete a profile; with Supabase Auth, deleting the auth user cascades to it"""
+
+    @abstractmethod
+    async def list_admin_users(
+        self,
+        limit: int,
+        offset: int = 0,
+        after: Optional[Keyset] = None,
+        search: Optional[str] = None,
+        is_admin: Optional[bool] = None,
+        count: CountMode = "exact",
+    ) -> Tuple[List[Dict[str, Any]], Optional[int]]:
+        """Return one page of users with emails, newest first, and the total matching.
+
+        ``after`` continues from the (created_at, id) of the previous page's last row
+        instead of skipping ``offset`` rows. The total counts rows matching the filters
+        from ``after`` onward, and is None when ``count`` is "none". list_users only
+        counts on the first page, where that is every matching row, and carries that
+        total in its cursor for later pages.
+        """
+
+    @abstractmethod
+    def iter_admin_users(self, page_size: int) -> AsyncIterator[List[Dict[str, Any]]]:
+        """Yield every user with email in (created_at, id) order, one page at a time"""
+
+    @abstractmethod
+    async def search(self, term: str, limit: int) -> List[Dict[str, Any]]:
+        """Users matching the term by substring or similarity, best ``score`` first"""
+
+    @abstractmethod
+    async def suggest(self, prefix: str, limit: int) -> List[Dict[str, Any]]:
+        """id, email and name of users whose email or name starts with the prefix"""
+
+    @abstractmethod
+    async def dashboard_stats(self) -> Dict[str, int]:
+        """Dashboard counters from the rollup maintained by triggers (migrations/004)"""
+
+    @abstractmethod
+    async def reconcile_stats(self) -> None:
+        """Recompute the rollup's recent counters from profiles"""
+
+
+class WhitelistRepository(ABC):
+    """The signup whitelist table (migrations/008); emails are lowercase"""
+
+    @abstractmethod
+    async def contains(self, email: str) -> bool:
+        """Whether the email is invited"""
+
+    @abstractmethod
+    def iter_changes(self, since: Optional[datetime], page_size: int) -> AsyncIterator[List[Dict[str, Any]]]:
+        """Yield {email, updated_at, removed_at} rows changed at or after ``since``
+        (every row when None) in (updated_at, email) order, one page at a time"""
+
+    @abstractmethod
+    async def add(self, emails: List[str]) -> None:
+        """Invite the emails, restoring any that were removed"""
+
+    @abstractmethod
+    async def remove(self, emails: List[str]) -> None:
+        """Mark the emails removed"""
+
+
+class CredentialRepository(ABC):
+    """Password hashes for AUTH_BACKEND=local (migrations/007)"""
+
+    @abstractmethod
+    async def get_by_email(self, email: str) -> Optional[Dict[str, Any]]:
+        """Return {user_id, email, password_hash, created_at}, or None"""
+
+    @abstractmethod
+    async def create(self, user_id: str, email: str, password_hash: str) -> Optional[Dict[str, Any]]:
+        """Insert credentials and return the row, or None if the email is taken"""
+
+    @abstractmethod
+    async def update_hash(self, user_id: str, password_hash: str) -> None:
+        """Replace a user's password hash"""
+
+    @abstractmethod
+    async def delete(self, user_id: str) -> None:
+        """Delete a user's credentials"""
@@ -0,0 +1,293 @@
+import asyncio
+import json
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+from uuid import UUID
+import asyncpg
+from app.core.config import settings
+from app.repositories.base import CountMode, CredentialRepository, Keyset, ProfileRepository, WhitelistRepository, check_columns
+
+# Emails are synced onto profiles (migrations/003), so no auth.users join
+ADMIN_USER_SELECT = """
+    SELECT p.id, p.email, p.name, p.is_admin, p.language, p.created_at
+    FROM public.profiles p
+"""
+
+_pool: Optional[asyncpg.Pool] = None
+_pool_lock = asyncio.Lock()
+
+
+async def get_pool() -> asyncpg.Pool:
+    """Connection pool for DATABASE_URL, created on first use.
+
+    asyncpg prepares each statement once per connection and reuses it from the
+    statement cache; set DATABASE_STATEMENT_CACHE_SIZE=0 behind a transaction-mode
+    pooler (pgbouncer/Supavisor on port 6543), which can't keep prepared statements.
+    """
+    global _pool
+    if _pool is None:
+        async with _pool_lock:
+            if _pool is None:
+                _pool = await asyncpg.create_pool(
+                    settings.DATABASE_URL,
+                    min_size=settings.DATABASE_POOL_MIN_SIZE,
+                    max_size=settings.DATABASE_POOL_MAX_SIZE,
+                    statement_cache_size=settings.DATABASE_STATEMENT_CACHE_SIZE,
+                )
+    return _pool
+
+
+async def close_pool() -> None:
+    global _pool
+    if _pool is not None:
+        await _pool.close()
+        _pool = None
+
+
+def _row(record: Optional[asyncpg.Record]) -> Optional[Dict[str, Any]]:
+    """Record as a dict shaped like PostgREST's JSON (UUIDs as strings)"""
+    if record is None:
+        return None
+    return {key: str(value) if isinstance(value, UUID) else value for key, value in record.items()}
+
+
+async def _estimate_rows(conn: asyncpg.Connection, sql: str, *args: Any) -> int:
+    """Planner's row estimate for a query, without executing it"""
+    plan = await conn.fetchval(f"EXPLAIN (FORMAT JSON) {sql}", *args)
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+def _escape_like(term: str) -> str:
+    return term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+class _Query:
+    """Conditions and their arguments, numbered as they're added.
+
+    Queries are built per shape (cursor or not, search or not...) rather than
+    with catch-all ``$1 IS NULL OR ...`` predicates. asyncpg keeps prepared
+    statements, and after five runs Postgres may switch one to a generic plan,
+    where such a predicate can't become an index condition.
+    """
+
+    def __init__(self) -> None:
+        self.args: List[Any] = []
+        self.conditions: List[str] = []
+
+    def param(self, value: Any) -> str:
+        self.args.append(value)
+        return f"${len(self.args)}"
+
+    def where(self, condition: str) -> None:
+        self.conditions.append(condition)
+
+    @property
+    def clause(self) -> str:
+        return f"WHERE {' AND '.join(self.conditions)}" if self.conditions else ""
+
+
+class PostgresProfileRepository(ProfileRepository):
+    """Profiles over a direct asyncpg connection, skipping the REST layer"""
+
+    async def get(self, user_id: str) -> Optional[Dict[str, Any]]:
+        pool = await get_pool()
+        return _row(await pool.fetchrow("SELECT * FROM public.profiles WHERE id = $1", UUID(user_id)))
+
+    async def get_by_email(self, email: str) -> Optional[Dict[str, Any]]:
+        pool = await get_pool()
+        return _row(await pool.fetchrow("SELECT * FROM public.profiles WHERE email = $1 LIMIT 1", email))
+
+    async def create(self, user_id: str, values: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        check_columns(values)
+        columns = ["id", *values]
+        placeholders = ", ".join(f"${i}" for i in range(1, len(columns) + 1))
+        sql = f"INSERT INTO public.profiles ({', '.join(columns)}) VALUES ({placeholders}) RETURNING *"
+        pool = await get_pool()
+        return _row(await pool.fetchrow(sql, UUID(user_id), *values.values()))
+
+    async def _update_where(self, column: str, key: Any, values: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        check_columns(values)
+        if not values:
+            return None
+        assignments = ", ".join(f"{name} = ${i}" for i, name in enumerate(values, start=2))
+        sql = f"UPDATE public.profiles SET {assignments} WHERE {column} = $1 RETURNING *"
+        pool = await get_pool()
+        return _row(await pool.fetchrow(sql, key, *values.values()))
+
+    async def update(self, user_id: str, values: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        return await self._update_where("id", UUID(user_id), values)
+
+    async def update_by_stripe_customer(self, customer_id: str, values: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        return await self._update_where("stripe_customer_id", customer_id, values)
+
+    async def delete(self, user_id: str) -> None:
+        pool = await get_pool()
+        await pool.execute("DELETE FROM public.profiles WHERE id = $1", UUID(user_id))
+
+    async def list_admin_users(
+        self,
+        limit: int,
+        offset: int = 0,
+        after: Optional[Keyset] = None,
+        search: Optional[str] = None,
+        is_admin: Optional[bool] = None,
+        count: CountMode = "exact",
+    ) -> Tuple[List[Dict[str, Any]], Optional[int]]:
+        query = _Query()
+        if search:
+            pattern = query.param(f"%{_escape_like(search)}%")
+            query.where(f"(p.email ILIKE {pattern} OR p.name ILIKE {pattern})")
+        if is_admin is not None:
+            query.where(f"p.is_admin = {query.param(is_admin)}")
+        matching = f"{ADMIN_USER_SELECT} {query.clause}"
+        filter_args = list(query.args)
+        if after:
+            created_at = query.param(datetime.fromisoformat(str(after[0])))
+            query.where(f"(p.created_at, p.id) < ({created_at}, {query.param(UUID(after[1]))}::uuid)")
+        page = f"{ADMIN_USER_SELECT} {query.clause}"
+        # count(*) OVER () returns the total with the page in one round trip
+        window = ", count(*) OVER () AS total" if count == "exact" else ""
+        sql = f"""
+            SELECT *{window} FROM ({page}) page
+            ORDER BY created_at DESC, id DESC
+            LIMIT {query.param(limit)} OFFSET {query.param(offset)}
+        """
+
+        pool = await get_pool()
+        async with pool.acquire() as conn:
+            records = await conn.fetch(sql, *query.args)
+
+            total = None
+            if count == "exact":
+                if records:
+                    total = records[0]["total"]
+                else:
+                    # Past the last page: no row to carry the window count
+                    total = await conn.fetchval(f"SELECT count(*) FROM ({page}) page", *query.args[:-2])
+            elif count == "estimated":
+                total = await _estimate_rows(conn, matching, *filter_args)
+
+        rows = []
+        for record in records:
+            row = _row(record)
+            row.pop("total", None)
+            rows.append(row)
+        return rows, total
+
+    async def iter_admin_users(self, page_size: int) -> AsyncIterator[List[Dict[str, Any]]]:
+        first = f"{ADMIN_USER_SELECT} ORDER BY p.created_at, p.id LIMIT $1"
+        following = f"""
+            {ADMIN_USER_SELECT}
+            WHERE (p.created_at, p.id) > ($2, $3::uuid)
+            ORDER BY p.created_at, p.id
+            LIMIT $1
+        """
+        pool = await get_pool()
+        records = await pool.fetch(first, page_size)
+        while True:
+            if records:
+                yield [_row(record) for record in records]
+            if len(records) < page_size:
+                return
+            records = await pool.fetch(following, page_size, records[-1]["created_at"], records[-1]["id"])
+
+    async def search(self, term: str, limit: int) -> List[Dict[str, Any]]:
+        pool = await get_pool()
+        records = await pool.fetch("SELECT * FROM public.search_profiles($1, $2)", term, limit)
+        return [_row(record) for record in records]
+
+    async def suggest(self, prefix: str, limit: int) -> List[Dict[str, Any]]:
+        pool = await get_pool()
+        records = await pool.fetch("SELECT * FROM public.suggest_profiles($1, $2)", prefix, limit)
+        return [_row(record) for record in records]
+
+    async def dashboard_stats(self) -> Dict[str, int]:
+        pool = await get_pool()
+        return json.loads(await pool.fetchval("SELECT public.dashboard_stats()"))
+
+    async def reconcile_stats(self) -> None:
+        pool = await get_pool()
+        await pool.execute("SELECT public.reconcile_profile_stats()")
+
+
+class PostgresWhitelistRepository(WhitelistRepository):
+    async def contains(self, email: str) -> bool:
+        pool = await get_pool()
+        return await pool.fetchval(
+            "SELECT EXISTS (SELECT 1 FROM public.whitelist WHERE email = $1 AND removed_at IS NULL)", email
+        )
+
+    async def iter_changes(self, since: Optional[datetime], page_size: int) -> AsyncIterator[List[Dict[str, Any]]]:
+        pool = await get_pool()
+        last: Optional[asyncpg.Record] = None
+        while True:
+            # One statement per shape (see _Query)
+            query = _Query()
+            if since is not None:
+                query.where(f"updated_at >= {query.param(since)}")
+            if last is not None:
+                query.where(f"(updated_at, email) > ({query.param(last['updated_at'])}, {query.param(last['email'])})")
+            records = await pool.fetch(
+                f"""
+                SELECT email, updated_at, removed_at FROM public.whitelist
+                {query.clause}
+                ORDER BY updated_at, email
+                LIMIT {query.param(page_size)}
+                """,
+                *query.args,
+            )
+            if records:
+                yield [_row(record) for record in records]
+            if len(records) < page_size:
+                return
+            last = records[-1]
+
+    async def add(self, emails: List[str]) -> None:
+        pool = await get_pool()
+        await pool.execute(
+            """
+            INSERT INTO public.whitelist (email) SELECT unnest($1::text[])
+            ON CONFLICT (email) DO UPDATE SET updated_at = now(), removed_at = NULL
+            """,
+            emails,
+        )
+
+    async def remove(self, emails: List[str]) -> None:
+        pool = await get_pool()
+        await pool.execute(
+            """
+            UPDATE public.whitelist SET updated_at = now(), removed_at = now()
+            WHERE email = ANY($1::text[]) AND removed_at IS NULL
+            """,
+            emails,
+        )
+
+
+class PostgresCredentialRepository(CredentialRepository):
+    async def get_by_email(self, email: str) -> Optional[Dict[str, Any]]:
+        pool = await get_pool()
+        return _row(await pool.fetchrow("SELECT * FROM public.credentials WHERE email = $1", email))
+
+    async def create(self, user_id: str, email: str, password_hash: str) -> Optional[Dict[str, Any]]:
+        pool = await get_pool()
+        return _row(await pool.fetchrow(
+            """
+            INSERT INTO public.credentials (user_id, email, password_hash) VALUES ($1, $2, $3)
+            ON CONFLICT (email) DO NOTHING
+            RETURNING *
+            """,
+            UUID(user_id), email, password_hash,
+        ))
+
+    async def update_hash(self, user_id: str, password_hash: str) -> None:
+        pool = await get_pool()
+        await pool.execute(
+            "UPDATE public.credentials SET password_hash = $2, updated_at = now() WHERE user_id = $1",
+            UUID(user_id), password_hash,
+        )
+
+    async def delete(self, user_id: str) -> None:
+        pool = await get_pool()
+        await pool.execute("DELETE FROM public.credentials WHERE user_id = $1", UUID(user_id))
@@ -0,0 +1,194 @@
+from datetime import datetime, timezone
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+from supabase import AsyncClient
+from postgrest.exceptions import APIError
+from app.repositories.base import CountMode, CredentialRepository, Keyset, ProfileRepository, WhitelistRepository, check_columns
+
+ADMIN_USER_COLUMNS = "id,email,name,is_admin,language,created_at"
+
+
+def _ilike_pattern(term: str) -> str:
+    """%term% as a quoted PostgREST value, with LIKE wildcards in the term escaped"""
+    like = term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    quoted = like.replace("\\", "\\\\").replace('"', '\\"')
+    return f'"%{quoted}%"'
+
+
+def _json_values(values: Dict[str, Any]) -> Dict[str, Any]:
+    """Column values as JSON for PostgREST (timestamps as ISO 8601)"""
+    return {key: value.isoformat() if isinstance(value, datetime) else value for key, value in values.items()}
+
+
+def _first(result) -> Optional[Dict[str, Any]]:
+    return result.data[0] if result.data else None
+
+
+def _after_keyset(created_at: str, user_id: str) -> str:
+    """PostgREST filter for rows strictly after (created_at, id) in ascending order"""
+    return f'created_at.gt."{created_at}",and(created_at.eq."{created_at}",id.gt.{user_id})'
+
+
+def _before_keyset(created_at: str, user_id: str) -> str:
+    """PostgREST filter for rows strictly after (created_at, id) in descending order"""
+    return f'created_at.lt."{created_at}",and(created_at.eq."{created_at}",id.lt.{user_id})'
+
+
+class PostgrestProfileRepository(ProfileRepository):
+    """Profiles over Supabase's REST API"""
+
+    def __init__(self, client: AsyncClient):
+        self.client = client
+
+    async def get(self, user_id: str) -> Optional[Dict[str, Any]]:
+        result = await self.client.table("profiles").select("*").eq("id", user_id).limit(1).execute()
+        return _first(result)
+
+    async def get_by_email(self, email: str) -> Optional[Dict[str, Any]]:
+        result = await self.client.table("profiles").select("*").eq("email", email).limit(1).execute()
+        return _first(result)
+
+    async def create(self, user_id: str, values: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        check_columns(values)
+        result = await self.client.table("profiles").insert({"id": user_id, **_json_values(values)}).execute()
+        return _first(result)
+
+    async def update(self, user_id: str, values: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        check_columns(values)
+        result = await self.client.table("profiles").update(_json_values(values)).eq("id", user_id).execute()
+        return _first(result)
+
+    async def delete(self, user_id: str) -> None:
+        await self.client.table("profiles").delete().eq("id", user_id).execute()
+
+    async def update_by_stripe_customer(self, customer_id: str, values: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        check_columns(values)
+        result = await self.client.table("profiles").update(_json_values(values)).eq("stripe_customer_id", customer_id).execute()
+        return _first(result)
+
+    async def list_admin_users(
+        self,
+        limit: int,
+        offset: int = 0,
+        after: Optional[Keyset] = None,
+        search: Optional[str] = None,
+        is_admin: Optional[bool] = None,
+        count: CountMode = "exact",
+    ) -> Tuple[List[Dict[str, Any]], Optional[int]]:
+        # admin_users carries the email synced onto profiles, so one request
+        # returns the page with emails and the total count (see migrations/003); PostgREST
+        # reports the count in the same response's Content-Range header
+        query = self.client.table("admin_users").select(
+            ADMIN_USER_COLUMNS, count=None if count == "none" else count
+        )
+        if search:
+            # Served by the trigram indexes from migrations/003
+            pattern = _ilike_pattern(search)
+            query = query.or_(f"email.ilike.{pattern},name.ilike.{pattern}")
+        if is_admin is not None:
+            query = query.eq("is_admin", is_admin)
+        if after:
+            query = query.or_(_before_keyset(*after))
+
+        query = query.order("created_at", desc=True).order("id", desc=True)
+        result = await query.range(offset, offset + limit - 1).execute()
+        return result.data, None if count == "none" else result.count or 0
+
+    async def iter_admin_users(self, page_size: int) -> AsyncIterator[List[Dict[str, Any]]]:
+        # Keyset pagination keeps each page an index range scan no matter how deep
+        last = None
+        while True:
+            query = self.client.table("admin_users").select(ADMIN_USER_COLUMNS)
+            if last:
+                query = query.or_(_after_keyset(last["created_at"], last["id"]))
+            result = await query.order("created_at").order("id").limit(page_size).execute()
+
+            if result.data:
+                yield result.data
+            if len(result.data) < page_size:
+                return
+            last = result.data[-1]
+
+    async def search(self, term: str, limit: int) -> List[Dict[str, Any]]:
+        result = await self.client.rpc("search_profiles", {"term": term, "max_results": limit}).execute()
+        return result.data
+
+    async def suggest(self, prefix: str, limit: int) -> List[Dict[str, Any]]:
+        result = await self.client.rpc("suggest_profiles", {"prefix": prefix, "max_results": limit}).execute()
+        return result.data
+
+    async def dashboard_stats(self) -> Dict[str, int]:
+        result = await self.client.rpc("dashboard_stats").execute()
+        return result.data
+
+    async def reconcile_stats(self) -> None:
+        await self.client.rpc("reconcile_profile_stats").execute()
+
+
+class PostgrestWhitelistRepository(WhitelistRepository):
+    def __init__(self, client: AsyncClient):
+        self.client = client
+
+    async def contains(self, email: str) -> bool:
+        result = await (
+            self.client.table("whitelist").select("email").eq("email", email).is_("removed_at", "null").limit(1).execute()
+        )
+        return bool(result.data)
+
+    async def iter_changes(self, since: Optional[datetime], page_size: int) -> AsyncIterator[List[Dict[str, Any]]]:
+        last = None
+        while True:
+            query = self.client.table("whitelist").select("email,updated_at,removed_at")
+            if last:
+                query = query.or_(
+                    f'updated_at.gt."{last["updated_at"]}",and(updated_at.eq."{last["updated_at"]}",email.gt."{last["email"]}")'
+                )
+            elif since:
+                query = query.gte("updated_at", since.isoformat())
+            result = await query.order("updated_at").order("email").limit(page_size).execute()
+
+            if result.data:
+                yield result.data
+            if len(result.data) < page_size:
+                return
+            last = result.data[-1]
+
+    async def add(self, emails: List[str]) -> None:
+        now = datetime.now(timezone.utc).isoformat()
+        rows = [{"email": email, "updated_at": now, "removed_at": None} for email in emails]
+        await self.client.table("whitelist").upsert(rows, on_conflict="email").execute()
+
+    async def remove(self, emails: List[str]) -> None:
+        now = datetime.now(timezone.utc).isoformat()
+        await (
+            self.client.table("whitelist").update({"updated_at": now, "removed_at": now})
+            .in_("email", emails).is_("removed_at", "null").execute()
+        )
+
+
+class PostgrestCredentialRepository(CredentialRepository):
+    def __init__(self, client: AsyncClient):
+        self.client = client
+
+    async def get_by_email(self, email: str) -> Optional[Dict[str, Any]]:
+        result = await self.client.table("credentials").select("*").eq("email", email).limit(1).execute()
+        return _first(result)
+
+    async def create(self, user_id: str, email: str, password_hash: str) -> Optional[Dict[str, Any]]:
+        try:
+            result = await self.client.table("credentials").insert(
+                {"user_id": user_id, "email": email, "password_hash": password_hash}
+            ).execute()
+        except APIError as e:
+            # unique_violation on email
+            if e.code == "23505":
+                return None
+            raise
+        return _first(result)
+
+    async def update_hash(self, user_id: str, password_hash: str) -> None:
+        await self.client.table("credentials").update(
+            {"password_hash": password_hash, "updated_at": datetime.now(timezone.utc).isoformat()}
+        ).eq("user_id", user_id).execute()
+
+    async def delete(self, user_id: str) -> None:
+        await self.client.table("credentials").delete().eq("user_id", user_id).execute()
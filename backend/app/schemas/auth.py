@@ -5,9 +5,18 @@ from typing import Optional
 class Token(BaseModel):
     access_token: Optional[str] = None
     token_type: str = "bearer"
+    # Exchange at /api/auth/refresh for a new pair before expires_at (epoch
+    # seconds, when access_token stops working); each refresh token works once
+    refresh_token: Optional[str] = None
+    expires_in: Optional[int] = None
+    expires_at: Optional[int] = None
     user: dict
 
 
+class RefreshRequest(BaseModel):
+    refresh_token: str
+
+
 class TokenData(BaseModel):
     user_id: str
 
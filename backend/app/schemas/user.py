@@ -1,6 +1,6 @@
 from datetime import datetime
 from typing import Optional
-from pydantic import BaseModel, EmailStr
+from pydantic import BaseModel, EmailStr, Field
 
 
 class UserBase(BaseModel):
@@ -22,17 +22,31 @@ class User(UserBase):
     is_admin: bool = False
     created_at: datetime
     language: Optional[str] = "en"
+    # Used for rate limit tiers; not part of API responses
+    subscription_status: Optional[str] = Field(default=None, exclude=True)
 
     class Config:
         from_attributes = True
 
 
+class UserSearchResult(User):
+    score: float
+
+
+class UserSuggestion(BaseModel):
+    id: str
+    email: EmailStr
+    name: Optional[str] = None
+
+
 class UserInDB(User):
     hashed_password: str
 
 
 class UserList(BaseModel):
     users: list[User]
-    total: int
-    page: int
-    per_page: int
\ No newline at end of file
+    total: Optional[int] = None
+    # None on cursor pages, which have no page number
+    page: Optional[int] = None
+    per_page: int
+    next_cursor: Optional[str] = None
\ No newline at end of file
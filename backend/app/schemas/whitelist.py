@@ -0,0 +1,9 @@
+from typing import List
+from pydantic import BaseModel, EmailStr, Field
+
+# Emails per bulk add or remove request
+WHITELIST_BULK_MAX = 1000
+
+
+class WhitelistEmails(BaseModel):
+    emails: List[EmailStr] = Field(..., min_length=1, max_length=WHITELIST_BULK_MAX)
@@ -0,0 +1,126 @@
+from typing import Any, Dict, Optional
+import httpx
+from app.core.config import settings
+from app.core.database import get_http_client
+
+
+class AuthGatewayError(Exception):
+    """Supabase Auth rejected a request (or couldn't be reached)"""
+
+    def __init__(self, message: str, status_code: Optional[int] = None, code: Optional[str] = None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.code = code
+
+
+class AuthGateway:
+    """Password sign-in, sign-up and sign-out against Supabase Auth (GoTrue).
+
+    The Supabase client keeps the signed-in session on itself, so sharing one
+    between concurrent requests mixes users up. Each call here is a single
+    stateless HTTP request on the worker's shared connection pool, and whatever
+    session comes back goes to the caller, not to shared state.
+    """
+
+    def __init__(self, url: str, api_key: str, service_key: Optional[str] = None):
+        self.base_url = f"{url.rstrip('/')}/auth/v1"
+        self.api_key = api_key
+        # Only the admin calls (create_user, delete_user) need the service role
+        self.service_key = service_key
+
+    async def _request(
+        self,
+        method: str,
+        path: str,
+        *,
+        json: Optional[Dict[str, Any]] = None,
+        params: Optional[Dict[str, str]] = None,
+        access_token: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        headers = {"apikey": self.api_key, "Authorization": f"Bearer {access_token or self.api_key}"}
+        try:
+            response = await get_http_client().request(
+                method, f"{self.base_url}{path}", json=json, params=params, headers=headers
+            )
+        except httpx.HTTPError as e:
+            raise AuthGatewayError(f"Supabase Auth unreachable: {e}") from e
+        try:
+            body = response.json() if response.content else {}
+        except ValueError:
+            # An HTML or plain-text error page from a proxy in front of GoTrue
+            body = None
+        if not isinstance(body, dict):
+            status_code = response.status_code if response.status_code >= 400 else 502
+            raise AuthGatewayError(f"Unexpected response from Supabase Auth: {response.reason_phrase}", status_code)
+        if response.status_code >= 400:
+            message = body.get("msg") or body.get("message") or body.get("error_description") or body.get("error")
+            code = body.get("error_code") or body.get("error")
+            raise AuthGatewayError(message or response.reason_phrase, response.status_code, code)
+        return body
+
+    async def sign_in_with_password(self, email: str, password: str) -> Dict[str, Any]:
+        """Session for the user: access_token, refresh_token, expires_in, expires_at and user"""
+        return await self._request(
+            "POST", "/token", params={"grant_type": "password"}, json={"email": email, "password": password}
+        )
+
+    async def sign_up(self, email: str, password: str) -> Dict[str, Any]:
+        """The new user and, unless email confirmation is required, their session.
+
+        Returns {"user": ..., "session": ... or None} whichever shape Supabase answered with.
+        """
+        body = await self._request("POST", "/signup", json={"email": email, "password": password})
+        if "access_token" in body:
+            return {"user": body.get("user"), "session": body}
+        return {"user": body if body.get("id") else None, "session": None}
+
+    async def refresh_session(self, refresh_token: str) -> Dict[str, Any]:
+        """A new session for a refresh token; Supabase rotates it, so the old one stops working"""
+        return await self._request(
+            "POST", "/token", params={"grant_type": "refresh_token"}, json={"refresh_token": refresh_token}
+        )
+
+    async def sign_out(self, access_token: str) -> None:
+        """Revoke the refresh tokens of the session ``access_token`` belongs to"""
+        await self._request("POST", "/logout", access_token=access_token)
+
+    async def reset_password_for_email(self, email: str, redirect_to: Optional[str] = None) -> None:
+        await self._request(
+            "POST", "/recover", json={"email": email}, params={"redirect_to": redirect_to} if redirect_to else None
+        )
+
+    def _admin_token(self) -> str:
+        if not self.service_key:
+            raise AuthGatewayError("Supabase Auth admin calls need SUPABASE_SERVICE_KEY", 500)
+        return self.service_key
+
+    async def create_user(self, email: str, password: str, user_metadata: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Create a confirmed user without signing them in, and return it"""
+        return await self._request(
+            "POST",
+            "/admin/users",
+            json={"email": email, "password": password, "email_confirm": True, "user_metadata": user_metadata or {}},
+            access_token=self._admin_token(),
+        )
+
+    async def delete_user(self, user_id: str) -> None:
+        """Delete the user from Supabase Auth"""
+        await self._request("DELETE", f"/admin/users/{user_id}", access_token=self._admin_token())
+
+    async def aclose(self) -> None:
+        # Calls go over the shared pool, which close_db shuts down
+        pass
+
+
+def create_auth_gateway():
+    if settings.AUTH_BACKEND == "local":
+        from app.services.credentials import LocalAuthGateway, PasswordHasher
+
+        hasher = PasswordHasher(
+            settings.PASSWORD_HASH_ROUNDS, settings.PASSWORD_HASH_WORKERS, settings.PASSWORD_HASH_MAX_PENDING
+        )
+        return LocalAuthGateway(hasher, settings.SUPABASE_JWT_SECRET, settings.LOCAL_AUTH_TOKEN_TTL_SECONDS)
+    return AuthGateway(settings.SUPABASE_URL, settings.SUPABASE_ANON_KEY, settings.SUPABASE_SERVICE_KEY)
+
+
+auth_gateway = create_auth_gateway()
@@ -0,0 +1,156 @@
+import asyncio
+import multiprocessing
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Dict, Optional, Tuple
+from jose import jwt
+from app.core import passwords
+from app.core.config import settings
+from app.core.database import get_db
+from app.core.security import decode_token
+from app.services.auth_gateway import AuthGatewayError
+
+
+class PasswordHasher:
+    """bcrypt in a pool of worker processes.
+
+    A bcrypt check at cost 12 is a few hundred milliseconds of CPU. In a
+    process it never blocks the event loop or holds this worker's GIL.
+    ``workers`` bounds the CPU spent on it. ``max_pending`` bounds how many
+    calls can queue, so a login flood waits on a semaphore instead of piling
+    up work in the pool.
+    """
+
+    def __init__(self, rounds: int, workers: int, max_pending: int):
+        self.rounds = rounds
+        self.workers = workers
+        self._slots = asyncio.Semaphore(max_pending)
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # spawn, not fork: the parent has an event loop, threads and open sockets
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers, mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._executor
+
+    async def _run(self, fn: Callable, *args: Any) -> Any:
+        async with self._slots:
+            return await asyncio.get_running_loop().run_in_executor(self._get_executor(), fn, *args)
+
+    async def hash(self, password: str) -> str:
+        return await self._run(passwords.get_password_hash, password, self.rounds)
+
+    async def verify(self, password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+        """Whether the password matches, and a new hash if ``rounds`` changed since it was stored"""
+        return await self._run(passwords.verify_and_update, password, hashed_password, self.rounds)
+
+    def close(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+class LocalAuthGateway:
+    """AuthGateway for AUTH_BACKEND=local: users and password hashes in our own database.
+
+    Issues HS256 access tokens signed with SUPABASE_JWT_SECRET, which
+    get_current_user verifies like Supabase's. No refresh tokens or emails:
+    clients sign in again when the access token expires.
+    """
+
+    def __init__(self, hasher: PasswordHasher, secret: Optional[str], token_ttl: int):
+        if not secret:
+            raise ValueError("AUTH_BACKEND=local needs SUPABASE_JWT_SECRET to sign access tokens")
+        self.hasher = hasher
+        self.secret = secret
+        self.token_ttl = token_ttl
+        self._dummy_hash: Optional[str] = None
+
+    def _session(self, user_id: str, email: str, created_at: Any) -> Dict[str, Any]:
+        now = int(time.time())
+        claims = {
+            "sub": user_id,
+            "email": email,
+            "aud": settings.SUPABASE_JWT_AUDIENCE,
+            "iss": settings.supabase_jwt_issuer,
+            "role": "authenticated",
+            "session_id": str(uuid.uuid4()),
+            "iat": now,
+            "exp": now + self.token_ttl,
+        }
+        return {
+            "access_token": jwt.encode(claims, self.secret, algorithm="HS256"),
+            "token_type": "bearer",
+            "expires_in": self.token_ttl,
+            "expires_at": now + self.token_ttl,
+            "refresh_token": None,
+            "user": {"id": user_id, "email": email, "created_at": created_at},
+        }
+
+    async def sign_in_with_password(self, email: str, password: str) -> Dict[str, Any]:
+        db = await get_db()
+        row = await db.credentials.get_by_email(email.lower())
+        if row is None:
+            # Do the same bcrypt work as for a real account so timing doesn't reveal which emails exist
+            if self._dummy_hash is None:
+                self._dummy_hash = await self.hasher.hash(uuid.uuid4().hex)
+            await self.hasher.verify(password, self._dummy_hash)
+            raise AuthGatewayError("Invalid login credentials", 400, "invalid_credentials")
+
+        valid, new_hash = await self.hasher.verify(password, row["password_hash"])
+        if not valid:
+            raise AuthGatewayError("Invalid login credentials", 400, "invalid_credentials")
+        if new_hash:
+            try:
+                await db.credentials.update_hash(row["user_id"], new_hash)
+            except Exception as e:
+                print(f"Password rehash failed for user {row['user_id']}: {e}")
+        return self._session(row["user_id"], row["email"], row["created_at"])
+
+    async def _create_credentials(self, email: str, password: str) -> Dict[str, Any]:
+        db = await get_db()
+        password_hash = await self.hasher.hash(password)
+        row = await db.credentials.create(str(uuid.uuid4()), email.lower(), password_hash)
+        if row is None:
+            raise AuthGatewayError("User already registered", 422, "user_already_exists")
+        return row
+
+    async def sign_up(self, email: str, password: str) -> Dict[str, Any]:
+        row = await self._create_credentials(email, password)
+        session = self._session(row["user_id"], row["email"], row["created_at"])
+        return {"user": session["user"], "session": session}
+
+    async def create_user(self, email: str, password: str, user_metadata: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Create a user without signing them in; there's no metadata to keep"""
+        row = await self._create_credentials(email, password)
+        return {"id": row["user_id"], "email": row["email"], "created_at": row["created_at"]}
+
+    async def delete_user(self, user_id: str) -> None:
+        """Delete the user's credentials and profile; nothing cascades from another table"""
+        db = await get_db()
+        await db.credentials.delete(user_id)
+        await db.profiles.delete(user_id)
+
+    async def refresh_session(self, refresh_token: str) -> Dict[str, Any]:
+        raise AuthGatewayError("The local auth backend doesn't issue refresh tokens", 400, "refresh_token_not_found")
+
+    async def sign_out(self, access_token: str) -> None:
+        """Check the token is one of ours; the logout endpoint then revokes its session"""
+        claims = decode_token(
+            access_token,
+            key=self.secret,
+            algorithms=["HS256"],
+            audience=settings.SUPABASE_JWT_AUDIENCE,
+            issuer=settings.supabase_jwt_issuer,
+        )
+        if not claims:
+            raise AuthGatewayError("Invalid token", 401, "bad_jwt")
+
+    async def reset_password_for_email(self, email: str, redirect_to: Optional[str] = None) -> None:
+        raise AuthGatewayError("The local auth backend doesn't send password reset emails", 501)
+
+    async def aclose(self) -> None:
+        self.hasher.close()
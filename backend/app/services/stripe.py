@@ -0,0 +1,142 @@
+import asyncio
+import re
+from typing import Any, Dict, Iterator, Optional, Tuple
+import httpx
+from app.core.config import settings
+from app.core.metrics import InstrumentedTransport
+
+# Object ids in paths (cus_..., sub_...) collapse to one metrics series
+_OBJECT_ID = re.compile(r"/[a-z]+_[A-Za-z0-9]+")
+
+
+class StripeAPIError(Exception):
+    """Stripe rejected a request (or couldn't be reached)"""
+
+    def __init__(self, message: str, status_code: Optional[int] = None, code: Optional[str] = None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.code = code
+
+
+def stripe_operation(request: httpx.Request) -> str:
+    return f"{request.method} {_OBJECT_ID.sub('/:id', request.url.path)}"
+
+
+def _form_items(params: Dict[str, Any], prefix: Optional[str] = None) -> Iterator[Tuple[str, str]]:
+    """Flatten params into Stripe's form encoding (metadata[user_id]=..., line_items[0][price]=...)"""
+    for name, value in params.items():
+        key = f"{prefix}[{name}]" if prefix else name
+        if value is None:
+            continue
+        if isinstance(value, dict):
+            yield from _form_items(value, key)
+        elif isinstance(value, (list, tuple)):
+            yield from _form_items({str(i): item for i, item in enumerate(value)}, key)
+        elif isinstance(value, bool):
+            yield key, "true" if value else "false"
+        else:
+            yield key, str(value)
+
+
+class StripeClient:
+    """Async client for the few Stripe endpoints billing uses.
+
+    Calls go over one keep-alive pool per worker, each with a timeout, and at
+    most ``max_concurrency`` are in flight at once so a Stripe slowdown can't
+    pile up unbounded requests. The SDK is still used for webhook signature
+    checks, which are local.
+    """
+
+    def __init__(
+        self,
+        api_key: Optional[str],
+        base_url: str = "https://api.stripe.com",
+        api_version: Optional[str] = None,
+        timeout: float = 10.0,
+        max_concurrency: int = 20,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ):
+        self.api_key = api_key
+        self.base_url = base_url
+        self.api_version = api_version
+        self.timeout = timeout
+        self.max_concurrency = max_concurrency
+        self._transport = transport
+        self._client: Optional[httpx.AsyncClient] = None
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+
+    def _get_client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            headers = {"Authorization": f"Bearer {self.api_key}"}
+            if self.api_version:
+                headers["Stripe-Version"] = self.api_version
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                headers=headers,
+                timeout=self.timeout,
+                transport=self._transport or InstrumentedTransport(
+                    "stripe",
+                    operation=stripe_operation,
+                    limits=httpx.Limits(
+                        max_connections=self.max_concurrency,
+                        max_keepalive_connections=self.max_concurrency,
+                    ),
+                ),
+            )
+        return self._client
+
+    async def request(
+        self,
+        method: str,
+        path: str,
+        params: Optional[Dict[str, Any]] = None,
+        timeout: Optional[float] = None,
+    ) -> Dict[str, Any]:
+        form = dict(_form_items(params or {}))
+        kwargs: Dict[str, Any] = {"params": form} if method == "GET" else {"data": form}
+        if timeout is not None:
+            kwargs["timeout"] = timeout
+
+        async with self._semaphore:
+            try:
+                response = await self._get_client().request(method, path, **kwargs)
+            except httpx.HTTPError as e:
+                raise StripeAPIError(f"Could not reach Stripe: {e}") from e
+
+        if response.status_code >= 400:
+            try:
+                error = response.json().get("error", {})
+            except ValueError:
+                error = {}
+            raise StripeAPIError(
+                error.get("message") or f"Stripe returned {response.status_code}",
+                status_code=response.status_code,
+                code=error.get("code"),
+            )
+        return response.json()
+
+    async def create_customer(self, email: str, metadata: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+        return await self.request("POST", "/v1/customers", {"email": email, "metadata": metadata})
+
+    async def create_checkout_session(self, **params: Any) -> Dict[str, Any]:
+        return await self.request("POST", "/v1/checkout/sessions", params)
+
+    async def create_portal_session(self, customer: str, return_url: str) -> Dict[str, Any]:
+        return await self.request("POST", "/v1/billing_portal/sessions", {"customer": customer, "return_url": return_url})
+
+    async def list_subscriptions(self, customer: str, status: str = "all", limit: int = 1) -> Dict[str, Any]:
+        return await self.request("GET", "/v1/subscriptions", {"customer": customer, "status": status, "limit": limit})
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+stripe_client = StripeClient(
+    api_key=settings.STRIPE_SECRET_KEY,
+    base_url=settings.STRIPE_API_BASE,
+    api_version=settings.STRIPE_API_VERSION,
+    timeout=settings.STRIPE_TIMEOUT,
+    max_concurrency=settings.STRIPE_MAX_CONCURRENCY,
+)
@@ -0,0 +1,315 @@
+"""Offline load test of the API against fake Supabase and Stripe upstreams.
+
+    cd backend
+    python -m benchmarks.load --users 1000 --requests 2000 --concurrency 50
+    python -m benchmarks.load --compare benchmarks/results/<commit>.json
+
+Starts benchmarks.upstreams and the app (uvicorn) as subprocesses wired to each
+other through the usual settings, seeds the fake with ``--users`` profiles, and
+drives concurrent load at each scenario in turn. Prints throughput and
+p50/p95/p99 latency per endpoint and writes them as JSON, tagged with the git
+commit, to benchmarks/results/ (or ``--output``).
+
+Latencies include the fakes' own time, which is small but not zero; compare
+runs made with the same parameters on the same machine.
+"""
+import argparse
+import asyncio
+import hashlib
+import hmac
+import json
+import math
+import os
+import platform
+import socket
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import httpx
+from jose import jwt
+from tests.fakes.supabase import DEFAULT_PASSWORD, seed_profiles
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+RESULTS_DIR = BACKEND_DIR / "benchmarks" / "results"
+
+JWT_SECRET = "bench-supabase-jwt-secret"
+WEBHOOK_SECRET = "whsec_bench"
+ADMIN_EMAIL = "admin@example.com"
+
+# (method, path, headers, body)
+RequestSpec = Tuple[str, str, Dict[str, str], Optional[bytes]]
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _git_commit() -> Tuple[Optional[str], bool]:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, capture_output=True, text=True, check=True).stdout.strip()
+        dirty = bool(subprocess.run(["git", "status", "--porcelain", "--", "."], cwd=BACKEND_DIR, capture_output=True, text=True).stdout.strip())
+        return commit, dirty
+    except (OSError, subprocess.CalledProcessError):
+        return None, False
+
+
+def access_token(profile: Dict[str, Any], supabase_url: str) -> str:
+    now = int(time.time())
+    claims = {
+        "sub": profile["id"],
+        "email": profile["email"],
+        "aud": "authenticated",
+        "iss": f"{supabase_url}/auth/v1",
+        "role": "authenticated",
+        "iat": now,
+        "exp": now + 3600,
+    }
+    return jwt.encode(claims, JWT_SECRET, algorithm="HS256")
+
+
+def signed_webhook(event: Dict[str, Any]) -> Tuple[Dict[str, str], bytes]:
+    payload = json.dumps(event).encode()
+    timestamp = int(time.time())
+    signature = hmac.new(WEBHOOK_SECRET.encode(), f"{timestamp}.".encode() + payload, hashlib.sha256).hexdigest()
+    return {"stripe-signature": f"t={timestamp},v1={signature}", "content-type": "application/json"}, payload
+
+
+def build_scenarios(users: int, supabase_url: str) -> Dict[str, Tuple[Callable[[int], RequestSpec], float]]:
+    """Scenario name -> (request for the i-th call, share of --requests to send)"""
+    profiles = seed_profiles(users, admin_email=ADMIN_EMAIL)
+    members = profiles[:-1]
+    # A few hundred distinct callers, like a real mix of users hitting the API
+    tokens = [{"Authorization": f"Bearer {access_token(p, supabase_url)}"} for p in members[:500]]
+    admin = {"Authorization": f"Bearer {access_token(profiles[-1], supabase_url)}"}
+    run_id = int(time.time())
+
+    def webhook(i: int) -> RequestSpec:
+        customer = members[i % len(members)]["stripe_customer_id"]
+        headers, body = signed_webhook({
+            "id": f"evt_{run_id}_{i}",
+            "object": "event",
+            "type": "customer.subscription.updated",
+            "created": int(time.time()),
+            "data": {"object": {
+                "id": f"sub_{customer}",
+                "object": "subscription",
+                "customer": customer,
+                "status": "active",
+                "current_period_end": int(time.time()) + 30 * 86400,
+                "cancel_at_period_end": False,
+                "items": {"data": [{"price": {"id": "price_monthly"}}]},
+            }},
+        })
+        return "POST", "/api/billing/webhook", headers, body
+
+    def login(i: int) -> RequestSpec:
+        body = json.dumps({"email": members[i % len(members)]["email"], "password": DEFAULT_PASSWORD}).encode()
+        return "POST", "/api/auth/login", {"content-type": "application/json"}, body
+
+    return {
+        "GET /api/health": (lambda i: ("GET", "/api/health", {}, None), 1.0),
+        "POST /api/auth/login": (login, 1.0),
+        "GET /api/users/me": (lambda i: ("GET", "/api/users/me", tokens[i % len(tokens)], None), 1.0),
+        "GET /api/admin/users": (lambda i: ("GET", f"/api/admin/users?page={i % 10 + 1}&per_page=20", admin, None), 1.0),
+        "GET /api/admin/users/export": (lambda i: ("GET", "/api/admin/users/export", admin, None), 0.05),
+        "GET /api/admin/stats": (lambda i: ("GET", "/api/admin/stats", admin, None), 1.0),
+        "POST /api/billing/webhook": (webhook, 1.0),
+    }
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(pct / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+async def run_scenario(client: httpx.AsyncClient, make_request: Callable[[int], RequestSpec], requests: int, concurrency: int) -> Dict[str, Any]:
+    latencies: List[float] = []
+    errors = 0
+    next_index = 0
+
+    async def worker() -> None:
+        nonlocal next_index, errors
+        while next_index < requests:
+            i = next_index
+            next_index += 1
+            method, path, headers, body = make_request(i)
+            start = time.perf_counter()
+            try:
+                response = await client.request(method, path, headers=headers, content=body)
+                await response.aread()
+                if response.status_code >= 400:
+                    errors += 1
+            except httpx.HTTPError:
+                errors += 1
+            latencies.append(time.perf_counter() - start)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(min(concurrency, requests))))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    ms = [value * 1000 for value in latencies]
+    return {
+        "requests": requests,
+        "errors": errors,
+        "concurrency": concurrency,
+        "duration_s": round(elapsed, 3),
+        "throughput_rps": round(requests / elapsed, 1) if elapsed else None,
+        "mean_ms": round(sum(ms) / len(ms), 2) if ms else None,
+        "p50_ms": round(percentile(ms, 50), 2),
+        "p95_ms": round(percentile(ms, 95), 2),
+        "p99_ms": round(percentile(ms, 99), 2),
+        "max_ms": round(ms[-1], 2) if ms else None,
+    }
+
+
+def _wait_ready(url: str, process: subprocess.Popen, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"{url} exited with code {process.returncode}")
+        try:
+            if httpx.get(url, timeout=1.0).status_code < 500:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.1)
+    raise RuntimeError(f"{url} did not become ready within {timeout}s")
+
+
+def app_environment(supabase_url: str, stripe_url: str, queue_path: str) -> Dict[str, str]:
+    api_key = jwt.encode({"role": "service_role", "iss": "supabase"}, "bench", algorithm="HS256")
+    env = {
+        **os.environ,
+        "SUPABASE_URL": supabase_url,
+        "SUPABASE_ANON_KEY": api_key,
+        "SUPABASE_SERVICE_KEY": api_key,
+        "SUPABASE_JWT_SECRET": JWT_SECRET,
+        "SUPABASE_HTTP2": "false",
+        "GOOGLE_CLIENT_ID": "bench",
+        "GOOGLE_CLIENT_SECRET": "bench",
+        "JWT_SECRET": "bench-jwt-secret",
+        "ADMIN_EMAIL": ADMIN_EMAIL,
+        "STRIPE_ENABLED": "true",
+        "STRIPE_SECRET_KEY": "sk_bench",
+        "STRIPE_WEBHOOK_SECRET": WEBHOOK_SECRET,
+        "STRIPE_API_BASE": stripe_url,
+        "STRIPE_WEBHOOK_QUEUE_PATH": queue_path,
+        "STATS_RECONCILE_INTERVAL_SECONDS": "0",
+        # The load generator is one client; measure the API, not the limiter's 429s
+        "RATE_LIMIT_ENABLED": "false",
+        "SENTRY_DSN": "",
+        "PYTHONPATH": str(BACKEND_DIR),
+    }
+    env.pop("PROMETHEUS_MULTIPROC_DIR", None)
+    return env
+
+
+async def drive(base_url: str, scenarios: Dict[str, Tuple[Callable[[int], RequestSpec], float]], args: argparse.Namespace) -> Dict[str, Any]:
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    results = {}
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60.0) as client:
+        for name, (make_request, share) in scenarios.items():
+            if args.only and not any(part in name for part in args.only):
+                continue
+            requests = max(1, int(args.requests * share))
+            # Warm caches and connections so the first calls don't skew p99
+            await run_scenario(client, make_request, min(requests, args.concurrency), args.concurrency)
+            results[name] = await run_scenario(client, make_request, requests, args.concurrency)
+            print(f"  {name}: {results[name]['throughput_rps']} req/s, p50 {results[name]['p50_ms']}ms, p99 {results[name]['p99_ms']}ms")
+    return results
+
+
+def print_table(results: Dict[str, Any], baseline: Optional[Dict[str, Any]] = None) -> None:
+    columns = ["throughput_rps", "p50_ms", "p95_ms", "p99_ms", "errors"]
+    print(f"\n{'endpoint':34}" + "".join(f"{column:>18}" for column in columns))
+    for name, result in results.items():
+        row = f"{name:34}"
+        for column in columns:
+            value = result[column]
+            cell = f"{value}"
+            previous = (baseline or {}).get(name, {}).get(column)
+            if previous and column != "errors":
+                cell += f" ({(value - previous) / previous * 100:+.0f}%)"
+            row += f"{cell:>18}"
+        print(row)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Offline load test against fake Supabase/Stripe upstreams")
+    parser.add_argument("--users", type=int, default=1000, help="profiles to seed")
+    parser.add_argument("--requests", type=int, default=2000, help="requests per scenario (export sends 5%% of this)")
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers for the app")
+    parser.add_argument("--only", nargs="*", help="run scenarios whose name contains any of these")
+    parser.add_argument("--output", type=Path, help="results file (default benchmarks/results/<commit>.json)")
+    parser.add_argument("--compare", type=Path, help="earlier results file to show changes against")
+    args = parser.parse_args()
+
+    supabase_port, stripe_port, app_port = _free_port(), _free_port(), _free_port()
+    supabase_url = f"http://127.0.0.1:{supabase_port}"
+    stripe_url = f"http://127.0.0.1:{stripe_port}"
+    base_url = f"http://127.0.0.1:{app_port}"
+    RESULTS_DIR.mkdir(parents=True, exist_ok=True)
+    queue_path = RESULTS_DIR / f"webhooks-{app_port}.sqlite3"
+    env = app_environment(supabase_url, stripe_url, str(queue_path))
+
+    processes = []
+    try:
+        upstreams = subprocess.Popen(
+            [sys.executable, "-m", "benchmarks.upstreams", "--users", str(args.users), "--admin-email", ADMIN_EMAIL,
+             "--supabase-port", str(supabase_port), "--stripe-port", str(stripe_port)],
+            cwd=BACKEND_DIR, env=env,
+        )
+        processes.append(upstreams)
+        _wait_ready(f"{supabase_url}/rest/v1/whitelist", upstreams)
+
+        app = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(app_port),
+             "--workers", str(args.workers), "--log-level", "warning", "--no-access-log"],
+            cwd=BACKEND_DIR, env=env,
+        )
+        processes.append(app)
+        _wait_ready(f"{base_url}/api/health", app)
+
+        print(f"Benchmarking {base_url} with {args.users} users, {args.requests} requests/scenario, concurrency {args.concurrency}")
+        results = asyncio.run(drive(base_url, build_scenarios(args.users, supabase_url), args))
+    finally:
+        for process in reversed(processes):
+            process.terminate()
+        for process in processes:
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+        for suffix in ("", "-wal", "-shm"):
+            Path(f"{queue_path}{suffix}").unlink(missing_ok=True)
+
+    commit, dirty = _git_commit()
+    report = {
+        "commit": commit,
+        "dirty": dirty,
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": {"users": args.users, "requests": args.requests, "concurrency": args.concurrency, "workers": args.workers},
+        "results": results,
+    }
+    output = args.output or RESULTS_DIR / f"{commit or 'unknown'}{'-dirty' if dirty else ''}.json"
+    output.write_text(json.dumps(report, indent=2) + "\n")
+
+    baseline = json.loads(args.compare.read_text())["results"] if args.compare else None
+    print_table(results, baseline)
+    print(f"\nResults written to {output}")
+
+
+if __name__ == "__main__":
+    main()
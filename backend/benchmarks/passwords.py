@@ -0,0 +1,83 @@
+"""Compare ways of running bcrypt checks from the event loop.
+
+    python -m benchmarks.passwords --logins 200 --concurrency 50 --rounds 12
+
+For each strategy it reports verifications per second and the worst event
+loop lag seen while they ran:
+
+- inline: bcrypt called directly in the coroutine, blocking the loop;
+- threadpool: anyio's default thread pool (what ``run_in_threadpool`` uses);
+- process: ``PasswordHasher``, the process pool used by AUTH_BACKEND=local.
+"""
+import argparse
+import asyncio
+import time
+from typing import Awaitable, Callable, Dict
+import anyio.to_thread
+from app.core import passwords
+from app.services.credentials import PasswordHasher
+
+PASSWORD = "benchmark-password"
+
+
+async def _max_lag(stop: asyncio.Event, interval: float = 0.01) -> float:
+    worst = 0.0
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(interval)
+        worst = max(worst, time.perf_counter() - started - interval)
+    return worst
+
+
+async def run(verify: Callable[[], Awaitable[bool]], logins: int, concurrency: int) -> Dict[str, float]:
+    slots = asyncio.Semaphore(concurrency)
+
+    async def login() -> None:
+        async with slots:
+            assert await verify()
+
+    stop = asyncio.Event()
+    lag = asyncio.create_task(_max_lag(stop))
+    await asyncio.sleep(0)
+    started = time.perf_counter()
+    await asyncio.gather(*(login() for _ in range(logins)))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    return {"logins_per_second": logins / elapsed, "max_loop_lag_ms": await lag * 1000}
+
+
+async def main_async(args: argparse.Namespace) -> None:
+    stored = passwords.get_password_hash(PASSWORD, args.rounds)
+    hasher = PasswordHasher(args.rounds, args.workers, max_pending=args.concurrency)
+
+    async def inline() -> bool:
+        return passwords.verify_password(PASSWORD, stored)
+
+    async def threadpool() -> bool:
+        return await anyio.to_thread.run_sync(passwords.verify_password, PASSWORD, stored)
+
+    async def process() -> bool:
+        return (await hasher.verify(PASSWORD, stored))[0]
+
+    # Start the worker processes outside the timed run
+    await hasher.verify(PASSWORD, stored)
+    try:
+        for name, verify in (("inline", inline), ("threadpool", threadpool), ("process", process)):
+            result = await run(verify, args.logins, args.concurrency)
+            print(f"{name:<12} {result['logins_per_second']:>8.1f} logins/s   "
+                  f"max loop lag {result['max_loop_lag_ms']:>8.1f} ms")
+    finally:
+        hasher.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--rounds", type=int, default=12)
+    parser.add_argument("--workers", type=int, default=2)
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
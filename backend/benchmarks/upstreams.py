@@ -0,0 +1,36 @@
+"""Serve the fake Supabase and Stripe APIs for a benchmark run.
+
+    python -m benchmarks.upstreams --users 1000 --supabase-port 54329 --stripe-port 54330
+
+Runs in its own process so the fakes don't compete with the load generator for
+the GIL.
+"""
+import argparse
+import asyncio
+import uvicorn
+from tests.fakes.stripe import create_stripe_stub
+from tests.fakes.supabase import create_supabase_fake, seed_profiles
+
+
+async def serve(users: int, admin_email: str, supabase_port: int, stripe_port: int) -> None:
+    supabase = create_supabase_fake(seed_profiles(users, admin_email=admin_email))
+    stripe = create_stripe_stub()
+    servers = [
+        uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning", access_log=False))
+        for app, port in ((supabase, supabase_port), (stripe, stripe_port))
+    ]
+    await asyncio.gather(*(server.serve() for server in servers))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--admin-email", default="admin@example.com")
+    parser.add_argument("--supabase-port", type=int, default=54329)
+    parser.add_argument("--stripe-port", type=int, default=54330)
+    args = parser.parse_args()
+    asyncio.run(serve(args.users, args.admin_email, args.supabase_port, args.stripe_port))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,18 @@
+-- Profiles joined with their auth user, so admin listings and exports need a
+-- single query instead of one auth lookup per profile.
+CREATE OR REPLACE VIEW public.admin_users AS
+SELECT
+    p.id,
+    u.email,
+    p.name,
+    p.is_admin,
+    p.language,
+    p.stripe_customer_id,
+    p.created_at,
+    p.updated_at
+FROM public.profiles p
+JOIN auth.users u ON u.id = p.id;
+
+-- Exposes auth.users columns: only the backend's service role may read it
+REVOKE ALL ON public.admin_users FROM anon, authenticated;
+GRANT SELECT ON public.admin_users TO service_role;
@@ -0,0 +1,4 @@
+-- Keyset pagination for admin listings and exports walks (created_at, id), so
+-- every page is an index range scan however deep it is.
+CREATE INDEX IF NOT EXISTS profiles_created_at_id_idx
+    ON public.profiles (created_at DESC, id DESC);
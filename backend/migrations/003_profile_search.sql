@@ -0,0 +1,119 @@
+-- Indexed admin user search. auth.users can't carry our indexes, so the email
+-- is copied onto profiles and kept in sync by triggers; trigram GIN indexes
+-- then serve ILIKE '%term%' and similarity ranking without sequential scans.
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+ALTER TABLE public.profiles ADD COLUMN IF NOT EXISTS email text;
+
+UPDATE public.profiles p
+SET email = u.email
+FROM auth.users u
+WHERE u.id = p.id AND p.email IS DISTINCT FROM u.email;
+
+-- Fill in the email for profiles created without one
+CREATE OR REPLACE FUNCTION public.fill_profile_email()
+RETURNS TRIGGER
+LANGUAGE plpgsql SECURITY DEFINER SET search_path = public AS $$
+BEGIN
+    IF NEW.email IS NULL THEN
+        SELECT u.email INTO NEW.email FROM auth.users u WHERE u.id = NEW.id;
+    END IF;
+    RETURN NEW;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS fill_profiles_email ON public.profiles;
+CREATE TRIGGER fill_profiles_email
+    BEFORE INSERT ON public.profiles
+    FOR EACH ROW
+    EXECUTE FUNCTION public.fill_profile_email();
+
+-- Follow email changes made through Supabase Auth
+CREATE OR REPLACE FUNCTION public.sync_profile_email()
+RETURNS TRIGGER
+LANGUAGE plpgsql SECURITY DEFINER SET search_path = public AS $$
+BEGIN
+    UPDATE public.profiles SET email = NEW.email WHERE id = NEW.id;
+    RETURN NEW;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS on_auth_user_email_updated ON auth.users;
+CREATE TRIGGER on_auth_user_email_updated
+    AFTER UPDATE OF email ON auth.users
+    FOR EACH ROW
+    WHEN (OLD.email IS DISTINCT FROM NEW.email)
+    EXECUTE FUNCTION public.sync_profile_email();
+
+CREATE INDEX IF NOT EXISTS profiles_email_trgm_idx ON public.profiles USING gin (email gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS profiles_name_trgm_idx ON public.profiles USING gin (name gin_trgm_ops);
+
+-- admin_users can now read the synced email instead of joining auth.users
+DROP VIEW IF EXISTS public.admin_users;
+CREATE VIEW public.admin_users AS
+SELECT
+    p.id,
+    p.email,
+    p.name,
+    p.is_admin,
+    p.language,
+    p.stripe_customer_id,
+    p.created_at,
+    p.updated_at
+FROM public.profiles p;
+
+REVOKE ALL ON public.admin_users FROM anon, authenticated;
+GRANT SELECT ON public.admin_users TO service_role;
+
+-- LIKE pattern matching the term literally
+CREATE OR REPLACE FUNCTION public.like_escape(term text)
+RETURNS text
+LANGUAGE sql IMMUTABLE AS $$
+    SELECT replace(replace(replace(term, '\', '\\'), '%', '\%'), '_', '\_');
+$$;
+
+-- Ranked search: substring and fuzzy (trigram) matches, prefix matches first
+CREATE OR REPLACE FUNCTION public.search_profiles(term text, max_results integer DEFAULT 20)
+RETURNS TABLE (
+    id uuid,
+    email text,
+    name text,
+    is_admin boolean,
+    language text,
+    created_at timestamptz,
+    score real
+)
+LANGUAGE sql STABLE AS $$
+    SELECT
+        p.id, p.email, p.name, p.is_admin, p.language, p.created_at,
+        (greatest(similarity(p.email, term), similarity(p.name, term), 0)
+            + CASE WHEN p.email ILIKE public.like_escape(term) || '%'
+                     OR p.name ILIKE public.like_escape(term) || '%' THEN 1 ELSE 0 END)::real AS score
+    FROM public.profiles p
+    -- Results are returned as users, which need an email
+    WHERE p.email IS NOT NULL
+      AND (p.email ILIKE '%' || public.like_escape(term) || '%'
+           OR p.name ILIKE '%' || public.like_escape(term) || '%'
+           OR p.email % term
+           OR p.name % term)
+    ORDER BY score DESC, p.created_at DESC
+    LIMIT max_results;
+$$;
+
+-- Typeahead: prefix matches on email or name, only the fields a picker needs
+CREATE OR REPLACE FUNCTION public.suggest_profiles(prefix text, max_results integer DEFAULT 8)
+RETURNS TABLE (id uuid, email text, name text)
+LANGUAGE sql STABLE AS $$
+    SELECT p.id, p.email, p.name
+    FROM public.profiles p
+    WHERE p.email IS NOT NULL
+      AND (p.email ILIKE public.like_escape(prefix) || '%'
+           OR p.name ILIKE public.like_escape(prefix) || '%')
+    ORDER BY p.email
+    LIMIT max_results;
+$$;
+
+REVOKE ALL ON FUNCTION public.search_profiles(text, integer) FROM PUBLIC, anon, authenticated;
+REVOKE ALL ON FUNCTION public.suggest_profiles(text, integer) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION public.search_profiles(text, integer) TO service_role;
+GRANT EXECUTE ON FUNCTION public.suggest_profiles(text, integer) TO service_role;
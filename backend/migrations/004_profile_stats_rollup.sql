@@ -0,0 +1,123 @@
+-- Dashboard counters maintained incrementally by triggers on profiles, so
+-- /api/admin/stats and /api/users/stats read one small rollup instead of
+-- running exact counts over the whole table. reconcile_profile_stats()
+-- recomputes recent days from profiles to correct any drift; the backend calls
+-- it periodically (STATS_RECONCILE_INTERVAL_SECONDS).
+CREATE TABLE IF NOT EXISTS public.profile_totals (
+    id boolean PRIMARY KEY DEFAULT true CHECK (id),
+    total_users bigint NOT NULL DEFAULT 0,
+    reconciled_at timestamp with time zone
+);
+
+-- Per UTC day: profiles created that day, and profiles whose latest update
+-- falls on that day (what "active" meant for the dashboard)
+CREATE TABLE IF NOT EXISTS public.profile_daily_stats (
+    day date PRIMARY KEY,
+    signups integer NOT NULL DEFAULT 0,
+    active_users integer NOT NULL DEFAULT 0
+);
+
+ALTER TABLE public.profile_totals ENABLE ROW LEVEL SECURITY;
+ALTER TABLE public.profile_daily_stats ENABLE ROW LEVEL SECURITY;
+
+INSERT INTO public.profile_totals (id) VALUES (true) ON CONFLICT DO NOTHING;
+
+CREATE INDEX IF NOT EXISTS profiles_updated_at_idx ON public.profiles (updated_at);
+
+CREATE OR REPLACE FUNCTION public.bump_profile_daily_stats(stat_day date, signups_delta integer, active_delta integer)
+RETURNS void
+LANGUAGE sql AS $$
+    INSERT INTO public.profile_daily_stats (day, signups, active_users)
+    VALUES (stat_day, signups_delta, active_delta)
+    ON CONFLICT (day) DO UPDATE SET
+        signups = profile_daily_stats.signups + EXCLUDED.signups,
+        active_users = profile_daily_stats.active_users + EXCLUDED.active_users;
+$$;
+
+CREATE OR REPLACE FUNCTION public.track_profile_stats()
+RETURNS TRIGGER
+LANGUAGE plpgsql SECURITY DEFINER SET search_path = public AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        UPDATE profile_totals SET total_users = total_users + 1;
+        PERFORM bump_profile_daily_stats((NEW.created_at AT TIME ZONE 'utc')::date, 1, 0);
+        PERFORM bump_profile_daily_stats((NEW.updated_at AT TIME ZONE 'utc')::date, 0, 1);
+    ELSIF TG_OP = 'DELETE' THEN
+        UPDATE profile_totals SET total_users = total_users - 1;
+        PERFORM bump_profile_daily_stats((OLD.created_at AT TIME ZONE 'utc')::date, -1, 0);
+        PERFORM bump_profile_daily_stats((OLD.updated_at AT TIME ZONE 'utc')::date, 0, -1);
+    ELSE
+        -- Activity moved the profile's latest update to another day
+        PERFORM bump_profile_daily_stats((OLD.updated_at AT TIME ZONE 'utc')::date, 0, -1);
+        PERFORM bump_profile_daily_stats((NEW.updated_at AT TIME ZONE 'utc')::date, 0, 1);
+    END IF;
+    RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS track_profiles_signups ON public.profiles;
+CREATE TRIGGER track_profiles_signups
+    AFTER INSERT OR DELETE ON public.profiles
+    FOR EACH ROW
+    EXECUTE FUNCTION public.track_profile_stats();
+
+-- updated_at is set by a BEFORE trigger, so compare values rather than using
+-- UPDATE OF updated_at (which only sees columns named in the statement)
+DROP TRIGGER IF EXISTS track_profiles_activity ON public.profiles;
+CREATE TRIGGER track_profiles_activity
+    AFTER UPDATE ON public.profiles
+    FOR EACH ROW
+    WHEN ((OLD.updated_at AT TIME ZONE 'utc')::date IS DISTINCT FROM (NEW.updated_at AT TIME ZONE 'utc')::date)
+    EXECUTE FUNCTION public.track_profile_stats();
+
+-- The week and month are today plus the 6 and 29 days before it: 7 and 30
+-- calendar days, matching the rolling windows the dashboard used before
+CREATE OR REPLACE FUNCTION public.dashboard_stats()
+RETURNS json
+LANGUAGE sql STABLE AS $$
+    SELECT json_build_object(
+        'totalUsers', coalesce((SELECT total_users FROM public.profile_totals), 0),
+        'newUsersThisWeek', coalesce(sum(s.signups) FILTER (WHERE s.day > t.today - 7), 0),
+        'newUsersThisMonth', coalesce(sum(s.signups) FILTER (WHERE s.day > t.today - 30), 0),
+        'activeUsersToday', coalesce(sum(s.active_users) FILTER (WHERE s.day = t.today), 0)
+    )
+    FROM (SELECT (now() AT TIME ZONE 'utc')::date AS today) t
+    LEFT JOIN public.profile_daily_stats s ON s.day > t.today - 30
+    GROUP BY t.today;
+$$;
+
+CREATE OR REPLACE FUNCTION public.reconcile_profile_stats()
+RETURNS void
+LANGUAGE plpgsql SECURITY DEFINER SET search_path = public AS $$
+DECLARE
+    since_day date := (now() AT TIME ZONE 'utc')::date - 31;
+    since timestamp with time zone := since_day::timestamp AT TIME ZONE 'utc';
+BEGIN
+    -- Every worker runs this on a timer; only one needs to do the work
+    IF NOT pg_try_advisory_xact_lock(hashtext('reconcile_profile_stats')) THEN
+        RETURN;
+    END IF;
+
+    UPDATE profile_totals
+    SET total_users = (SELECT count(*) FROM profiles), reconciled_at = now();
+
+    DELETE FROM profile_daily_stats WHERE day >= since_day;
+    INSERT INTO profile_daily_stats (day, signups, active_users)
+    SELECT day, sum(signups), sum(active_users)
+    FROM (
+        SELECT (created_at AT TIME ZONE 'utc')::date AS day, 1 AS signups, 0 AS active_users
+        FROM profiles WHERE created_at >= since
+        UNION ALL
+        SELECT (updated_at AT TIME ZONE 'utc')::date, 0, 1
+        FROM profiles WHERE updated_at >= since
+    ) recent
+    GROUP BY day;
+END;
+$$;
+
+REVOKE ALL ON FUNCTION public.dashboard_stats() FROM PUBLIC, anon, authenticated;
+REVOKE ALL ON FUNCTION public.reconcile_profile_stats() FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION public.dashboard_stats() TO service_role;
+GRANT EXECUTE ON FUNCTION public.reconcile_profile_stats() TO service_role;
+
+SELECT public.reconcile_profile_stats();
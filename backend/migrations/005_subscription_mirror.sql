@@ -0,0 +1,16 @@
+-- Local copy of each customer's Stripe subscription, written by the billing
+-- webhook, so GET /api/billing/subscription reads the profile row instead of
+-- calling Stripe. subscription_synced_at is when the row last matched Stripe;
+-- NULL means it was never synced (or checkout just completed) and the backend
+-- reconciles it on the next read.
+ALTER TABLE public.profiles
+    ADD COLUMN IF NOT EXISTS subscription_status text,
+    ADD COLUMN IF NOT EXISTS subscription_current_period_end timestamp with time zone,
+    ADD COLUMN IF NOT EXISTS subscription_cancel_at_period_end boolean NOT NULL DEFAULT false,
+    ADD COLUMN IF NOT EXISTS subscription_price_id text,
+    ADD COLUMN IF NOT EXISTS subscription_synced_at timestamp with time zone;
+
+-- Webhooks identify the profile by Stripe customer
+CREATE INDEX IF NOT EXISTS profiles_stripe_customer_id_idx
+    ON public.profiles (stripe_customer_id)
+    WHERE stripe_customer_id IS NOT NULL;
@@ -0,0 +1,3 @@
+-- Exact email lookups (the admin bootstrap at startup) use this instead of the
+-- trigram index from 003, which is built for substring search.
+CREATE INDEX IF NOT EXISTS profiles_email_idx ON public.profiles (email);
@@ -0,0 +1,16 @@
+-- Password hashes for AUTH_BACKEND=local, for deployments that don't use
+-- Supabase Auth. Only the backend (service role) reads or writes them.
+-- Emails are stored lowercased; hashes are bcrypt and are upgraded in place
+-- when PASSWORD_HASH_ROUNDS changes.
+--
+-- Local users have no auth.users row, so on a database without Supabase Auth
+-- create public.profiles without the foreign key to auth.users.
+CREATE TABLE IF NOT EXISTS public.credentials (
+    user_id uuid PRIMARY KEY,
+    email text NOT NULL UNIQUE,
+    password_hash text NOT NULL,
+    created_at timestamp with time zone NOT NULL DEFAULT now(),
+    updated_at timestamp with time zone NOT NULL DEFAULT now()
+);
+
+ALTER TABLE public.credentials ENABLE ROW LEVEL SECURITY;
@@ -0,0 +1,26 @@
+-- Signup whitelist for WHITELIST_MODE, read into memory by each backend worker
+-- and then polled for changes. updated_at moves on every add or remove, and
+-- removals keep the row with removed_at set, so a poll sees both. Emails are
+-- stored lowercased.
+CREATE TABLE IF NOT EXISTS public.whitelist (
+    email text PRIMARY KEY,
+    created_at timestamp with time zone NOT NULL DEFAULT now()
+);
+
+ALTER TABLE public.whitelist
+    ADD COLUMN IF NOT EXISTS updated_at timestamp with time zone NOT NULL DEFAULT now(),
+    ADD COLUMN IF NOT EXISTS removed_at timestamp with time zone;
+
+-- Lowercase existing entries, dropping any that then duplicate another
+DELETE FROM public.whitelist w
+    WHERE w.email <> lower(w.email)
+      AND EXISTS (SELECT 1 FROM public.whitelist l WHERE l.email = lower(w.email));
+UPDATE public.whitelist SET email = lower(email) WHERE email <> lower(email);
+
+-- Bulk adds upsert on email; tables created before this migration may lack the key
+CREATE UNIQUE INDEX IF NOT EXISTS whitelist_email_key ON public.whitelist (email);
+
+-- Change polls read (updated_at, email) ranges
+CREATE INDEX IF NOT EXISTS whitelist_updated_at_idx ON public.whitelist (updated_at, email);
+
+ALTER TABLE public.whitelist ENABLE ROW LEVEL SECURITY;
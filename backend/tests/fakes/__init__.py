@@ -0,0 +1 @@
+"""In-memory fakes of upstream services, shared by tests and benchmarks"""
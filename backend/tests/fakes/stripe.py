@@ -0,0 +1,50 @@
+"""Minimal in-memory Stripe API for exercising StripeClient without the network"""
+import itertools
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+
+def create_stripe_stub() -> FastAPI:
+    app = FastAPI()
+    ids = itertools.count(1)
+    app.state.customers = {}
+    app.state.subscriptions = []
+    app.state.requests = []
+
+    def error(status_code: int, message: str, code: str = "resource_missing") -> JSONResponse:
+        return JSONResponse({"error": {"message": message, "code": code, "type": "invalid_request_error"}}, status_code)
+
+    @app.middleware("http")
+    async def check_auth(request: Request, call_next):
+        if not request.headers.get("authorization", "").startswith("Bearer sk_"):
+            return error(401, "Invalid API Key provided", "api_key_invalid")
+        app.state.requests.append(request)
+        return await call_next(request)
+
+    @app.post("/v1/customers")
+    async def create_customer(request: Request):
+        form = await request.form()
+        customer = {"id": f"cus_{next(ids)}", "object": "customer", "email": form.get("email"),
+                    "metadata": {"user_id": form.get("metadata[user_id]")}}
+        app.state.customers[customer["id"]] = customer
+        return customer
+
+    @app.post("/v1/checkout/sessions")
+    async def create_checkout_session(request: Request):
+        form = await request.form()
+        if form.get("customer") not in app.state.customers:
+            return error(400, f"No such customer: '{form.get('customer')}'")
+        return {"id": f"cs_{next(ids)}", "object": "checkout.session",
+                "url": f"https://checkout.stripe.test/{form.get('line_items[0][price]')}"}
+
+    @app.post("/v1/billing_portal/sessions")
+    async def create_portal_session(request: Request):
+        form = await request.form()
+        return {"id": f"bps_{next(ids)}", "url": f"https://billing.stripe.test/{form.get('customer')}"}
+
+    @app.get("/v1/subscriptions")
+    async def list_subscriptions(customer: str, limit: int = 10, status: str = "all"):
+        data = [sub for sub in app.state.subscriptions if sub["customer"] == customer]
+        return {"object": "list", "data": data[:limit], "has_more": len(data) > limit}
+
+    return app
@@ -0,0 +1,414 @@
+"""In-memory stand-in for the parts of Supabase the backend calls.
+
+Implements the PostgREST subset the repositories use (eq/is/lt/gt/gte/in/ilike
+filters, or=(...) groups, order, limit/offset, count via Prefer, PATCH with
+return=representation, DELETE, bulk insert and upsert, the dashboard and profile
+search RPCs) and the GoTrue endpoints the app
+uses (password and refresh-token sign-in, sign-up, sign-out, recovery, admin
+user creation and deletion), so
+the app can run with no network.
+
+Seeded users sign in with DEFAULT_PASSWORD; access tokens are HS256 JWTs signed
+with ``jwt_secret``.
+"""
+import re
+import secrets
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, Response
+from jose import jwt
+
+DEFAULT_PASSWORD = "password123"
+JWT_SECRET = "fake-supabase-jwt-secret"
+ACCESS_TOKEN_TTL = 3600
+
+ADMIN_USER_COLUMNS = ["id", "email", "name", "is_admin", "language", "created_at"]
+
+Predicate = Callable[[Dict[str, Any]], bool]
+
+
+def make_profile(index: int, created_at: datetime, **values: Any) -> Dict[str, Any]:
+    profile = {
+        "id": str(uuid.UUID(int=index + 1)),
+        "email": f"user{index}@example.com",
+        "name": f"User {index}",
+        "is_admin": False,
+        "language": "en",
+        "stripe_customer_id": f"cus_{index}",
+        "subscription_status": None,
+        "created_at": created_at.isoformat(),
+        "updated_at": created_at.isoformat(),
+    }
+    profile.update(values)
+    return profile
+
+
+def seed_profiles(count: int, admin_email: Optional[str] = None) -> List[Dict[str, Any]]:
+    """``count`` users created over the last year, plus an admin if ``admin_email`` is given"""
+    now = datetime.now(timezone.utc)
+    profiles = [
+        make_profile(i, now - timedelta(minutes=(count - i) * 525600 // max(count, 1)))
+        for i in range(count)
+    ]
+    if admin_email:
+        profiles.append(make_profile(count, now, email=admin_email, name="Admin", is_admin=True, stripe_customer_id=None))
+    return profiles
+
+
+def _split_top_level(text: str) -> List[str]:
+    """Split a PostgREST logic group on commas outside parentheses and quotes"""
+    parts, depth, quoted, current = [], 0, False, ""
+    for i, char in enumerate(text):
+        if char == '"' and (i == 0 or text[i - 1] != "\\"):
+            quoted = not quoted
+        elif not quoted and char == "(":
+            depth += 1
+        elif not quoted and char == ")":
+            depth -= 1
+        elif not quoted and depth == 0 and char == ",":
+            parts.append(current)
+            current = ""
+            continue
+        current += char
+    parts.append(current)
+    return parts
+
+
+def _unquote(value: str) -> str:
+    if len(value) >= 2 and value[0] == value[-1] == '"':
+        return re.sub(r"\\(.)", r"\1", value[1:-1])
+    return value
+
+
+def _like_regex(pattern: str) -> "re.Pattern[str]":
+    regex, escaped = "", False
+    for char in pattern:
+        if escaped:
+            regex += re.escape(char)
+            escaped = False
+        elif char == "\\":
+            escaped = True
+        elif char == "%":
+            regex += ".*"
+        elif char == "_":
+            regex += "."
+        else:
+            regex += re.escape(char)
+    return re.compile(f"^{regex}$", re.IGNORECASE | re.DOTALL)
+
+
+def _comparable(value: Any) -> Any:
+    return str(value).lower() if isinstance(value, bool) else value
+
+
+def _condition(column: str, expression: str) -> Predicate:
+    op, _, raw = expression.partition(".")
+    value = _unquote(raw)
+    if op == "eq":
+        if value.lower() in ("true", "false"):
+            return lambda row: _comparable(row.get(column)) == value.lower()
+        return lambda row: row.get(column) is not None and str(row[column]) == value
+    if op == "is":
+        return lambda row: row.get(column) is None if value == "null" else _comparable(row.get(column)) == value
+    if op == "lt":
+        return lambda row: row.get(column) is not None and str(row[column]) < value
+    if op == "gt":
+        return lambda row: row.get(column) is not None and str(row[column]) > value
+    if op == "gte":
+        return lambda row: row.get(column) is not None and str(row[column]) >= value
+    if op == "in":
+        values = {_unquote(item) for item in _split_top_level(raw[1:-1])}
+        return lambda row: row.get(column) is not None and str(row[column]) in values
+    if op == "ilike":
+        regex = _like_regex(value)
+        return lambda row: row.get(column) is not None and bool(regex.match(str(row[column])))
+    raise ValueError(f"Unsupported operator: {op}")
+
+
+def _logic(kind: str, body: str) -> Predicate:
+    terms = [_term(term) for term in _split_top_level(body)]
+    if kind == "or":
+        return lambda row: any(term(row) for term in terms)
+    return lambda row: all(term(row) for term in terms)
+
+
+def _term(term: str) -> Predicate:
+    match = re.fullmatch(r"(and|or)\((.*)\)", term, re.DOTALL)
+    if match:
+        return _logic(match.group(1), match.group(2))
+    column, _, expression = term.partition(".")
+    return _condition(column, expression)
+
+
+def parse_query(params: List[Tuple[str, str]]) -> Tuple[List[Predicate], List[Tuple[str, bool]], Optional[int], int]:
+    """Filters, order (column, descending), limit and offset from a PostgREST query string"""
+    filters, order, limit, offset = [], [], None, 0
+    for name, value in params:
+        if name == "select":
+            continue
+        if name == "order":
+            for part in value.split(","):
+                column, _, direction = part.partition(".")
+                order.append((column, direction.startswith("desc")))
+        elif name == "limit":
+            limit = int(value)
+        elif name == "offset":
+            offset = int(value)
+        elif name in ("or", "and"):
+            filters.append(_logic(name, value[1:-1]))
+        else:
+            filters.append(_condition(name, value))
+    return filters, order, limit, offset
+
+
+class FakeSupabase:
+    def __init__(self, profiles: Optional[List[Dict[str, Any]]] = None, jwt_secret: str = JWT_SECRET):
+        self.profiles: Dict[str, Dict[str, Any]] = {row["id"]: row for row in profiles or []}
+        self.whitelist: List[Dict[str, Any]] = []
+        self.requests = 0
+        self.jwt_secret = jwt_secret
+        # GoTrue users by email; seeded profiles share DEFAULT_PASSWORD
+        self.users: Dict[str, Dict[str, Any]] = {
+            row["email"]: {"id": row["id"], "email": row["email"], "password": DEFAULT_PASSWORD, "created_at": row["created_at"]}
+            for row in self.profiles.values()
+        }
+        self.signed_out: set = set()
+        # Refresh token -> {"user", "session_id", "used"}; rotated on every refresh
+        self.refresh_tokens: Dict[str, Dict[str, Any]] = {}
+
+    def session(self, user: Dict[str, Any], issuer: str, session_id: Optional[str] = None) -> Dict[str, Any]:
+        now = int(time.time())
+        session_id = session_id or str(uuid.uuid4())
+        refresh_token = secrets.token_urlsafe(16)
+        self.refresh_tokens[refresh_token] = {"user": user, "session_id": session_id, "used": False}
+        claims = {
+            "sub": user["id"],
+            "email": user["email"],
+            "aud": "authenticated",
+            "iss": issuer,
+            "role": "authenticated",
+            "session_id": session_id,
+            "iat": now,
+            "exp": now + ACCESS_TOKEN_TTL,
+        }
+        return {
+            "access_token": jwt.encode(claims, self.jwt_secret, algorithm="HS256"),
+            "token_type": "bearer",
+            "expires_in": ACCESS_TOKEN_TTL,
+            "expires_at": now + ACCESS_TOKEN_TTL,
+            "refresh_token": refresh_token,
+            "user": {key: user[key] for key in ("id", "email", "created_at")},
+        }
+
+    def rows(self, table: str) -> List[Dict[str, Any]]:
+        if table == "profiles":
+            return list(self.profiles.values())
+        if table == "admin_users":
+            return [{column: row.get(column) for column in ADMIN_USER_COLUMNS} for row in self.profiles.values()]
+        if table == "whitelist":
+            return self.whitelist
+        raise KeyError(table)
+
+    def select(self, table: str, params: List[Tuple[str, str]]) -> Tuple[List[Dict[str, Any]], int]:
+        filters, order, limit, offset = parse_query(params)
+        id_filter = [value for name, value in params if name == "id" and value.startswith("eq.")]
+        if table == "profiles" and id_filter and len(filters) == 1:
+            row = self.profiles.get(id_filter[0][3:])
+            matching = [row] if row else []
+        else:
+            matching = [row for row in self.rows(table) if all(check(row) for check in filters)]
+        for column, descending in reversed(order):
+            matching.sort(key=lambda row: str(row.get(column)), reverse=descending)
+        end = offset + limit if limit is not None else None
+        return matching[offset:end], len(matching)
+
+    def search_profiles(self, term: str, max_results: int) -> List[Dict[str, Any]]:
+        """Like migrations/003's function without trigram similarity: substring matches, prefix ones first"""
+        term = term.lower()
+        results = []
+        for row in self.profiles.values():
+            fields = [(row.get(column) or "").lower() for column in ("email", "name")]
+            # Results are returned as users, which need an email
+            if row.get("email") is None or not any(term in field for field in fields):
+                continue
+            score = 1.5 if any(field.startswith(term) for field in fields) else 0.5
+            results.append({**{column: row.get(column) for column in ADMIN_USER_COLUMNS}, "score": score})
+        results.sort(key=lambda row: row["created_at"], reverse=True)
+        results.sort(key=lambda row: row["score"], reverse=True)
+        return results[:max_results]
+
+    def suggest_profiles(self, prefix: str, max_results: int) -> List[Dict[str, Any]]:
+        prefix = prefix.lower()
+        matches = [
+            {"id": row["id"], "email": row["email"], "name": row.get("name")}
+            for row in self.profiles.values()
+            if row.get("email") is not None
+            and any((row.get(column) or "").lower().startswith(prefix) for column in ("email", "name"))
+        ]
+        return sorted(matches, key=lambda row: row["email"])[:max_results]
+
+    def dashboard_stats(self) -> Dict[str, int]:
+        now = datetime.now(timezone.utc)
+        created = [datetime.fromisoformat(row["created_at"]) for row in self.profiles.values()]
+        updated = [datetime.fromisoformat(row["updated_at"]) for row in self.profiles.values()]
+        return {
+            "totalUsers": len(created),
+            "newUsersThisWeek": sum(1 for at in created if at >= now - timedelta(days=7)),
+            "newUsersThisMonth": sum(1 for at in created if at >= now - timedelta(days=30)),
+            "activeUsersToday": sum(1 for at in updated if at.date() == now.date()),
+        }
+
+
+def _auth_error(status_code: int, error_code: str, message: str) -> JSONResponse:
+    return JSONResponse({"code": status_code, "error_code": error_code, "msg": message}, status_code)
+
+
+def create_supabase_fake(profiles: Optional[List[Dict[str, Any]]] = None, jwt_secret: str = JWT_SECRET) -> FastAPI:
+    app = FastAPI()
+    fake = FakeSupabase(profiles, jwt_secret)
+    app.state.fake = fake
+
+    @app.middleware("http")
+    async def count_requests(request: Request, call_next):
+        fake.requests += 1
+        return await call_next(request)
+
+    @app.get("/rest/v1/{table}")
+    async def select(table: str, request: Request):
+        rows, total = fake.select(table, list(request.query_params.multi_items()))
+        headers = {}
+        if "count=" in request.headers.get("prefer", ""):
+            offset = int(request.query_params.get("offset", 0))
+            headers["content-range"] = f"{offset}-{offset + len(rows) - 1}/{total}" if rows else f"*/{total}"
+        return JSONResponse(rows, headers=headers)
+
+    @app.patch("/rest/v1/{table}")
+    async def update(table: str, request: Request):
+        values = await request.json()
+        rows, _ = fake.select(table, list(request.query_params.multi_items()))
+        for row in rows:
+            row.update(values)
+            row["updated_at"] = datetime.now(timezone.utc).isoformat()
+        return rows
+
+    @app.delete("/rest/v1/{table}")
+    async def delete(table: str, request: Request):
+        rows, _ = fake.select(table, list(request.query_params.multi_items()))
+        for row in rows:
+            if table == "profiles":
+                del fake.profiles[row["id"]]
+            else:
+                fake.rows(table).remove(row)
+        return Response(status_code=204)
+
+    @app.post("/rest/v1/{table}")
+    async def insert(table: str, request: Request, on_conflict: Optional[str] = None):
+        body = await request.json()
+        inserted = []
+        for values in body if isinstance(body, list) else [body]:
+            existing = None
+            if on_conflict and "merge-duplicates" in request.headers.get("prefer", ""):
+                existing = next((row for row in fake.rows(table) if row.get(on_conflict) == values.get(on_conflict)), None)
+            if existing is not None:
+                existing.update(values)
+                inserted.append(existing)
+                continue
+            row = {"created_at": datetime.now(timezone.utc).isoformat(), **values}
+            row.setdefault("updated_at", row["created_at"])
+            if table == "profiles":
+                fake.profiles[row["id"]] = row
+            else:
+                fake.rows(table).append(row)
+            inserted.append(row)
+        return JSONResponse(inserted, status_code=201)
+
+    @app.post("/rest/v1/rpc/dashboard_stats")
+    async def dashboard_stats():
+        return fake.dashboard_stats()
+
+    @app.post("/rest/v1/rpc/search_profiles")
+    async def search_profiles(request: Request):
+        body = await request.json()
+        return fake.search_profiles(body["term"], body.get("max_results", 20))
+
+    @app.post("/rest/v1/rpc/suggest_profiles")
+    async def suggest_profiles(request: Request):
+        body = await request.json()
+        return fake.suggest_profiles(body["prefix"], body.get("max_results", 8))
+
+    @app.post("/rest/v1/rpc/reconcile_profile_stats")
+    async def reconcile_profile_stats():
+        return Response(status_code=204)
+
+    @app.post("/auth/v1/token")
+    async def token(request: Request, grant_type: str):
+        body = await request.json()
+        issuer = f"{request.base_url}auth/v1"
+        if grant_type == "refresh_token":
+            entry = fake.refresh_tokens.get(body.get("refresh_token"))
+            if not entry:
+                return _auth_error(400, "refresh_token_not_found", "Invalid Refresh Token: Refresh Token Not Found")
+            if entry["session_id"] in fake.signed_out:
+                return _auth_error(400, "session_not_found", "Session not found")
+            if entry["used"]:
+                # Reuse: revoke the whole session, as GoTrue does
+                fake.signed_out.add(entry["session_id"])
+                return _auth_error(400, "refresh_token_already_used", "Invalid Refresh Token: Already Used")
+            entry["used"] = True
+            return fake.session(entry["user"], issuer, entry["session_id"])
+        if grant_type != "password":
+            return _auth_error(400, "unsupported_grant_type", f"Unsupported grant type: {grant_type}")
+        user = fake.users.get(body.get("email"))
+        if not user or user["password"] != body.get("password"):
+            return _auth_error(400, "invalid_credentials", "Invalid login credentials")
+        return fake.session(user, issuer)
+
+    @app.post("/auth/v1/signup")
+    async def signup(request: Request):
+        body = await request.json()
+        if body.get("email") in fake.users:
+            return _auth_error(422, "user_already_exists", "User already registered")
+        user = {"id": str(uuid.uuid4()), "email": body.get("email"), "password": body.get("password"),
+                "created_at": datetime.now(timezone.utc).isoformat()}
+        fake.users[user["email"]] = user
+        return fake.session(user, f"{request.base_url}auth/v1")
+
+    @app.post("/auth/v1/logout")
+    async def logout(request: Request):
+        token = request.headers.get("authorization", "").removeprefix("Bearer ")
+        try:
+            claims = jwt.get_unverified_claims(token)
+        except Exception:
+            return _auth_error(401, "bad_jwt", "Invalid token")
+        fake.signed_out.add(claims.get("session_id"))
+        return Response(status_code=204)
+
+    @app.post("/auth/v1/recover")
+    async def recover():
+        return {}
+
+    @app.post("/auth/v1/admin/users")
+    async def create_user(request: Request):
+        body = await request.json()
+        if any(row.get("email") == body.get("email") for row in fake.profiles.values()):
+            return JSONResponse({"code": 422, "error_code": "email_exists", "msg": "A user with this email address has already been registered"}, 422)
+        user = {"id": str(uuid.uuid4()), "email": body.get("email"), "password": body.get("password"),
+                "created_at": datetime.now(timezone.utc).isoformat()}
+        fake.users[user["email"]] = user
+        return {"id": user["id"], "aud": "authenticated", "email": user["email"], "created_at": user["created_at"],
+                "app_metadata": {}, "user_metadata": body.get("user_metadata", {})}
+
+    @app.delete("/auth/v1/admin/users/{user_id}")
+    async def delete_user(user_id: str):
+        user = next((user for user in fake.users.values() if user["id"] == user_id), None)
+        if user is None:
+            return _auth_error(404, "user_not_found", "User not found")
+        del fake.users[user["email"]]
+        # profiles.id references auth.users with ON DELETE CASCADE
+        fake.profiles.pop(user_id, None)
+        return {}
+
+    return app
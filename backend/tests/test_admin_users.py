@@ -0,0 +1,84 @@
+import base64
+from datetime import datetime, timezone
+import httpx
+import pytest
+from app.api import deps
+from app.core import security
+from app.core.rate_limit import MemoryStore, RateLimiter, parse_quota
+from app.main import app
+from tests.fakes.supabase import DEFAULT_PASSWORD, JWT_SECRET, create_supabase_fake, make_profile, seed_profiles
+
+
+@pytest.fixture
+def fake(monkeypatch):
+    supabase = create_supabase_fake(seed_profiles(45, admin_email="admin@example.com"))
+    monkeypatch.setattr("app.core.database._transport", httpx.ASGITransport(app=supabase))
+    monkeypatch.setattr("app.core.database._http_client", None)
+    monkeypatch.setattr("app.core.database._db", None)
+    monkeypatch.setattr(deps, "limiter", RateLimiter(MemoryStore(), dict.fromkeys(("anonymous", "authenticated", "subscribed", "client"), parse_quota("1/minute")), enabled=False))
+    monkeypatch.setattr(security.signing_keys, "secret", JWT_SECRET)
+    return supabase.state.fake
+
+
+@pytest.fixture
+async def admin(fake):
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        login = (await client.post("/api/auth/login", json={"email": "admin@example.com", "password": DEFAULT_PASSWORD})).json()
+        client.headers["Authorization"] = f"Bearer {login['access_token']}"
+        yield client
+
+
+async def test_cursor_pages_cover_every_user_once(admin):
+    first = (await admin.get("/api/admin/users", params={"per_page": 20})).json()
+    assert first["page"] == 1 and first["total"] == 46 and first["next_cursor"]
+
+    seen, body = [user["id"] for user in first["users"]], first
+    while body["next_cursor"]:
+        response = await admin.get("/api/admin/users", params={"per_page": 20, "cursor": body["next_cursor"], "page": 7})
+        assert response.status_code == 200
+        body = response.json()
+        # Cursor pages have no page number, and keep the first page's total
+        assert body["page"] is None and body["total"] == 46
+        seen.extend(user["id"] for user in body["users"])
+    assert len(seen) == len(set(seen)) == 46
+
+    by_offset = (await admin.get("/api/admin/users", params={"per_page": 20, "page": 2})).json()
+    assert by_offset["page"] == 2 and [user["id"] for user in by_offset["users"]] == seen[20:40]
+
+
+async def test_count_modes(admin):
+    assert (await admin.get("/api/admin/users", params={"count": "none"})).json()["total"] is None
+    assert (await admin.get("/api/admin/users", params={"count": "estimated"})).json()["total"] == 46
+    assert (await admin.get("/api/admin/users", params={"count": "exact", "role": "admin"})).json()["total"] == 1
+
+
+async def test_cursor_is_bound_to_its_filters(admin):
+    first = (await admin.get("/api/admin/users", params={"per_page": 5, "search": "user1"})).json()
+    assert first["total"] == 11 and first["next_cursor"]
+    cursor = first["next_cursor"]
+
+    response = await admin.get("/api/admin/users", params={"per_page": 5, "search": "user1", "cursor": cursor})
+    assert response.status_code == 200 and response.json()["total"] == 11
+    for params in ({"search": "user2"}, {}, {"search": "user1", "role": "user"}):
+        response = await admin.get("/api/admin/users", params={"per_page": 5, "cursor": cursor, **params})
+        assert response.status_code == 400
+
+    garbage = base64.urlsafe_b64encode(b'["not a date", "x", null, null, null]').decode()
+    assert (await admin.get("/api/admin/users", params={"cursor": garbage})).status_code == 400
+
+
+async def test_search_and_typeahead_skip_profiles_without_email(admin, fake):
+    # A profile whose email was never synced from auth.users
+    orphan = make_profile(99, datetime.now(timezone.utc), email=None, name="user1 without email")
+    fake.profiles[orphan["id"]] = orphan
+
+    response = await admin.get("/api/admin/users/search", params={"q": "user1"})
+    assert response.status_code == 200
+    results = response.json()
+    assert sorted(user["email"] for user in results) == sorted(
+        ["user1@example.com"] + [f"user1{i}@example.com" for i in range(10)]
+    )
+
+    response = await admin.get("/api/admin/users/typeahead", params={"q": "user1", "limit": 3})
+    assert response.status_code == 200
+    assert [user["email"] for user in response.json()] == ["user10@example.com", "user11@example.com", "user12@example.com"]
@@ -0,0 +1,121 @@
+import asyncio
+import httpx
+import pytest
+from jose import jwt
+from app.api import deps
+from app.core import security, sessions
+from app.core.rate_limit import MemoryStore, RateLimiter, parse_quota
+from app.main import app
+from app.services.auth_gateway import AuthGatewayError, auth_gateway
+from tests.fakes.supabase import DEFAULT_PASSWORD, JWT_SECRET, create_supabase_fake, seed_profiles
+
+
+@pytest.fixture
+def fake(monkeypatch):
+    supabase = create_supabase_fake(seed_profiles(300))
+    monkeypatch.setattr("app.core.database._transport", httpx.ASGITransport(app=supabase))
+    monkeypatch.setattr("app.core.database._http_client", None)
+    monkeypatch.setattr("app.core.database._db", None)
+    monkeypatch.setattr(deps, "limiter", RateLimiter(MemoryStore(), dict.fromkeys(("anonymous", "authenticated", "subscribed", "client"), parse_quota("1/minute")), enabled=False))
+    return supabase.state.fake
+
+
+@pytest.fixture
+async def client(fake):
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        yield client
+
+
+async def test_parallel_logins_each_get_their_own_session(client, fake):
+    emails = [user["email"] for user in fake.users.values()]
+
+    responses = await asyncio.gather(*(
+        client.post("/api/auth/login", json={"email": email, "password": DEFAULT_PASSWORD}) for email in emails
+    ))
+
+    assert [response.status_code for response in responses] == [200] * len(emails)
+    for email, response in zip(emails, responses):
+        body = response.json()
+        assert body["user"]["email"] == email
+        assert jwt.get_unverified_claims(body["access_token"])["email"] == email
+
+
+async def test_bad_password_signup_and_logout(client, fake):
+    response = await client.post("/api/auth/login", json={"email": "user1@example.com", "password": "wrong"})
+    assert response.status_code == 401
+
+    response = await client.post("/api/auth/signup", json={"email": "new@example.com", "password": "s3cret-pass"})
+    assert response.status_code == 200
+    token = response.json()["access_token"]
+    assert fake.profiles[response.json()["user"]["id"]]["email"] == "new@example.com"
+
+    response = await client.post("/api/auth/logout", headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 200
+    assert jwt.get_unverified_claims(token)["session_id"] in fake.signed_out
+
+
+async def test_refresh_rotates_and_rejects_reuse(client, fake):
+    login = (await client.post("/api/auth/login", json={"email": "user2@example.com", "password": DEFAULT_PASSWORD})).json()
+    assert login["refresh_token"] and login["expires_at"]
+
+    # Two tabs refreshing at once both get the one rotated session
+    first, second = await asyncio.gather(*(
+        client.post("/api/auth/refresh", json={"refresh_token": login["refresh_token"]}) for _ in range(2)
+    ))
+    assert first.status_code == second.status_code == 200
+    rotated = first.json()
+    assert rotated == second.json()
+    assert rotated["refresh_token"] != login["refresh_token"]
+
+    # Past the grace period the old token is reuse: rejected, and the session's newer tokens die with it
+    sessions._recent_rotations.clear()
+    response = await client.post("/api/auth/refresh", json={"refresh_token": login["refresh_token"]})
+    assert response.status_code == 401
+    response = await client.post("/api/auth/refresh", json={"refresh_token": rotated["refresh_token"]})
+    assert response.status_code == 401
+
+    response = await client.post("/api/auth/refresh", json={"refresh_token": "not-a-token"})
+    assert response.status_code == 401
+
+
+async def test_logout_revokes_the_access_token(client, fake, monkeypatch):
+    monkeypatch.setattr(security.signing_keys, "secret", JWT_SECRET)
+    first = (await client.post("/api/auth/login", json={"email": "user3@example.com", "password": DEFAULT_PASSWORD})).json()
+    second = (await client.post("/api/auth/login", json={"email": "user3@example.com", "password": DEFAULT_PASSWORD})).json()
+
+    def me(token):
+        return client.get("/api/users/me", headers={"Authorization": f"Bearer {token}"})
+
+    assert (await me(first["access_token"])).status_code == 200
+    await client.post("/api/auth/logout", headers={"Authorization": f"Bearer {first['access_token']}"})
+
+    assert (await me(first["access_token"])).status_code == 401
+    # Only that session: the user's other device stays signed in
+    assert (await me(second["access_token"])).status_code == 200
+
+
+async def test_non_json_upstream_error_is_a_gateway_error(monkeypatch):
+    def bad_gateway(request):
+        return httpx.Response(502, text="<html><body>502 Bad Gateway</body></html>", headers={"content-type": "text/html"})
+
+    monkeypatch.setattr("app.core.database._transport", httpx.MockTransport(bad_gateway))
+    monkeypatch.setattr("app.core.database._http_client", None)
+    monkeypatch.setattr(deps, "limiter", RateLimiter(MemoryStore(), dict.fromkeys(("anonymous", "authenticated", "subscribed", "client"), parse_quota("1/minute")), enabled=False))
+
+    with pytest.raises(AuthGatewayError) as error:
+        await auth_gateway.refresh_session("some-token")
+    assert error.value.status_code == 502
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        response = await client.post("/api/auth/refresh", json={"refresh_token": "another-token"})
+    assert response.status_code == 503
+
+
+async def test_delete_account_goes_through_the_gateway(client, fake, monkeypatch):
+    monkeypatch.setattr(security.signing_keys, "secret", JWT_SECRET)
+    login = (await client.post("/api/auth/login", json={"email": "user250@example.com", "password": DEFAULT_PASSWORD})).json()
+    headers = {"Authorization": f"Bearer {login['access_token']}"}
+    response = await client.delete("/api/users/me", headers=headers)
+    assert response.status_code == 200
+    assert "user250@example.com" not in fake.users and login["user"]["id"] not in fake.profiles
+    assert (await client.get("/api/users/me", headers=headers)).status_code == 401
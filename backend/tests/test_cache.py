@@ -0,0 +1,39 @@
+from app.core import cache
+from app.core.cache import TTLCache
+
+
+def test_ttl_cache_hit_and_miss_counters():
+    c = TTLCache(maxsize=10, ttl=60)
+    assert c.get("a") is None
+    c.set("a", 1)
+    assert c.get("a") == 1
+    assert c.stats() == {"size": 1, "hits": 1, "misses": 1}
+
+
+def test_ttl_cache_evicts_least_recently_used():
+    c = TTLCache(maxsize=2, ttl=60)
+    c.set("a", 1)
+    c.set("b", 2)
+    c.get("a")
+    c.set("c", 3)
+    assert c.get("b") is None
+    assert c.get("a") == 1
+    assert c.get("c") == 3
+
+
+def test_ttl_cache_expires_entries(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(cache.time, "monotonic", lambda: now[0])
+    c = TTLCache(maxsize=10, ttl=30)
+    c.set("a", 1)
+    now[0] += 31
+    assert c.get("a") is None
+    assert len(c) == 0
+
+
+def test_ttl_cache_invalidate():
+    c = TTLCache(maxsize=10, ttl=60)
+    c.set("a", 1)
+    c.invalidate("a")
+    c.invalidate("missing")
+    assert c.get("a") is None
@@ -0,0 +1,155 @@
+import asyncio
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+import pytest
+from app.core import database, passwords, security
+from app.core.config import settings
+from app.repositories.base import CredentialRepository
+from app.services.auth_gateway import AuthGatewayError
+from app.services.credentials import LocalAuthGateway, PasswordHasher
+
+SECRET = "local-auth-test-secret"
+
+
+class MemoryCredentials(CredentialRepository):
+    def __init__(self):
+        self.rows: Dict[str, Dict[str, Any]] = {}
+
+    async def get_by_email(self, email: str) -> Optional[Dict[str, Any]]:
+        return self.rows.get(email)
+
+    async def create(self, user_id: str, email: str, password_hash: str) -> Optional[Dict[str, Any]]:
+        if email in self.rows:
+            return None
+        self.rows[email] = {"user_id": user_id, "email": email, "password_hash": password_hash,
+                            "created_at": datetime.now(timezone.utc).isoformat()}
+        return self.rows[email]
+
+    async def update_hash(self, user_id: str, password_hash: str) -> None:
+        for row in self.rows.values():
+            if row["user_id"] == user_id:
+                row["password_hash"] = password_hash
+
+    async def delete(self, user_id: str) -> None:
+        self.rows = {email: row for email, row in self.rows.items() if row["user_id"] != user_id}
+
+
+class MemoryProfiles:
+    """The ProfileRepository calls the local gateway and the admin bootstrap make"""
+
+    def __init__(self):
+        self.rows: Dict[str, Dict[str, Any]] = {}
+
+    async def get(self, user_id: str) -> Optional[Dict[str, Any]]:
+        return self.rows.get(user_id)
+
+    async def get_by_email(self, email: str) -> Optional[Dict[str, Any]]:
+        return next((row for row in self.rows.values() if row["email"] == email), None)
+
+    async def create(self, user_id: str, values: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        self.rows[user_id] = {"id": user_id, **values}
+        return self.rows[user_id]
+
+    async def delete(self, user_id: str) -> None:
+        self.rows.pop(user_id, None)
+
+
+@pytest.fixture
+def credentials(monkeypatch):
+    repository = MemoryCredentials()
+
+    class Database:
+        pass
+
+    db = Database()
+    db.credentials = repository
+    db.profiles = MemoryProfiles()
+
+    async def get_db():
+        return db
+
+    monkeypatch.setattr("app.services.credentials.get_db", get_db)
+    monkeypatch.setattr("app.core.database.get_db", get_db)
+    monkeypatch.setattr(security.signing_keys, "secret", SECRET)
+    return repository
+
+
+@pytest.fixture
+async def gateway():
+    gateway = LocalAuthGateway(PasswordHasher(rounds=4, workers=2, max_pending=8), SECRET, token_ttl=3600)
+    yield gateway
+    await gateway.aclose()
+
+
+def test_verify_and_update_rehashes_on_new_rounds():
+    stored = passwords.get_password_hash("correct horse", rounds=4)
+    assert passwords.verify_and_update("correct horse", stored, rounds=4) == (True, None)
+    assert passwords.verify_and_update("wrong", stored, rounds=5) == (False, None)
+    valid, new_hash = passwords.verify_and_update("correct horse", stored, rounds=5)
+    assert valid and passwords.hash_rounds(new_hash) == 5
+    # Only the first 72 bytes count, as with older bcrypt releases
+    long_password = "x" * 100
+    assert passwords.verify_password("x" * 72, passwords.get_password_hash(long_password, rounds=4))
+    assert not passwords.verify_password("anything", "not-a-bcrypt-hash")
+
+
+async def test_sign_up_and_sign_in(credentials, gateway):
+    signed_up = await gateway.sign_up("New@Example.com", "s3cret-pass")
+    claims = await security.verify_access_token(signed_up["session"]["access_token"])
+    assert claims["email"] == "new@example.com" and claims["session_id"]
+
+    session = await gateway.sign_in_with_password("new@example.com", "s3cret-pass")
+    assert session["user"]["id"] == signed_up["user"]["id"]
+
+    with pytest.raises(AuthGatewayError) as wrong_password:
+        await gateway.sign_in_with_password("new@example.com", "nope")
+    with pytest.raises(AuthGatewayError) as unknown:
+        await gateway.sign_in_with_password("ghost@example.com", "s3cret-pass")
+    assert wrong_password.value.code == unknown.value.code == "invalid_credentials"
+    with pytest.raises(AuthGatewayError) as duplicate:
+        await gateway.sign_up("new@example.com", "other-pass")
+    assert duplicate.value.code == "user_already_exists"
+
+
+async def test_rounds_change_rehashes_on_login(credentials, gateway):
+    await gateway.sign_up("user@example.com", "s3cret-pass")
+    stronger = LocalAuthGateway(PasswordHasher(rounds=5, workers=1, max_pending=2), SECRET, token_ttl=3600)
+    try:
+        await stronger.sign_in_with_password("user@example.com", "s3cret-pass")
+    finally:
+        await stronger.aclose()
+    assert passwords.hash_rounds(credentials.rows["user@example.com"]["password_hash"]) == 5
+
+
+async def test_concurrent_logins(credentials, gateway):
+    for i in range(8):
+        credentials.rows[f"user{i}@example.com"] = {
+            "user_id": str(uuid.uuid4()),
+            "email": f"user{i}@example.com",
+            "password_hash": passwords.get_password_hash(f"pass-{i}", rounds=4),
+            "created_at": None,
+        }
+
+    sessions = await asyncio.gather(*(
+        gateway.sign_in_with_password(f"user{i % 8}@example.com", f"pass-{i % 8}") for i in range(64)
+    ))
+    assert [session["user"]["email"] for session in sessions] == [f"user{i % 8}@example.com" for i in range(64)]
+
+
+async def test_admin_bootstrap_and_delete(credentials, gateway, monkeypatch):
+    monkeypatch.setattr("app.services.auth_gateway.auth_gateway", gateway)
+    monkeypatch.setattr(settings, "ADMIN_EMAIL", "admin@example.com")
+    await database.init_db()
+    session = await gateway.sign_in_with_password("admin@example.com", "ChangeMeNow123!")
+    user_id = session["user"]["id"]
+    db = await database.get_db()
+    assert (await db.profiles.get(user_id))["is_admin"]
+    # A second boot finds the profile and leaves everything as it is
+    await database.init_db()
+    assert len(credentials.rows) == 1
+
+    await gateway.delete_user(user_id)
+    assert credentials.rows == {} and await db.profiles.get(user_id) is None
+    with pytest.raises(AuthGatewayError):
+        await gateway.sign_in_with_password("admin@example.com", "ChangeMeNow123!")
@@ -0,0 +1,47 @@
+import os
+import subprocess
+import sys
+from pathlib import Path
+import pytest
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+
+# Cumulative `python -X importtime` for app.main with optional integrations off.
+# About 1.7s on a dev laptop; the slack is for slower CI runners. Override with
+# IMPORT_TIME_BUDGET_SECONDS.
+IMPORT_TIME_BUDGET_SECONDS = float(os.environ.get("IMPORT_TIME_BUDGET_SECONDS", "3.0"))
+
+# Only needed when STRIPE_ENABLED / SENTRY_DSN are set
+OPTIONAL_MODULES = ["stripe", "sentry_sdk", "app.api.billing", "app.services.stripe", "app.core.webhook_queue"]
+
+
+@pytest.fixture(scope="module")
+def import_times():
+    """Cumulative import time in microseconds for each module imported by app.main"""
+    # Without pytest-cov's COV_CORE_* variables, which would trace the import too
+    env = {key: value for key, value in os.environ.items() if not key.startswith("COV_CORE_")}
+    env.update(STRIPE_ENABLED="false", SENTRY_DSN="")
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app.main"],
+        cwd=BACKEND_DIR,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        _, cumulative, module = line.split("|")
+        if cumulative.strip().isdigit():
+            times[module.strip()] = int(cumulative)
+    return times
+
+
+def test_optional_integrations_are_not_imported(import_times):
+    assert [module for module in OPTIONAL_MODULES if module in import_times] == []
+
+
+def test_import_time_budget(import_times):
+    assert import_times["app.main"] / 1e6 < IMPORT_TIME_BUDGET_SECONDS
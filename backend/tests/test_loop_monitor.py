@@ -0,0 +1,57 @@
+import asyncio
+import json
+import time
+from prometheus_client import REGISTRY
+from app.core.loop_monitor import LoopMonitor
+
+
+def _events(output: str, name: str):
+    return [event for event in map(json.loads, filter(None, output.splitlines())) if event["event"] == name]
+
+
+async def test_reports_the_stack_of_a_blocking_step(capsys):
+    def slow_sync_call():
+        time.sleep(0.4)
+
+    async def handler():
+        slow_sync_call()
+
+    before = REGISTRY.get_sample_value("event_loop_blocked_total") or 0
+    monitor = LoopMonitor(interval=0.02, threshold=0.1)
+    monitor.start()
+    try:
+        await asyncio.sleep(0.05)
+        await asyncio.create_task(handler(), name="blocking-handler")
+        await asyncio.sleep(0.05)
+    finally:
+        monitor.stop()
+
+    [event] = _events(capsys.readouterr().out, "event_loop_blocked")
+    assert event["task"] == "blocking-handler"
+    assert any("slow_sync_call" in line for line in event["stack"])
+    assert REGISTRY.get_sample_value("event_loop_blocked_total") == before + 1
+    assert REGISTRY.get_sample_value("event_loop_lag_seconds_count") > 0
+
+
+async def test_reports_threadpool_saturation(capsys, monkeypatch):
+    import anyio.to_thread
+
+    limiter = anyio.CapacityLimiter(2)
+    monkeypatch.setattr(anyio.to_thread, "current_default_thread_limiter", lambda: limiter)
+
+    def work():
+        time.sleep(0.2)
+
+    monitor = LoopMonitor(interval=0.02, threshold=1.0)
+    monitor.start()
+    try:
+        calls = [asyncio.create_task(anyio.to_thread.run_sync(work, limiter=limiter)) for _ in range(3)]
+        await asyncio.sleep(0.1)
+        assert REGISTRY.get_sample_value("threadpool_threads_busy") == 2
+        assert REGISTRY.get_sample_value("threadpool_tasks_waiting") == 1
+        await asyncio.gather(*calls)
+    finally:
+        monitor.stop()
+
+    [event] = _events(capsys.readouterr().out, "threadpool_saturated")
+    assert event["busy"] == 2 and event["limit"] == 2
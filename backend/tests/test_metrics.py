@@ -0,0 +1,14 @@
+from fastapi.testclient import TestClient
+from app.main import app
+
+
+def test_metrics_use_route_template():
+    client = TestClient(app=app)
+    client.get("/api/health")
+    client.get("/api/does-not-exist")
+
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    body = response.text
+    assert 'http_requests_total{method="GET",route="/api/health",status="200"}' in body
+    assert 'route="unmatched",status="404"' in body
@@ -0,0 +1,232 @@
+"""Micro-benchmarks for per-request primitives, checked against stored baselines.
+
+Each primitive's time per call is divided by a fixed pure-Python calibration
+workload timed in the same run, so baselines carry over between machines
+better than raw timings. A test fails when that ratio is more than
+MICROBENCH_MAX_REGRESSION (default 0.3, i.e. 30%) above its baseline on
+ATTEMPTS consecutive measurements, so one noisy neighbour doesn't fail the run.
+
+Wall-clock timings are too noisy for every run, so these tests carry the
+``microbench`` marker, which the default run deselects. They also refuse to
+run under a tracer: coverage traces the primitives in app/ but not the
+calibration loop here, which skews every ratio. Run them with:
+
+    pytest -m microbench --no-cov tests/test_microbench.py
+
+and, after an intentional change, refresh the baselines with:
+
+    MICROBENCH_UPDATE=1 pytest -m microbench --no-cov tests/test_microbench.py
+"""
+import asyncio
+import gc
+import json
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict
+import pytest
+from fastapi.security import HTTPAuthorizationCredentials
+from jose import jwt
+from app.api import admin, deps
+from app.core import security
+from app.core.cache import principal_cache
+from app.core.config import Settings, settings
+from app.core.rate_limit import MemoryStore, RateLimiter, parse_quota
+from app.schemas.user import User
+
+pytestmark = pytest.mark.microbench
+
+BASELINE_PATH = Path(__file__).with_name("microbench_baseline.json")
+MAX_REGRESSION = float(os.environ.get("MICROBENCH_MAX_REGRESSION", "0.3"))
+UPDATE_BASELINES = os.environ.get("MICROBENCH_UPDATE") == "1"
+
+# Each measurement runs for at least this long; the best of REPEAT is kept
+MIN_SECONDS = 0.05
+REPEAT = 5
+ATTEMPTS = 3
+
+USER_ROW = {
+    "id": "00000000-0000-0000-0000-000000000001",
+    "email": "user@example.com",
+    "name": "Ada Lovelace",
+    "is_admin": False,
+    "language": "en",
+    "created_at": "2024-03-01T12:00:00+00:00",
+}
+
+
+def _best_time_per_call(run: Callable[[int], None]) -> float:
+    """Seconds per call, with the loop count grown until a run takes MIN_SECONDS.
+
+    The collector is off while timing, as in timeit, so a collection that
+    happens to land in one benchmark doesn't count against it.
+    """
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        return _timed(run)
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+
+
+def _timed(run: Callable[[int], None]) -> float:
+    number = 1
+    while True:
+        start = time.perf_counter()
+        run(number)
+        elapsed = time.perf_counter() - start
+        if elapsed >= MIN_SECONDS:
+            break
+        number *= 2
+    timings = [elapsed]
+    for _ in range(REPEAT - 1):
+        start = time.perf_counter()
+        run(number)
+        timings.append(time.perf_counter() - start)
+    return min(timings) / number
+
+
+def measure(fn: Callable[[], Any]) -> float:
+    def run(number: int) -> None:
+        for _ in range(number):
+            fn()
+
+    return _best_time_per_call(run)
+
+
+def measure_async(fn: Callable[[], Awaitable[Any]]) -> float:
+    """Like measure, for coroutines; the loop runs inside one event loop so its setup isn't timed per call"""
+    loop = asyncio.new_event_loop()
+
+    async def repeat(number: int) -> None:
+        for _ in range(number):
+            await fn()
+
+    try:
+        return _best_time_per_call(lambda number: loop.run_until_complete(repeat(number)))
+    finally:
+        loop.close()
+
+
+def _calibration() -> None:
+    data = {str(i): i for i in range(200)}
+    sum(value * 2 for value in data.values() if value % 3)
+
+
+@pytest.fixture(scope="module")
+def baselines():
+    stored: Dict[str, float] = json.loads(BASELINE_PATH.read_text()) if BASELINE_PATH.exists() else {}
+    measured: Dict[str, float] = {}
+    yield stored, measured
+    if UPDATE_BASELINES and measured:
+        BASELINE_PATH.write_text(json.dumps({**stored, **measured}, indent=2, sort_keys=True) + "\n")
+
+
+def _ratio(bench: Callable[[], float]) -> float:
+    """The benchmark's time per call over the calibration's, measured back to back"""
+    return round(bench() / measure(_calibration), 3)
+
+
+@pytest.fixture
+def check(baselines):
+    stored, measured = baselines
+
+    def check(name: str, bench: Callable[[], float]) -> None:
+        if sys.gettrace() is not None:
+            pytest.fail("Micro-benchmarks can't run under coverage or a debugger; pass --no-cov")
+        if UPDATE_BASELINES:
+            # The median rather than the best, so the baseline isn't a lucky run
+            measured[name] = statistics.median(_ratio(bench) for _ in range(ATTEMPTS))
+            return
+        if name not in stored:
+            pytest.fail(f"No baseline for {name}; run with MICROBENCH_UPDATE=1 to record one")
+        limit = stored[name] * (1 + MAX_REGRESSION)
+        ratio = _ratio(bench)
+        for _ in range(ATTEMPTS - 1):
+            if ratio <= limit:
+                break
+            ratio = min(ratio, _ratio(bench))
+        assert ratio <= limit, (
+            f"{name} regressed: {ratio} x calibration vs baseline {stored[name]} "
+            f"(+{(ratio / stored[name] - 1) * 100:.0f}%, limit +{MAX_REGRESSION * 100:.0f}%)"
+        )
+
+    return check
+
+
+def test_decode_token(check):
+    token = security.create_access_token({"sub": "user-1"})
+    check("decode_token", lambda: measure(lambda: security.decode_token(token)))
+
+
+def test_create_access_token(check):
+    check("create_access_token", lambda: measure(lambda: security.create_access_token({"sub": "user-1"})))
+
+
+def test_user_construction(check):
+    check("user_construction", lambda: measure(lambda: admin._admin_user(USER_ROW)))
+
+
+def test_user_serialization(check):
+    user = admin._admin_user(USER_ROW)
+    check("user_serialization", lambda: measure(user.model_dump_json))
+
+
+def test_get_current_user_uncached(check, monkeypatch):
+    monkeypatch.setattr(security.signing_keys, "secret", "project-secret")
+    token = jwt.encode(
+        {
+            "sub": USER_ROW["id"],
+            "email": USER_ROW["email"],
+            "aud": settings.SUPABASE_JWT_AUDIENCE,
+            "iss": settings.supabase_jwt_issuer,
+            "iat": int(time.time()),
+            "exp": int(time.time()) + 3600,
+        },
+        "project-secret",
+        algorithm="HS256",
+    )
+    credentials = HTTPAuthorizationCredentials(scheme="Bearer", credentials=token)
+
+    class Profiles:
+        async def get(self, user_id):
+            return USER_ROW
+
+    class Database:
+        profiles = Profiles()
+
+    db = Database()
+
+    async def resolve() -> User:
+        principal_cache.clear()
+        return await deps.get_current_user(credentials, db)
+
+    check("get_current_user_uncached", lambda: measure_async(resolve))
+    principal_cache.clear()
+
+
+def test_export_csv_page(check):
+    page = [dict(USER_ROW, id=f"00000000-0000-0000-0000-{i:012d}") for i in range(500)]
+
+    async def no_more_pages():
+        return
+        yield
+
+    async def encode_page() -> None:
+        async for _ in admin._export_csv(page, no_more_pages()):
+            pass
+
+    check("export_csv_500_rows", lambda: measure_async(encode_page))
+
+
+def test_cors_origins_list(check):
+    config = Settings(CORS_ORIGINS="https://app.example.com, https://admin.example.com, http://localhost:5173")
+    check("cors_origins_list", lambda: measure(lambda: config.cors_origins_list))
+
+
+def test_rate_limit_check(check):
+    limiter = RateLimiter(MemoryStore(), {"authenticated": parse_quota("1000000/second")})
+    check("rate_limit_check", lambda: measure_async(lambda: limiter.hit("user-1", "authenticated")))
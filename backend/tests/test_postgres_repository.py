@@ -0,0 +1,71 @@
+import os
+import uuid
+from datetime import datetime, timedelta, timezone
+import pytest
+from app.repositories import postgres
+from app.repositories.postgres import PostgresProfileRepository
+
+# A disposable database; public.profiles is created if it doesn't exist, so
+# point this at one without Supabase Auth's foreign key to auth.users
+DATABASE_URL = os.environ.get("TEST_DATABASE_URL")
+
+pytestmark = pytest.mark.skipif(not DATABASE_URL, reason="set TEST_DATABASE_URL to test against Postgres")
+
+
+@pytest.fixture
+async def profiles(monkeypatch):
+    import asyncpg
+
+    # Generic plans from the start, as a statement gets after five runs
+    pool = await asyncpg.create_pool(DATABASE_URL, server_settings={"plan_cache_mode": "force_generic_plan"})
+    monkeypatch.setattr(postgres, "_pool", pool)
+    await pool.execute("""
+        CREATE TABLE IF NOT EXISTS public.profiles (
+            id uuid PRIMARY KEY,
+            email text,
+            name text,
+            is_admin boolean DEFAULT false,
+            language text DEFAULT 'en',
+            stripe_customer_id text,
+            subscription_status text,
+            created_at timestamp with time zone NOT NULL DEFAULT now()
+        );
+        CREATE INDEX IF NOT EXISTS profiles_created_at_id_idx ON public.profiles (created_at DESC, id DESC);
+    """)
+    marker = f"pgtest-{uuid.uuid4().hex[:8]}"
+    # Pairs of rows share a created_at, so the id half of the keyset matters
+    started = datetime.now(timezone.utc)
+    await pool.executemany(
+        "INSERT INTO public.profiles (id, email, name, is_admin, created_at) VALUES ($1, $2, $3, $4, $5)",
+        [
+            (uuid.uuid4(), f"{marker}-{i}@example.com", f"User {i}", i == 0, started - timedelta(minutes=i // 2))
+            for i in range(45)
+        ],
+    )
+    try:
+        yield PostgresProfileRepository(), marker
+    finally:
+        await pool.execute("DELETE FROM public.profiles WHERE email LIKE $1", f"{marker}-%")
+        await pool.close()
+
+
+async def test_keyset_pages_cover_every_user_once(profiles):
+    repository, marker = profiles
+    seen, after, total = [], None, None
+    while True:
+        rows, count = await repository.list_admin_users(
+            10, after=after, search=marker, count="exact" if after is None else "none"
+        )
+        total = total if count is None else count
+        seen.extend(row["id"] for row in rows)
+        if len(rows) < 10:
+            break
+        after = (rows[-1]["created_at"], rows[-1]["id"])
+
+    assert total == 45
+    assert len(seen) == len(set(seen)) == 45
+
+    rows, count = await repository.list_admin_users(10, search=marker, is_admin=True)
+    assert count == 1 and rows[0]["email"] == f"{marker}-0@example.com"
+    rows, count = await repository.list_admin_users(10, offset=50, search=marker)
+    assert rows == [] and count == 45
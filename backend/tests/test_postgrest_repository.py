@@ -0,0 +1,46 @@
+import httpx
+import pytest
+from app.core.database import PooledAsyncClient
+from app.repositories.postgrest import PostgrestProfileRepository
+from app.core.config import settings
+from tests.fakes.supabase import create_supabase_fake, seed_profiles
+
+
+@pytest.fixture
+def fake(monkeypatch):
+    app = create_supabase_fake(seed_profiles(45, admin_email="admin@example.com"))
+    monkeypatch.setattr("app.core.database._transport", httpx.ASGITransport(app=app))
+    return app.state.fake
+
+
+@pytest.fixture
+def profiles(fake):
+    client = PooledAsyncClient(settings.SUPABASE_URL, settings.SUPABASE_SERVICE_KEY)
+    return PostgrestProfileRepository(client)
+
+
+async def test_keyset_pages_cover_every_user_once(profiles):
+    seen, after, total = [], None, None
+    while True:
+        rows, count = await profiles.list_admin_users(20, after=after, count="exact" if after is None else "none")
+        total = total if count is None else count
+        seen.extend(row["id"] for row in rows)
+        if len(rows) < 20:
+            break
+        after = (rows[-1]["created_at"], rows[-1]["id"])
+
+    assert total == 46
+    assert len(seen) == len(set(seen)) == 46
+
+
+async def test_filters_and_updates(profiles, fake):
+    rows, total = await profiles.list_admin_users(10, search="admin", is_admin=True)
+    assert total == 1 and rows[0]["email"] == "admin@example.com"
+
+    updated = await profiles.update_by_stripe_customer("cus_3", {"subscription_status": "active"})
+    assert updated["subscription_status"] == "active"
+    assert fake.profiles[updated["id"]]["subscription_status"] == "active"
+
+    exported = [row async for page in profiles.iter_admin_users(page_size=20) for row in page]
+    assert len(exported) == 46
+    assert exported == sorted(exported, key=lambda row: (row["created_at"], row["id"]))
@@ -0,0 +1,126 @@
+import os
+from datetime import datetime, timezone
+import pytest
+from fastapi.testclient import TestClient
+from app.api.deps import get_current_user
+from app.core.rate_limit import MemoryStore, RateLimiter, RedisStore, parse_quota
+from app.main import app
+from app.schemas.user import User
+
+
+def test_parse_quota():
+    assert parse_quota("100/minute") == (100, 60)
+    assert parse_quota("5 per second") == (5, 1)
+    with pytest.raises(ValueError):
+        parse_quota("0/minute")
+
+
+async def test_burst_then_one_per_interval(monkeypatch):
+    now = 1000.0
+    monkeypatch.setattr("app.core.rate_limit.time.monotonic", lambda: now)
+    store = MemoryStore()
+    quota = parse_quota("3/minute")
+
+    decisions = [await store.hit("a", quota) for _ in range(4)]
+    assert [d.allowed for d in decisions] == [True, True, True, False]
+    assert [d.remaining for d in decisions[:3]] == [2, 1, 0]
+    assert decisions[3].retry_after == pytest.approx(20)
+    # Other keys have their own allowance
+    assert (await store.hit("b", quota)).allowed
+
+    now += 20
+    assert (await store.hit("a", quota)).allowed
+    assert not (await store.hit("a", quota)).allowed
+
+
+async def test_memory_store_stays_bounded():
+    store = MemoryStore(max_keys=10)
+    quota = parse_quota("1/day")
+    for i in range(25):
+        assert (await store.hit(str(i), quota)).allowed
+    assert len(store._tats) <= 10
+
+
+async def test_store_errors_fail_open():
+    class Broken(MemoryStore):
+        async def hit(self, key, quota):
+            raise ConnectionError("down")
+
+    limiter = RateLimiter(Broken(), {"anonymous": parse_quota("1/minute")})
+    assert (await limiter.hit("1.2.3.4", "anonymous")).allowed
+
+
+@pytest.mark.skipif(not os.environ.get("REDIS_URL"), reason="set REDIS_URL to test against a Redis-compatible server")
+async def test_redis_store_shares_counters():
+    quota = parse_quota("2/minute")
+    first, second = RedisStore(os.environ["REDIS_URL"], prefix="test:"), RedisStore(os.environ["REDIS_URL"], prefix="test:")
+    key = f"shared-{os.getpid()}-{datetime.now().timestamp()}"
+    try:
+        assert (await first.hit(key, quota)).allowed
+        assert (await second.hit(key, quota)).allowed
+        denied = await first.hit(key, quota)
+        assert not denied.allowed and 0 < denied.retry_after <= 30
+    finally:
+        await first.close()
+        await second.close()
+
+
+def test_users_are_limited_by_id_and_tier(monkeypatch):
+    from app.api import deps
+
+    limiter = RateLimiter(MemoryStore(), {
+        "anonymous": parse_quota("1/minute"),
+        "authenticated": parse_quota("2/minute"),
+        "subscribed": parse_quota("4/minute"),
+        # Requests with valid tokens aren't charged to the client IP
+        "client": parse_quota("1/minute"),
+    })
+    monkeypatch.setattr(deps, "limiter", limiter)
+    current = {}
+    app.dependency_overrides[get_current_user] = lambda: current["user"]
+
+    def user(user_id: str, status=None) -> User:
+        return User(id=user_id, email=f"{user_id}@example.com", created_at=datetime.now(timezone.utc), subscription_status=status)
+
+    try:
+        client = TestClient(app)
+        statuses = {}
+        for name, status in (("free", None), ("other", None), ("paid", "active")):
+            current["user"] = user(name, status)
+            statuses[name] = [client.get("/api/users/me").status_code for _ in range(5)]
+    finally:
+        app.dependency_overrides.clear()
+
+    assert statuses["free"] == [200, 200, 429, 429, 429]
+    assert statuses["other"] == [200, 200, 429, 429, 429]
+    assert statuses["paid"] == [200, 200, 200, 200, 429]
+    # Rejections say when to retry, and the tier isn't leaked into responses
+    current["user"] = user("free")
+    app.dependency_overrides[get_current_user] = lambda: current["user"]
+    try:
+        response = client.get("/api/users/me")
+        assert response.status_code == 429 and int(response.headers["retry-after"]) >= 1
+        current["user"] = user("fresh", "active")
+        assert "subscription_status" not in client.get("/api/users/me").json()
+    finally:
+        app.dependency_overrides.clear()
+
+
+def test_unauthenticated_requests_are_limited_per_ip(monkeypatch):
+    from app.api import deps
+
+    limiter = RateLimiter(MemoryStore(), {
+        "authenticated": parse_quota("100/minute"),
+        "subscribed": parse_quota("100/minute"),
+        "client": parse_quota("3/minute"),
+    })
+    monkeypatch.setattr(deps, "limiter", limiter)
+    monkeypatch.setattr(deps, "_blocked_clients", {})
+    client = TestClient(app)
+    headers = {"Authorization": "Bearer not-a-token"}
+    assert [client.get("/api/users/me", headers=headers).status_code for _ in range(4)] == [401, 401, 401, 429]
+    # Now rejected before the token is even looked at
+    verified = []
+    monkeypatch.setattr(deps, "verify_token", lambda token, db: verified.append(token))
+    assert client.get("/api/admin/stats", headers=headers).status_code == 429
+    assert verified == []
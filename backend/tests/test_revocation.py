@@ -0,0 +1,75 @@
+import time
+from typing import List
+from app.core.cache import principal_cache
+from app.core.revocation import MemoryBackend, Revocation, RevocationBackend, RevocationList, Revocations
+
+
+class SharedBackend(RevocationBackend):
+    """Stand-in for Redis: one list every Revocations instance sees"""
+
+    def __init__(self):
+        self.entries: List[Revocation] = []
+
+    async def publish(self, revocation: Revocation) -> None:
+        self.entries.append(revocation)
+
+    async def since(self, revoked_after: float) -> List[Revocation]:
+        return [entry for entry in self.entries if entry[2] > revoked_after]
+
+
+def test_sessions_and_user_cut_off():
+    revoked = RevocationList(ttl=3600)
+    now = time.time()
+    revoked.add("session", "s1", now)
+    revoked.add("user", "u2", now)
+
+    assert revoked.is_revoked("u1", "s1", now - 10)
+    assert not revoked.is_revoked("u1", "s2", now - 10)
+    # Tokens issued before the cut-off are rejected, ones issued after aren't
+    assert revoked.is_revoked("u2", "s3", now - 10)
+    assert not revoked.is_revoked("u2", "s3", now + 10)
+
+    revoked.sweep(now + 3601)
+    assert len(revoked) == 0
+    assert not revoked.is_revoked("u1", "s1", now - 10)
+
+
+async def test_revocations_reach_other_workers():
+    backend = SharedBackend()
+    first, second = Revocations(backend, ttl=3600), Revocations(backend, ttl=3600)
+    await second.sync()
+
+    await first.revoke_session("s1")
+    await first.revoke_user("u1")
+    issued = time.time() - 60
+    assert first.is_revoked("u9", "s1", issued)
+    assert not second.is_revoked("u9", "s1", issued)
+
+    await second.sync()
+    assert second.is_revoked("u9", "s1", issued)
+    assert second.is_revoked("u1", None, issued)
+
+
+async def test_principal_invalidation_reaches_other_workers():
+    backend = SharedBackend()
+    first, second = Revocations(backend, ttl=3600), Revocations(backend, ttl=3600)
+    await second.sync()
+
+    principal_cache.set("u5", "cached user")
+    await first.invalidate_principal("u5")
+    assert principal_cache.get("u5") is None
+    # Stands in for the copy another worker still holds
+    principal_cache.set("u5", "cached user")
+    await second.sync()
+    assert principal_cache.get("u5") is None
+    # A plan or role change doesn't sign the user out
+    assert not second.is_revoked("u5", None, time.time() - 60)
+
+
+async def test_memory_backend_sweeps_on_write():
+    revocations = Revocations(MemoryBackend(), ttl=60)
+    assert not revocations.shared
+    revocations.local.add("session", "old", time.time() - 120)
+    revocations._swept_at = time.time() - 10
+    await revocations.revoke_session("new")
+    assert len(revocations.local) == 1
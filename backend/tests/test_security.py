@@ -0,0 +1,47 @@
+import time
+import pytest
+from jose import jwt
+from app.core import security
+from app.core.config import settings
+
+
+def make_token(secret="project-secret", **claims):
+    payload = {
+        "sub": "user-1",
+        "email": "user@example.com",
+        "aud": settings.SUPABASE_JWT_AUDIENCE,
+        "iss": settings.supabase_jwt_issuer,
+        "iat": int(time.time()),
+        "exp": int(time.time()) + 3600,
+    }
+    payload.update(claims)
+    return jwt.encode(payload, secret, algorithm="HS256")
+
+
+@pytest.fixture
+def hs256_keys(monkeypatch):
+    monkeypatch.setattr(security.signing_keys, "secret", "project-secret")
+
+
+async def test_verify_access_token_valid(hs256_keys):
+    claims = await security.verify_access_token(make_token())
+    assert claims["sub"] == "user-1"
+
+
+async def test_verify_access_token_rejects_expired(hs256_keys):
+    assert await security.verify_access_token(make_token(exp=int(time.time()) - 10)) is None
+
+
+async def test_verify_access_token_rejects_wrong_audience_and_issuer(hs256_keys):
+    assert await security.verify_access_token(make_token(aud="anon-app")) is None
+    assert await security.verify_access_token(make_token(iss="https://evil.example/auth/v1")) is None
+
+
+async def test_verify_access_token_rejects_bad_signature(hs256_keys):
+    assert await security.verify_access_token(make_token(secret="other-secret")) is None
+
+
+async def test_verify_access_token_unavailable_without_keys(monkeypatch):
+    monkeypatch.setattr(security.signing_keys, "secret", None)
+    with pytest.raises(security.TokenVerificationUnavailable):
+        await security.verify_access_token(make_token())
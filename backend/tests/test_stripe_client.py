@@ -0,0 +1,60 @@
+import asyncio
+import httpx
+import pytest
+from app.services.stripe import StripeAPIError, StripeClient
+from tests.fakes.stripe import create_stripe_stub
+
+
+@pytest.fixture
+async def stub():
+    return create_stripe_stub()
+
+
+@pytest.fixture
+async def client(stub):
+    client = StripeClient("sk_test_123", base_url="http://stripe.test", transport=httpx.ASGITransport(app=stub))
+    yield client
+    await client.aclose()
+
+
+async def test_checkout_flow(client, stub):
+    customer = await client.create_customer("user@example.com", metadata={"user_id": "user-1"})
+    assert customer["metadata"] == {"user_id": "user-1"}
+
+    session = await client.create_checkout_session(
+        customer=customer["id"],
+        line_items=[{"price": "price_monthly", "quantity": 1}],
+        mode="subscription",
+    )
+    assert session["url"].endswith("/price_monthly")
+
+    stub.state.subscriptions.append({"id": "sub_1", "customer": customer["id"], "status": "active"})
+    subscriptions = await client.list_subscriptions(customer["id"])
+    assert [sub["id"] for sub in subscriptions["data"]] == ["sub_1"]
+
+
+async def test_errors_are_raised(client):
+    with pytest.raises(StripeAPIError) as exc_info:
+        await client.create_checkout_session(customer="cus_missing")
+    assert exc_info.value.status_code == 400
+    assert exc_info.value.code == "resource_missing"
+
+
+async def test_concurrency_is_bounded(stub):
+    in_flight, peak = 0, 0
+
+    class SlowTransport(httpx.ASGITransport):
+        async def handle_async_request(self, request):
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(0.01)
+            try:
+                return await super().handle_async_request(request)
+            finally:
+                in_flight -= 1
+
+    client = StripeClient("sk_test_123", base_url="http://stripe.test", max_concurrency=3, transport=SlowTransport(app=stub))
+    await asyncio.gather(*(client.list_subscriptions("cus_1") for _ in range(10)))
+    await client.aclose()
+    assert peak == 3
@@ -0,0 +1,44 @@
+from datetime import datetime, timedelta, timezone
+from app.core.subscriptions import best_subscription, is_stale, mirror_values, subscription_response
+
+
+def test_mirror_round_trip():
+    period_end = int(datetime.now(timezone.utc).timestamp()) + 86400
+    profile = mirror_values({
+        "status": "active",
+        "current_period_end": period_end,
+        "cancel_at_period_end": True,
+        "items": {"data": [{"price": {"id": "price_123"}}]},
+    })
+
+    assert not is_stale(profile)
+    assert subscription_response(profile) == {
+        "status": "active",
+        "current_period_end": period_end,
+        "cancel_at_period_end": True,
+        "price_id": "price_123",
+    }
+
+
+def test_is_stale():
+    now = datetime.now(timezone.utc)
+    assert is_stale({"subscription_synced_at": None})
+    assert is_stale({"subscription_synced_at": (now - timedelta(days=2)).isoformat()})
+    # Active but the period ended without a renewal webhook
+    assert is_stale({
+        "subscription_synced_at": now.isoformat(),
+        "subscription_status": "active",
+        "subscription_current_period_end": (now - timedelta(hours=1)).isoformat(),
+    })
+    assert not is_stale({"subscription_synced_at": now.isoformat(), "subscription_status": "canceled"})
+
+
+def test_best_subscription_prefers_paid_over_newer():
+    active = {"id": "sub_old", "status": "active", "created": 100}
+    canceled = {"id": "sub_new", "status": "canceled", "created": 300}
+    incomplete = {"id": "sub_newer", "status": "incomplete", "created": 400}
+    assert best_subscription([incomplete, canceled, active]) is active
+    assert best_subscription([canceled, incomplete]) is incomplete
+
+    trialing = mirror_values({"status": "trialing"})
+    assert subscription_response(trialing)["status"] == "active"
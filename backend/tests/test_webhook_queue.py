@@ -0,0 +1,91 @@
+import time
+import pytest
+from app.core.webhook_queue import WebhookQueue, process_batch
+
+
+class FakeProfiles:
+    def __init__(self):
+        self.updates = []
+
+    async def update_by_stripe_customer(self, customer_id, values):
+        self.updates.append((customer_id, values))
+
+
+class FakeDB:
+    def __init__(self):
+        self.profiles = FakeProfiles()
+
+
+def subscription_event(event_id, created, status, customer="cus_1"):
+    return {
+        "id": event_id,
+        "type": "customer.subscription.updated",
+        "created": created,
+        "data": {"object": {"customer": customer, "status": status, "current_period_end": created + 86400}},
+    }
+
+
+@pytest.fixture
+def queue(tmp_path):
+    queue = WebhookQueue(str(tmp_path / "events.sqlite3"))
+    yield queue
+    queue.close()
+
+
+async def test_redelivery_is_ignored(queue):
+    assert queue.enqueue(subscription_event("evt_1", 100, "active"))
+    assert not queue.enqueue(subscription_event("evt_1", 100, "active"))
+    assert queue.pending() == 1
+
+
+async def test_events_coalesce_per_customer_in_order(queue):
+    db = FakeDB()
+    queue.enqueue(subscription_event("evt_2", 200, "past_due"))
+    queue.enqueue(subscription_event("evt_1", 100, "active"))
+    queue.enqueue(subscription_event("evt_3", 150, "active", customer="cus_2"))
+
+    assert await process_batch(queue, db, limit=10) == 3
+    updates = dict(db.profiles.updates)
+    assert len(db.profiles.updates) == 2
+    assert updates["cus_1"]["subscription_status"] == "past_due"
+    assert updates["cus_2"]["subscription_status"] == "active"
+    assert queue.pending() == 0
+
+    # An older event arriving late doesn't roll the profile back
+    queue.enqueue(subscription_event("evt_0", 50, "canceled"))
+    await process_batch(queue, db, limit=10)
+    assert len(db.profiles.updates) == 2
+    assert queue.pending() == 0
+
+
+async def test_event_without_customer_or_user_is_acknowledged(queue):
+    event = {"id": "evt_x", "type": "checkout.session.completed", "created": 100, "data": {"object": {"metadata": {}}}}
+    assert queue.enqueue(event)
+    assert await process_batch(queue, FakeDB(), limit=10) == 1
+    assert queue.pending() == 0
+
+
+async def test_failing_events_are_parked_not_purged(queue, monkeypatch):
+    class FailingProfiles(FakeProfiles):
+        async def update_by_stripe_customer(self, customer_id, values):
+            raise RuntimeError("database down")
+
+    monkeypatch.setattr("app.core.webhook_queue.MAX_ATTEMPTS", 3)
+    db = FakeDB()
+    db.profiles = FailingProfiles()
+    queue.enqueue(subscription_event("evt_1", 100, "active"))
+    for _ in range(3):
+        assert await process_batch(queue, db, limit=10) == 1
+        # Skip the retry backoff
+        queue._connect().execute("UPDATE stripe_events SET lease_until = NULL")
+
+    assert queue.pending() == 0
+    assert [(row["id"], row["last_error"]) for row in queue.parked()] == [("evt_1", "database down")]
+    assert queue.purge(older_than=time.time() + 1) == 0
+    assert len(queue.parked()) == 1
+
+    # The customer's later events aren't held up by the parked one
+    db.profiles = FakeProfiles()
+    queue.enqueue(subscription_event("evt_2", 200, "past_due"))
+    assert await process_batch(queue, db, limit=10) == 1
+    assert db.profiles.updates[0][1]["subscription_status"] == "past_due"
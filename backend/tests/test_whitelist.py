@@ -0,0 +1,116 @@
+from datetime import datetime, timezone
+import httpx
+import pytest
+from app.api import admin, auth, deps
+from app.core import security
+from app.core.config import settings
+from app.core.database import get_db
+from app.core.rate_limit import MemoryStore, RateLimiter, parse_quota
+from app.core.whitelist import BloomFilter, WhitelistIndex
+from app.main import app
+from tests.fakes.supabase import DEFAULT_PASSWORD, JWT_SECRET, create_supabase_fake, seed_profiles
+
+
+class CountingRepository:
+    def __init__(self, emails):
+        self.emails = set(emails)
+        self.lookups = 0
+
+    async def contains(self, email):
+        self.lookups += 1
+        return email in self.emails
+
+    async def iter_changes(self, since, page_size):
+        now = datetime.now(timezone.utc)
+        yield [{"email": email, "updated_at": now, "removed_at": None} for email in sorted(self.emails)]
+
+
+def test_bloom_filter_has_no_false_negatives():
+    bloom = BloomFilter(1000, 0.01)
+    emails = [f"user{i}@example.com" for i in range(1000)]
+    for email in emails:
+        bloom.add(email)
+    assert all(email in bloom for email in emails)
+    false_positives = sum(f"other{i}@example.com" in bloom for i in range(10000))
+    assert false_positives < 300
+
+
+async def test_large_whitelist_switches_to_bloom_filter():
+    repository = CountingRepository(f"user{i}@example.com" for i in range(50))
+    index = WhitelistIndex(max_exact=10, error_rate=0.001)
+    await index.load(repository)
+    assert index._bloom is not None and len(index) == 50
+
+    assert await index.contains("User7@Example.com", repository)
+    assert repository.lookups == 1
+    # Ruled out by the filter with no lookup (at this size a false positive is vanishingly rare)
+    assert not await index.contains("stranger@example.com", repository)
+    assert repository.lookups == 1
+
+    index.remove(["user7@example.com"])
+    repository.emails.discard("user7@example.com")
+    assert not await index.contains("user7@example.com", repository)
+
+
+@pytest.fixture
+def fake(monkeypatch):
+    supabase = create_supabase_fake(seed_profiles(5, admin_email="admin@example.com"))
+    supabase.state.fake.whitelist.append({
+        "email": "invited@example.com", "updated_at": datetime.now(timezone.utc).isoformat(), "removed_at": None,
+    })
+    monkeypatch.setattr("app.core.database._transport", httpx.ASGITransport(app=supabase))
+    monkeypatch.setattr("app.core.database._http_client", None)
+    monkeypatch.setattr("app.core.database._db", None)
+    monkeypatch.setattr(deps, "limiter", RateLimiter(MemoryStore(), dict.fromkeys(("anonymous", "authenticated", "subscribed", "client"), parse_quota("1/minute")), enabled=False))
+    monkeypatch.setattr(security.signing_keys, "secret", JWT_SECRET)
+    monkeypatch.setattr(settings, "WHITELIST_MODE", True)
+    return supabase.state.fake
+
+
+@pytest.fixture
+async def index(fake, monkeypatch):
+    index = WhitelistIndex(settings.WHITELIST_EXACT_MAX_ENTRIES, settings.WHITELIST_BLOOM_ERROR_RATE)
+    monkeypatch.setattr(auth, "whitelist_index", index)
+    monkeypatch.setattr(admin, "whitelist_index", index)
+    await index.load((await get_db()).whitelist)
+    return index
+
+
+@pytest.fixture
+async def client(fake):
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        yield client
+
+
+async def test_signups_checked_against_the_index(client, fake, index):
+    def signup(email):
+        return client.post("/api/auth/signup", json={"email": email, "password": "s3cret-pass"})
+
+    requests = fake.requests
+    assert (await signup("stranger@example.com")).status_code == 403
+    assert fake.requests == requests
+    assert (await signup("Invited@example.com")).status_code == 200
+
+    login = (await client.post("/api/auth/login", json={"email": "admin@example.com", "password": DEFAULT_PASSWORD})).json()
+    headers = {"Authorization": f"Bearer {login['access_token']}"}
+    response = await client.post("/api/admin/whitelist", json={"emails": ["a@example.com", "B@example.com"]}, headers=headers)
+    assert response.status_code == 200
+    assert (await signup("b@example.com")).status_code == 200
+
+    response = await client.post("/api/admin/whitelist/remove", json={"emails": ["a@example.com"]}, headers=headers)
+    assert response.status_code == 200
+    assert (await signup("a@example.com")).status_code == 403
+    assert {row["email"]: row["removed_at"] is not None for row in fake.whitelist} == {
+        "invited@example.com": False, "a@example.com": True, "b@example.com": False,
+    }
+
+
+async def test_refresh_picks_up_changes_from_other_workers(fake, index):
+    repository = (await get_db()).whitelist
+    await repository.add(["later@example.com"])
+    await repository.remove(["invited@example.com"])
+    assert not await index.contains("later@example.com", repository)
+
+    await index.refresh(repository)
+    assert await index.contains("later@example.com", repository)
+    assert not await index.contains("invited@example.com", repository)